@@ -0,0 +1,92 @@
+import math
+from app.storage.base import dialect_sql, execute_values, qmark
+
+# Running per-category amount statistics (Welford's count, mean and M2), kept
+# in step with `expenses`. Each new expense is scored against its category as
+# it is inserted, so `expense_anomalies` reads flagged rows from an index
+# instead of re-aggregating the table.
+MIN_SAMPLES = 5  # expenses a category needs before its spread means anything
+
+# New categories get an empty row first, so every category a writer touches
+# has a row it can lock.
+STATS_ENSURE = """
+    INSERT INTO category_stats (category, count, mean, m2)
+    VALUES %s
+    ON CONFLICT (category) DO NOTHING
+"""
+# SQLite has no row locks; the ensure INSERT already took its database write lock.
+STATS_ROW_LOCK = {"postgres": " FOR UPDATE", "sqlite": ""}
+STATS_UPSERT = """
+    INSERT INTO category_stats (category, count, mean, m2)
+    VALUES %s
+    ON CONFLICT (category) DO UPDATE SET
+        count = EXCLUDED.count,
+        mean = EXCLUDED.mean,
+        m2 = EXCLUDED.m2
+"""
+
+
+def load_stats(cursor, categories=None, dialect: str = "postgres") -> dict:
+    """Lock the `category_stats` rows of `categories` and read them as {category: [count, mean, m2]}.
+
+    The row locks last until the caller commits, so concurrent writers to the
+    same categories queue while writers to other categories proceed. Without
+    `categories` every existing row is locked (bulk loads, which touch most).
+    """
+    sql = "SELECT category, count, mean, m2 FROM category_stats"
+    params = ()
+    if categories is not None:
+        categories = sorted({category for category in categories if category is not None})
+        if not categories:
+            return {}
+        execute_values(
+            cursor, STATS_ENSURE, [(category, 0, 0.0, 0.0) for category in categories], dialect
+        )
+        sql += f" WHERE category IN ({', '.join(['%s'] * len(categories))})"
+        params = tuple(categories)
+    # Locking in one order keeps two writers from deadlocking on each other's rows.
+    sql += " ORDER BY category" + dialect_sql(STATS_ROW_LOCK, dialect)
+    cursor.execute(sql if dialect == "postgres" else qmark(sql), params)
+    return {category: [count, mean, m2] for category, count, mean, m2 in cursor.fetchall()}
+
+
+def score(stats: dict, amount, category):
+    """Z-score of `amount` against its category so far, then fold it into `stats`.
+
+    Returns None while the category has fewer than MIN_SAMPLES expenses or no spread.
+    """
+    if amount is None or category is None:
+        return None
+    amount = float(amount)
+    bucket = stats.setdefault(category, [0, 0.0, 0.0])
+    count, mean, m2 = bucket
+    z = None
+    if count >= MIN_SAMPLES and m2 > 0:
+        z = (amount - mean) / math.sqrt(m2 / (count - 1))
+
+    count += 1
+    delta = amount - mean
+    mean += delta / count
+    m2 += delta * (amount - mean)
+    bucket[:] = [count, mean, m2]
+    return z
+
+
+def save_stats(cursor, stats: dict, categories, dialect: str = "postgres"):
+    """Write back the `categories` of `stats` the caller scored into (after `load_stats`)."""
+    values = [
+        (category, *stats[category]) for category in sorted(set(categories)) if category in stats
+    ]
+    execute_values(cursor, STATS_UPSERT, values, dialect)
+
+
+def score_rows(cursor, rows, dialect: str = "postgres"):
+    """Score (id, date, amount, category, description) rows in order and update the stats.
+
+    Returns the rows with their anomaly score appended, ready to insert.
+    """
+    categories = {row[3] for row in rows if row[2] is not None and row[3] is not None}
+    stats = load_stats(cursor, categories, dialect)
+    scored = [row + (score(stats, row[2], row[3]),) for row in rows]
+    save_stats(cursor, stats, categories, dialect)
+    return scored
@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from datetime import date, timedelta
+import numpy as np
+from app.storage import get_backend
+
+# Keep the expenses table in process memory and answer aggregate tools from it.
+# Each worker process holds its own copy, refreshed only by its own writes, so
+# enable this for single-process deployments or where staleness is acceptable.
+
+EPOCH = date(1970, 1, 1)
+CATEGORY_NAMES = [
+    "food", "travel", "transport", "entertainment", "utilities", "grocery",
+    "shopping", "electronics", "health", "miscellaneous", "automobile", "other", "none",
+]
+LOAD_BATCH_SIZE = 100_000
+
+
+def pg_real(amount):
+    """The float Postgres hands back for a value stored in a REAL (float4) column."""
+    # Both print float4 as its shortest round-trip decimal.
+    return float(str(np.float32(amount)))
+
+
+class ColumnarStore:
+    """Append-only column arrays over the expenses table.
+
+    Dates are int32 days since 1970-01-01, amounts float64, and categories
+    int8 codes into `categories` (the `Category` values first, then any other
+    text found in the table). Ids and descriptions stay in Python lists; they
+    are only read back for row-returning tools.
+    """
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.dates = np.empty(capacity, dtype=np.int32)
+        self.amounts = np.empty(capacity, dtype=np.float64)
+        self.codes = np.empty(capacity, dtype=np.int8)
+        self.ids = []
+        self.descriptions = []
+        self.categories = list(CATEGORY_NAMES)
+        self._codes = {name: code for code, name in enumerate(self.categories)}
+        self._lock = threading.Lock()
+
+    def _code(self, category):
+        code = self._codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            if code > np.iinfo(np.int8).max:
+                raise ValueError("Too many distinct categories for the columnar cache.")
+            self.categories.append(category)
+            self._codes[category] = code
+        return code
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed <= len(self.dates):
+            return
+        capacity = max(needed, len(self.dates) * 2)
+        # New arrays rather than resize(): readers may still hold views of the old ones.
+        for name in ("dates", "amounts", "codes"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[: self.size] = old[: self.size]
+            setattr(self, name, new)
+
+    def append(self, rows):
+        """Add (id, date, amount, category, description) rows as the database returns them."""
+        rows = [row for row in rows if None not in row[1:4]]
+        if not rows:
+            return
+        with self._lock:
+            self._reserve(len(rows))
+            start, end = self.size, self.size + len(rows)
+            self.dates[start:end] = (
+                np.array([str(row[1]) for row in rows], dtype="datetime64[D]")
+                .astype(np.int32)
+            )
+            self.amounts[start:end] = [row[2] for row in rows]
+            self.codes[start:end] = [self._code(row[3]) for row in rows]
+            self.ids.extend(row[0] for row in rows)
+            self.descriptions.extend(row[4] for row in rows)
+            self.size = end
+
+    def columns(self):
+        """A consistent (dates, amounts, codes, size) snapshot."""
+        with self._lock:
+            size = self.size
+            return self.dates[:size], self.amounts[:size], self.codes[:size], size
+
+    def category_code(self, category):
+        return self._codes.get((category or "").lower())
+
+    # -- row-returning queries -------------------------------------------
+
+    def rows(self, indices):
+        return [
+            {
+                "id": self.ids[index],
+                "date": EPOCH + timedelta(days=int(self.dates[index])),
+                "amount": float(self.amounts[index]),
+                "category": self.categories[self.codes[index]],
+                "description": self.descriptions[index],
+            }
+            for index in indices
+        ]
+
+    def date_range(self, from_date, to_date, category=None):
+        """Expenses with from_date <= date <= to_date, in date order."""
+        dates, _, codes, _ = self.columns()
+        low = np.datetime64(from_date, "D").astype(np.int32)
+        high = np.datetime64(to_date, "D").astype(np.int32)
+        mask = (dates >= low) & (dates <= high)
+        if category is not None:
+            code = self.category_code(category)
+            if code is None:
+                return []
+            mask &= codes == code
+        indices = np.flatnonzero(mask)
+        indices = indices[np.argsort(dates[indices], kind="stable")]
+        return self.rows(indices)
+
+    def above_average(self):
+        _, amounts, _, size = self.columns()
+        if size == 0:
+            return []
+        return self.rows(np.flatnonzero(amounts > amounts.mean()))
+
+    # -- aggregates ------------------------------------------------------
+
+    def _filter(self, category=None, year=None, month=None):
+        dates, amounts, codes, _ = self.columns()
+        mask = np.ones(len(dates), dtype=bool)
+        if category is not None:
+            code = self.category_code(category)
+            if code is None:
+                return amounts[:0], codes[:0]
+            mask &= codes == code
+        if year is not None or month is not None:
+            months = dates.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+            if year is not None:
+                mask &= months // 12 + 1970 == int(year)
+            if month is not None:
+                mask &= months % 12 + 1 == int(month)
+        return amounts[mask], codes[mask]
+
+    def total(self, category=None):
+        """SUM(amount), or None when no rows match (as in SQL)."""
+        amounts, _ = self._filter(category)
+        return float(amounts.sum()) if len(amounts) else None
+
+    def min_max(self, category=None):
+        amounts, _ = self._filter(category)
+        if not len(amounts):
+            return None, None
+        return float(amounts.min()), float(amounts.max())
+
+    def category_totals(self, year=None, month=None):
+        """[(category, total)] for categories with matching rows, in code order."""
+        amounts, codes = self._filter(year=year, month=month)
+        counts = np.bincount(codes, minlength=len(self.categories))
+        totals = np.bincount(codes, weights=amounts, minlength=len(self.categories))
+        return [
+            (self.categories[code], float(totals[code])) for code in np.flatnonzero(counts)
+        ]
+
+    def category_averages(self, category=None):
+        amounts, codes = self._filter(category)
+        counts = np.bincount(codes, minlength=len(self.categories))
+        totals = np.bincount(codes, weights=amounts, minlength=len(self.categories))
+        return [
+            (self.categories[code], float(totals[code] / counts[code]))
+            for code in np.flatnonzero(counts)
+        ]
+
+    def period_totals(self, interval="monthly"):
+        """[((year, month), total)] or [(year, total)], newest first."""
+        dates, amounts, _, size = self.columns()
+        if size == 0:
+            return []
+        months = dates.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        keys = months if interval == "monthly" else months // 12
+        periods, inverse = np.unique(keys, return_inverse=True)
+        totals = np.bincount(inverse, weights=amounts)
+        result = []
+        for period, total in zip(periods[::-1], totals[::-1]):
+            if interval == "monthly":
+                result.append(((int(period // 12 + 1970), int(period % 12 + 1)), float(total)))
+            else:
+                result.append((int(period + 1970), float(total)))
+        return result
+
+
+_store = None
+
+
+def cache_enabled():
+    """The COLUMNAR_CACHE setting, read at load time so a .env loaded after import counts."""
+    return os.getenv("COLUMNAR_CACHE", "false").lower() in ("1", "true", "yes")
+
+
+def get_store():
+    """The loaded store, or None when the cache is disabled or not loaded yet."""
+    return _store
+
+
+def load_store(conn):
+    """(Re)build the store from the expenses table; call at startup."""
+    global _store
+    if not cache_enabled():
+        return None
+    started = time.perf_counter()
+    store = ColumnarStore()
+    for rows in get_backend().iter_batches(
+        conn, "SELECT id, date, amount, category, description FROM expenses", LOAD_BATCH_SIZE
+    ):
+        store.append(rows)
+    _store = store
+    print(
+        f"Columnar cache: {store.size} rows loaded in "
+        f"{time.perf_counter() - started:.2f}s"
+    )
+    return store
+
+
+def append_rows(rows):
+    """Mirror rows just committed to Postgres; no-op when the cache is off."""
+    if _store is None:
+        return
+    if get_backend().dialect == "postgres":
+        rows = [
+            (row_id, row_date, pg_real(amount), category, description)
+            for row_id, row_date, amount, category, description in rows
+        ]
+    # SQLite's REAL is a double, so amounts come back exactly as written.
+    _store.append(rows)
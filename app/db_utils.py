@@ -1,61 +1,164 @@
-import psycopg2
+import asyncio
 import os
-from psycopg2.extras import RealDictCursor
+from contextlib import contextmanager
 from dotenv import load_dotenv
+from app.migrations import migrate
+from app.rollups import update_rollups
+from app.anomalies import score_rows
+from app.recurrence import backfill as backfill_recurring, description_key, refresh_series
+from app.metrics import DB_QUERY_LATENCY, current_tool
+from app.storage import get_backend, close_backend, execute_values
+from app import columnar, forecast
 
 load_dotenv()
 
-db_uri = os.getenv("POSTGRES_URL")
+DB_STREAM_BATCH_SIZE = int(os.getenv("DB_STREAM_BATCH_SIZE", 2000))
 
 
-def init_db():
-    conn = psycopg2.connect(db_uri)
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS expenses (
-            id TEXT PRIMARY KEY,
-            date DATE,
-            amount REAL,
-            category TEXT,
-            description TEXT
-        )
-        """
-    )
-    cursor.execute("SELECT version();")
-    db_version = cursor.fetchone()
-    print("Connected to:", db_version)
+def db_dialect():
+    """Name of the active SQL dialect ("postgres" or "sqlite")."""
+    return get_backend().dialect
+
 
-    conn.commit()
-    return conn
+def close_pool():
+    close_backend()
 
 
-conn = init_db()
+@contextmanager
+def get_connection(conn=None):
+    """Check a connection out of the backend, or reuse `conn` if one is given."""
+    if conn is not None:
+        yield conn
+        return
 
+    with get_backend().connection() as conn:
+        yield conn
+
+
+def init_db():
+    """Apply pending migrations; call once at startup."""
+    backend = get_backend()
+    with get_connection() as conn:
+        migrate(conn, backend.dialect)
+        backend.reset_prepared(conn)
+        print("Connected to:", backend.version(conn))
+        backfill_recurring(conn, backend.dialect)
+        columnar.load_store(conn)
 
-def save_to_db(expense_data):
-    with psycopg2.connect(db_uri) as conn:
+
+def save_to_db(expense_data, conn=None):
+    row = (
+        expense_data["id"].lower(),
+        expense_data["date"],
+        expense_data["amount"],
+        expense_data["category"].lower(),
+        expense_data["description"].lower(),
+    )
+    backend = get_backend()
+    with get_connection(conn) as conn, DB_QUERY_LATENCY.labels(current_tool.get()).time():
         cursor = conn.cursor()
+        (scored,) = score_rows(cursor, [row], backend.dialect)
+        key = description_key(row[4])
         cursor.execute(
-            """
-            INSERT INTO expenses (id, date, amount, category, description)
-            VALUES (%s, %s, %s, %s, %s)
-            """,
-            (
-                expense_data["id"].lower(),
-                expense_data["date"],
-                expense_data["amount"],
-                expense_data["category"].lower(),
-                expense_data["description"].lower(),
+            backend.adapt(
+                """
+                INSERT INTO expenses (id, date, amount, category, description, anomaly_score, description_key)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """
             ),
+            scored + (key,),
         )
-        conn.commit()
+        update_rollups(cursor, [row[1:4]], backend.dialect)
+        refresh_series(cursor, [key], backend.dialect)
+    columnar.append_rows([row])
+    forecast.mark_dirty([row[1]])
+
 
+def save_many_to_db(expenses, conn=None):
+    """Insert many expenses with one multi-row INSERT in a single transaction."""
+    if not expenses:
+        return
+    rows = [
+        (
+            expense_data["id"].lower(),
+            expense_data["date"],
+            expense_data["amount"],
+            expense_data["category"].lower(),
+            expense_data["description"].lower(),
+        )
+        for expense_data in expenses
+    ]
+    dialect = get_backend().dialect
+    with get_connection(conn) as conn, DB_QUERY_LATENCY.labels(current_tool.get()).time():
+        cursor = conn.cursor()
+        keys = [description_key(row[4]) for row in rows]
+        execute_values(
+            cursor,
+            "INSERT INTO expenses (id, date, amount, category, description, anomaly_score, description_key) VALUES %s",
+            [
+                scored + (key,)
+                for scored, key in zip(score_rows(cursor, rows, dialect), keys)
+            ],
+            dialect,
+        )
+        update_rollups(cursor, [row[1:4] for row in rows], dialect)
+        refresh_series(cursor, keys, dialect)
+    columnar.append_rows(rows)
+    forecast.mark_dirty([row[1] for row in rows])
 
-def db_query(query):
-    conn = psycopg2.connect(db_uri)
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    cursor.execute(query)
-    result = cursor.fetchall()
+
+def db_query(query, params=None, conn=None):
+    """Run `query` and return every row as a dict.
+
+    With `params`, `query` uses %s placeholders and the values are bound by the
+    driver; without, it is sent as-is.
+    """
+    backend = get_backend()
+    with get_connection(conn) as conn:
+        cursor = backend.dict_cursor(conn)
+        try:
+            with DB_QUERY_LATENCY.labels(current_tool.get()).time():
+                if params is None:
+                    cursor.execute(query)
+                else:
+                    cursor.execute(backend.adapt(query), params)
+                result = cursor.fetchall()
+        finally:
+            cursor.close()
 
     return result
+
+
+def db_stream(query, params=None, batch_size=DB_STREAM_BATCH_SIZE):
+    """Yield rows as dicts, fetching `batch_size` at a time.
+
+    Postgres uses a named server-side cursor, so memory stays flat however large
+    the result is. The pooled connection is held until the generator is
+    exhausted or closed.
+    """
+    backend = get_backend()
+    with get_connection() as conn:
+        batches = backend.iter_batches(
+            conn,
+            backend.adapt(query) if params is not None else query,
+            batch_size,
+            params=params,
+            dicts=True,
+        )
+        for rows in batches:
+            yield from rows
+
+
+async def async_save_to_db(expense_data):
+    """Run `save_to_db` in a worker thread so the event loop stays free."""
+    return await asyncio.to_thread(save_to_db, expense_data)
+
+
+async def async_db_query(query, params=None):
+    """Run `db_query` in a worker thread so the event loop stays free."""
+    return await asyncio.to_thread(db_query, query, params)
+
+
+async def async_save_many_to_db(expenses):
+    """Run `save_many_to_db` in a worker thread so the event loop stays free."""
+    return await asyncio.to_thread(save_many_to_db, expenses)
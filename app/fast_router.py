@@ -0,0 +1,173 @@
+import re
+from datetime import date, datetime
+
+# Words that unambiguously identify a category in short "spent X on Y" inputs.
+CATEGORY_KEYWORDS = {
+    "food": [
+        "food", "lunch", "dinner", "breakfast", "brunch", "snack", "snacks",
+        "restaurant", "meal", "coffee", "pizza", "burger",
+    ],
+    "travel": ["travel", "flight", "hotel", "taxi", "uber", "bus ticket", "train ticket"],
+    "transport": ["transport", "gas", "fuel", "petrol", "toll", "parking", "metro", "bus"],
+    "entertainment": ["entertainment", "movie", "movies", "concert", "theater", "cinema", "netflix"],
+    "utilities": [
+        "utilities", "electricity", "water bill", "internet", "phone bill", "gas bill", "rent",
+    ],
+    "grocery": ["grocery", "groceries", "supermarket", "vegetables", "fruits"],
+    "shopping": ["shopping", "clothes", "shoes", "accessories", "books"],
+    "electronics": ["electronics", "laptop", "phone", "tablet", "headphones", "tv"],
+    "health": ["health", "medicine", "medication", "doctor", "pharmacy", "gym"],
+    "automobile": ["automobile", "car repair", "oil change", "spare parts", "car wash"],
+    "miscellaneous": ["miscellaneous", "misc"],
+    "other": ["other"],
+}
+
+CATEGORIES = set(CATEGORY_KEYWORDS) | {"none"}
+
+# Words that put an expense on some other day. Create rules always use today's
+# date, so inputs naming one go to the LLM instead.
+DATE_WORDS = {
+    "today", "tonight", "yesterday", "tomorrow", "last", "ago", "week", "weekend", "month", "year",
+    "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+    "january", "february", "march", "april", "may", "june", "july", "august",
+    "september", "october", "november", "december",
+}
+
+AMOUNT = r"\$?(\d+(?:\.\d{1,2})?)"
+ISO_DATE = r"(\d{4}-\d{2}-\d{2})"
+
+CREATE_PATTERNS = [
+    re.compile(rf"^(?:i\s+)?(?:spent|spend|paid|pay)\s+{AMOUNT}\s+(?:on|for)\s+([a-z][a-z ]*)$"),
+    re.compile(rf"^(?:add|log)\s+{AMOUNT}\s+(?:on|for)\s+([a-z][a-z ]*)$"),
+]
+TOTAL_PATTERNS = [
+    re.compile(r"^(?:total|sum)(?:\s+(?:of|for|on|spent on|spending on))?\s+([a-z]+)(?:\s+(?:expenses?|spending))?$"),
+    re.compile(r"^how much (?:did|have) i (?:spend|spent) on ([a-z]+)$"),
+]
+HIGHEST = re.compile(r"^(?:show\s+)?(?:me\s+)?(?:my\s+)?(?:the\s+)?(?:highest|biggest|largest|max(?:imum)?)\s+expense$")
+LOWEST = re.compile(r"^(?:show\s+)?(?:me\s+)?(?:my\s+)?(?:the\s+)?(?:lowest|smallest|min(?:imum)?)\s+expense$")
+RECENT = re.compile(r"^(?:show\s+)?(?:me\s+)?(?:my\s+)?(?:the\s+)?(?:last|latest|recent)\s+(\d{1,3})\s+expenses$")
+DATE_RANGE = re.compile(
+    rf"^(?:show\s+)?(?:my\s+)?(?:([a-z]+)\s+)?(?:expenses|spending)\s+(?:from|between)\s+{ISO_DATE}\s+(?:to|and|until)\s+{ISO_DATE}$"
+)
+BY_CATEGORY = re.compile(r"^(?:total\s+)?(?:expenses|spending)\s+(?:by|per)\s+category$")
+GREETING = re.compile(r"^(?:hi|hello|hey|good (?:morning|afternoon|evening))(?:\s+there)?$")
+
+def detect_category(text: str):
+    """Return the single category named by `text`, or None if zero or several match."""
+    found = set()
+    for category, keywords in CATEGORY_KEYWORDS.items():
+        for keyword in keywords:
+            if re.search(rf"\b{re.escape(keyword)}\b", text):
+                found.add(category)
+                break
+    # "gas bill" is utilities even though "gas" alone means transport.
+    if {"utilities", "transport"} <= found and "bill" in text:
+        found.discard("transport")
+    return found.pop() if len(found) == 1 else None
+
+
+def valid_date(value: str):
+    try:
+        date.fromisoformat(value)
+        return True
+    except ValueError:
+        return False
+
+
+def match_candidates(text: str):
+    """Map normalized input to candidate (tool_name, args) pairs in preference order."""
+    for pattern in CREATE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            description = match.group(2).strip()
+            if DATE_WORDS & set(description.split()):
+                return []
+            category = detect_category(description)
+            if category is None:
+                return []
+            return [
+                (
+                    "create_expense",
+                    {
+                        "date": datetime.now().strftime("%Y-%m-%d"),
+                        "amount": float(match.group(1)),
+                        "category": category,
+                        "description": description,
+                    },
+                )
+            ]
+
+    for pattern in TOTAL_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            category = match.group(1)
+            if category not in CATEGORIES:
+                return []
+            return [
+                ("sum_expense", {"category": category}),
+                ("aggregate_sum_by_category", {"category": category}),
+            ]
+
+    if HIGHEST.match(text):
+        return [
+            ("highest_expense", {}),
+            ("get_limited_expenses", {"limit": 1, "order_by": "amount", "order": "DESC"}),
+        ]
+
+    if LOWEST.match(text):
+        return [
+            ("lowest_expense", {}),
+            ("get_limited_expenses", {"limit": 1, "order_by": "amount", "order": "ASC"}),
+        ]
+
+    match = RECENT.match(text)
+    if match:
+        limit = int(match.group(1))
+        return [
+            ("recent_expenses", {"limit": limit}),
+            ("get_limited_expenses", {"limit": limit, "order_by": "date", "order": "DESC"}),
+        ]
+
+    match = DATE_RANGE.match(text)
+    if match:
+        category, from_date, to_date = match.groups()
+        if not (valid_date(from_date) and valid_date(to_date)):
+            return []
+        if category is None:
+            return [
+                ("daterange_all_expenses", {"from_date": from_date, "to_date": to_date}),
+                ("get_expenses_by_date_range", {"start_date": from_date, "end_date": to_date}),
+            ]
+        if category not in CATEGORIES:
+            return []
+        return [
+            (
+                "daterange_category_expenses",
+                {"category": category, "from_date": from_date, "to_date": to_date},
+            ),
+            (
+                "get_expenses_by_date_range",
+                {"start_date": from_date, "end_date": to_date, "category": category},
+            ),
+        ]
+
+    if BY_CATEGORY.match(text):
+        return [("aggregate_sum_by_category", {}), ("category_percentage", {})]
+
+    if GREETING.match(text):
+        return [("greetings", {})]
+
+    return []
+
+
+def route_locally(normalized_input: str, tool_names):
+    """Return tool calls for a high-confidence input, or None to defer to the LLM.
+
+    `tool_names` is the set of tools currently bound; the first candidate whose
+    tool exists is used, so the rules work with either tool catalog.
+    """
+    for name, args in match_candidates(normalized_input):
+        if name in tool_names:
+            return [{"name": name, "args": args, "id": None, "type": "tool_call"}]
+    return None
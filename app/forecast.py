@@ -0,0 +1,223 @@
+import threading
+import time
+from datetime import date
+import numpy as np
+from app.storage import get_backend
+
+# Monthly spending forecasts per category, fitted on the (category x month)
+# matrix of `expense_rollups` totals. Every category, plus the overall total,
+# is fitted in one least-squares solve. The fitted parameters are cached and
+# refreshed only when a month closes or this process writes into a closed month.
+# As with the columnar cache, other processes' writes (and ingest.py) are
+# picked up when the next month closes.
+MAX_HORIZON = 24
+TREND_MIN_MONTHS = 6  # fit a linear trend from this much history
+SEASONAL_MIN_MONTHS = 24  # and month-of-year effects from two full years
+INTERVAL_Z = 1.96  # 95% prediction intervals
+
+ROLLUPS_BETWEEN = """
+    SELECT year, month, category, total
+    FROM expense_rollups
+    WHERE (year, month) > (%s, %s) AND (year, month) <= (%s, %s)
+"""
+ROLLUPS_MONTH = "SELECT year, month, category, total FROM expense_rollups WHERE year = %s AND month = %s"
+
+
+def month_index(year, month):
+    return int(year) * 12 + int(month) - 1
+
+
+def month_label(index):
+    return f"{index // 12}-{index % 12 + 1:02d}"
+
+
+def last_closed_month(today=None):
+    today = today or date.today()
+    return month_index(today.year, today.month) - 1
+
+
+def read_rollups(sql, params):
+    backend = get_backend()
+    with backend.connection() as conn:
+        cursor = conn.cursor()
+        try:
+            cursor.execute(backend.adapt(sql), params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+
+class SeasonalModel:
+    """Linear trend plus month-of-year dummies, fitted per category at once.
+
+    `matrix` holds monthly totals, one row per category and one column per
+    month from `start` to `last` (month indices). Months without expenses are 0.
+    """
+
+    def __init__(self, start, last):
+        self.start = start
+        self.last = last
+        self.categories = []
+        self.matrix = np.zeros((0, last - start + 1))
+        self._rows = {}
+
+    def set_totals(self, rows, months=None):
+        """Write (year, month, category, total) rows, first zeroing `months` (replaced months)."""
+        width = self.last - self.start + 1
+        if self.matrix.shape[1] < width:
+            grown = np.zeros((self.matrix.shape[0], width))
+            grown[:, : self.matrix.shape[1]] = self.matrix
+            self.matrix = grown
+        for month in months or ():
+            self.matrix[:, month - self.start] = 0.0
+        for year, month, category, total in rows:
+            row = self._rows.get(category)
+            if row is None:
+                row = self._rows[category] = len(self.categories)
+                self.categories.append(category)
+                self.matrix = np.vstack([self.matrix, np.zeros((1, width))])
+            self.matrix[row, month_index(year, month) - self.start] = float(total)
+
+    def design(self, indices):
+        t = (indices - self.start).astype(float)
+        columns = [np.ones(len(indices))]
+        if self.trend:
+            columns.append(t)
+        if self.seasonal:
+            month_of_year = indices % 12
+            columns += [(month_of_year == m).astype(float) for m in range(1, 12)]
+        return np.column_stack(columns)
+
+    def fit(self):
+        months = self.matrix.shape[1]
+        self.trend = months >= TREND_MIN_MONTHS
+        self.seasonal = months >= SEASONAL_MIN_MONTHS
+        X = self.design(np.arange(self.start, self.last + 1))
+        # One column per category, plus the overall total.
+        Y = np.vstack([self.matrix, self.matrix.sum(axis=0)]).T
+        self.coef, *_ = np.linalg.lstsq(X, Y, rcond=None)
+        residuals = Y - X @ self.coef
+        dof = max(months - X.shape[1], 1)
+        self.sigma = np.sqrt((residuals ** 2).sum(axis=0) / dof)
+        self.xtx_inv = np.linalg.pinv(X.T @ X)
+
+    def predict(self, horizon):
+        """(month indices, expected, low, high); the value arrays are horizon x (categories + 1)."""
+        indices = np.arange(self.last + 1, self.last + 1 + horizon)
+        X = self.design(indices)
+        expected = X @ self.coef
+        # Prediction-interval width grows as the months move away from the data.
+        spread = np.sqrt(1 + np.einsum("ij,jk,ik->i", X, self.xtx_inv, X))
+        half = INTERVAL_Z * spread[:, None] * self.sigma[None, :]
+        return (
+            indices,
+            np.clip(expected, 0, None),
+            np.clip(expected - half, 0, None),
+            np.clip(expected + half, 0, None),
+        )
+
+    @property
+    def method(self):
+        return "trend+seasonal" if self.seasonal else "trend" if self.trend else "mean"
+
+
+_model = None
+_dirty = set()
+_lock = threading.RLock()
+
+
+def load_model(last):
+    """Fit a fresh model on every closed month; None when there is no history."""
+    started = time.perf_counter()
+    rows = read_rollups(ROLLUPS_BETWEEN, (0, 0, last // 12, last % 12 + 1))
+    if not rows:
+        return None
+    model = SeasonalModel(min(month_index(year, month) for year, month, _, _ in rows), last)
+    model.set_totals(rows)
+    model.fit()
+    print(
+        f"Forecast model: {len(model.categories)} categories x {last - model.start + 1} "
+        f"months fitted in {(time.perf_counter() - started) * 1000:.1f} ms"
+    )
+    return model
+
+
+def refresh(model, last, dirty):
+    """Bring `model` up to `last`, re-reading only new and `dirty` months."""
+    if any(month < model.start for month in dirty):
+        return load_model(last)
+    previous = model.last
+    model.last = last
+    rows = []
+    if last > previous:
+        rows += read_rollups(
+            ROLLUPS_BETWEEN, (previous // 12, previous % 12 + 1, last // 12, last % 12 + 1)
+        )
+    for month in dirty:
+        rows += read_rollups(ROLLUPS_MONTH, (month // 12, month % 12 + 1))
+    model.set_totals(rows, months=dirty)
+    model.fit()
+    return model
+
+
+def get_model():
+    """The fitted model, refreshed if a month has closed or a closed month changed."""
+    global _model
+    last = last_closed_month()
+    with _lock:
+        dirty = {month for month in _dirty if month <= last}
+        _dirty.difference_update(dirty)
+        if _model is None:
+            _model = load_model(last)
+        elif last != _model.last or dirty:
+            _model = refresh(_model, last, dirty)
+        return _model
+
+
+def mark_dirty(dates):
+    """Note months written by this process so the next forecast re-reads them."""
+    if _model is None:
+        return
+    months = set()
+    for expense_date in dates:
+        if expense_date is None:
+            continue
+        if not isinstance(expense_date, date):
+            expense_date = date.fromisoformat(str(expense_date)[:10])
+        month = month_index(expense_date.year, expense_date.month)
+        if month <= _model.last:
+            months.add(month)
+    if months:
+        with _lock:
+            _dirty.update(months)
+
+
+def forecast(months_ahead):
+    """Per-category and total forecasts for the next `months_ahead` months, or None without history."""
+    horizon = max(1, min(int(months_ahead), MAX_HORIZON))
+    # The model is refreshed in place, so predict under the same lock.
+    with _lock:
+        model = get_model()
+        if model is None:
+            return None
+        indices, expected, low, high = model.predict(horizon)
+        categories = list(model.categories)
+        method, history_months = model.method, model.last - model.start + 1
+
+    def series(column):
+        return [
+            {
+                "month": month_label(int(month)),
+                "expected": round(float(expected[step, column]), 2),
+                "low": round(float(low[step, column]), 2),
+                "high": round(float(high[step, column]), 2),
+            }
+            for step, month in enumerate(indices)
+        ]
+
+    return {
+        "total": series(len(categories)),
+        "categories": {category: series(column) for column, category in enumerate(categories)},
+        "method": method,
+        "history_months": history_months,
+    }
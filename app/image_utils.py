@@ -0,0 +1,114 @@
+import asyncio
+import base64
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from PIL import Image
+from app.metrics import IMAGE_PREPROCESS_LATENCY, register_pool
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 10 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 40_000_000))
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", os.cpu_count() or 1))
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", IMAGE_WORKERS * 4))
+
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload exceeds the byte or pixel limits."""
+
+
+class ImageQueueFullError(RuntimeError):
+    """Raised when too many images are already waiting to be processed."""
+
+
+class ImagePoolBrokenError(RuntimeError):
+    """Raised when image workers keep dying, e.g. killed for running out of memory."""
+
+
+def preprocess_image(data: bytes, max_size: tuple = (800, 800)) -> str:
+    """Resize image bytes to fit within max_size and convert to base64 JPEG."""
+    image = Image.open(BytesIO(data))
+
+    # Image.open only parses the header, so this check runs before any decode.
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageTooLargeError(
+            f"Image is {width}x{height}; the limit is {MAX_IMAGE_PIXELS} pixels."
+        )
+
+    # For JPEGs, let the decoder downscale by 1/2-1/8 instead of decoding
+    # the full-resolution frame. No-op for other formats.
+    image.draft(image.mode, max_size)
+
+    # Convert to RGB if necessary (to handle PNGs with transparency)
+    if image.mode in ("RGBA", "P"):
+        image = image.convert("L")
+    elif image.mode not in ("RGB", "L", "CMYK"):
+        image = image.convert("RGB")
+
+    # Resize while maintaining aspect ratio
+    image.thumbnail(max_size)
+
+    # Save to bytes and encode to base64
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG", quality=80)
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+
+
+_pool = None
+_pending = 0
+register_pool("image", lambda: _pending, IMAGE_QUEUE_SIZE)
+
+
+def get_image_pool():
+    global _pool
+    if _pool is None:
+        # spawn keeps workers free of the parent's DB connections and threads.
+        _pool = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _pool
+
+
+def reset_image_pool(broken):
+    """Drop `broken` so the next call builds a fresh pool, unless another request already has."""
+    global _pool
+    if _pool is broken:
+        _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_image_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+async def preprocess_image_async(data: bytes, max_size: tuple = (800, 800)) -> str:
+    """Run `preprocess_image` in the process pool, rejecting work beyond the queue bound."""
+    global _pending
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise ImageTooLargeError(
+            f"Upload is {len(data)} bytes; the limit is {MAX_UPLOAD_BYTES} bytes."
+        )
+    if _pending >= IMAGE_QUEUE_SIZE:
+        raise ImageQueueFullError("Too many images are being processed; try again shortly.")
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        with IMAGE_PREPROCESS_LATENCY.time():
+            # A dead worker breaks the whole executor for good, so replace it
+            # and retry once; the image itself may be what killed the worker.
+            for _ in range(2):
+                pool = get_image_pool()
+                try:
+                    return await loop.run_in_executor(pool, preprocess_image, data, max_size)
+                except BrokenProcessPool:
+                    print("Image worker pool broke; starting a new one.")
+                    reset_image_pool(pool)
+        raise ImagePoolBrokenError("Image workers are restarting; try again shortly.")
+    finally:
+        _pending -= 1
@@ -1,53 +1,160 @@
 import os
 import re
+import copy
 import uuid
+import asyncio
+import contextvars
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from app.tool_factory import tools
-from app.db_utils import save_to_db
+from app.db_utils import save_to_db, async_save_to_db, async_save_many_to_db
+from app.cache import TTLCache
+from app.fast_router import route_locally
+from app.renderers import render_result
+from app.result_shaping import shape_result, RESULT_TOKEN_BUDGET
+from app.tool_selector import ToolSelector
+from app.metrics import (
+    LLM_LATENCY,
+    tool_context,
+    record_intents,
+    register_cache,
+)
+from app.receipt_parser import (
+    parse_receipt_text,
+    validate_expense,
+    CATEGORY_VALUES,
+)
 from langsmith import traceable
-from langchain_groq import ChatGroq
-from langchain.chat_models import init_chat_model
 from app.tool_factory import *
 
 API_KEY_GROQ = os.getenv("GROQ_API_KEY")
 
-llm = init_chat_model("llama-3.3-70b-versatile", model_provider="groq")
-llm_with_tools = llm.bind_tools(tools)
 
-llm_vision = ChatGroq(
-    api_key=API_KEY_GROQ, model="llama-3.2-90b-vision-preview", temperature=0.1
+# Chat clients are built on first use so that importing this module stays
+# cheap and offline; the provider packages are imported lazily for the same reason.
+@lru_cache(maxsize=1)
+def get_llm():
+    from langchain.chat_models import init_chat_model
+
+    return init_chat_model("llama-3.3-70b-versatile", model_provider="groq")
+
+
+@lru_cache(maxsize=1)
+def get_llm_with_tools():
+    return get_llm().bind_tools(tools)
+
+
+@lru_cache(maxsize=1)
+def get_llm_vision():
+    from langchain_groq import ChatGroq
+
+    return ChatGroq(
+        api_key=API_KEY_GROQ, model="llama-3.2-90b-vision-preview", temperature=0.1
+    )
+
+# Bind only the tools relevant to each input; TOOL_TOP_K=0 binds the full set.
+TOOL_TOP_K = int(os.getenv("TOOL_TOP_K", 6))
+tool_selector = ToolSelector(tools, top_k=TOOL_TOP_K)
+
+
+@lru_cache(maxsize=64)
+def bind_tool_subset(names: frozenset):
+    return get_llm().bind_tools([tool for tool in tools if tool.name in names])
+
+
+def select_llm_with_tools(user_input: str):
+    """Return (runnable, is_subset) for the intent call on `user_input`."""
+    if TOOL_TOP_K <= 0:
+        return get_llm_with_tools(), False
+    subset = tool_selector.select(user_input)
+    if subset is None:
+        return get_llm_with_tools(), False
+    return bind_tool_subset(frozenset(tool.name for tool in subset)), True
+
+
+# Upper bound on tool calls from one request that run at the same time.
+TOOL_CALL_WORKERS = int(os.getenv("TOOL_CALL_WORKERS", 4))
+tool_call_executor = ThreadPoolExecutor(
+    max_workers=TOOL_CALL_WORKERS, thread_name_prefix="tool-call"
+)
+
+# "llm" summarizes tool results with a second model call, "template" renders
+# them locally with app/renderers.py.
+RESPONSE_MODES = ("llm", "template")
+DEFAULT_RESPONSE_MODE = os.getenv("DEFAULT_RESPONSE_MODE", "llm")
+
+# Parsed tool calls keyed by (normalized input, current date): the prompt embeds
+# the date, so relative phrases like "last week" resolve differently each day.
+intent_cache = TTLCache(
+    maxsize=int(os.getenv("INTENT_CACHE_SIZE", 512)),
+    ttl=float(os.getenv("INTENT_CACHE_TTL", 600)),
+)
+register_cache("intent", lambda: (intent_cache.hits, intent_cache.misses))
+register_cache(
+    "tool_subset",
+    lambda: (bind_tool_subset.cache_info().hits, bind_tool_subset.cache_info().misses),
 )
 
 
 @traceable
 def route_request(
-    user_input: str = None, image_content: str = None, image_url: str = None
+    user_input: str = None,
+    image_content: str = None,
+    image_url: str = None,
+    response_mode: str = DEFAULT_RESPONSE_MODE,
 ):
     """Route the request to either add or search for expenses based on intent."""
 
     if image_content or image_url:
         return process_image_request(image_content, image_url)
 
-    return process_text_request(user_input)
+    return process_text_request(user_input, response_mode)
 
 
 @traceable
-def process_image_request(image_content: str, image_url: str):
-    """Handle image-based expense input."""
-    input_data = [
+async def async_route_request(
+    user_input: str = None,
+    image_content: str = None,
+    image_url: str = None,
+    response_mode: str = DEFAULT_RESPONSE_MODE,
+):
+    """Async variant of `route_request` that never blocks the event loop."""
+
+    if image_content or image_url:
+        return await async_process_image_request(image_content, image_url)
+
+    return await async_process_text_request(user_input, response_mode)
+
+
+# "structured" asks the vision model for JSON and validates it locally, calling
+# the tool model only when validation fails; "two_pass" always makes both calls.
+RECEIPT_EXTRACTION_MODE = os.getenv("RECEIPT_EXTRACTION_MODE", "structured")
+
+
+def build_image_input(image_content: str, image_url: str, structured: bool = False):
+    """Build the vision prompt for a receipt image."""
+    if structured:
+        instructions = (
+            "Extract the expense from this receipt. Reply with only a JSON object:\n"
+            '{"date": "YYYY-MM-DD", "amount": 23.45, '
+            f'"category": one of {CATEGORY_VALUES}, '
+            '"description": "short description"}'
+        )
+    else:
+        instructions = (
+            "Simply extract data from the image in the following format:\n"
+            "    date: str (e.g., '2023-10-01')\n"
+            "    amount: float (e.g., 23.45)\n"
+            "    category: str (e.g., 'Food')\n"
+            "    description: str (e.g., 'Lunch at restaurant')"
+        )
+
+    return [
         {
             "role": "user",
             "content": [
-                {
-                    "type": "text",
-                    "text": (
-                        "Simply extract data from the image in the following format:\n"
-                        "    date: str (e.g., '2023-10-01')\n"
-                        "    amount: float (e.g., 23.45)\n"
-                        "    category: str (e.g., 'Food')\n"
-                        "    description: str (e.g., 'Lunch at restaurant')"
-                    ),
-                },
+                {"type": "text", "text": instructions},
                 {
                     "type": "image_url",
                     "image_url": {
@@ -62,14 +169,14 @@ def process_image_request(image_content: str, image_url: str):
         }
     ]
 
-    expense_data_unstruct = llm_vision.invoke(input_data)
-    expense_data_dict = llm_with_tools.invoke(expense_data_unstruct.content)
 
+def extract_receipt_args(expense_data_dict):
+    """Pull `create_expense` args out of the tool-call response for a receipt."""
     if (
         not expense_data_dict.tool_calls
         or "args" not in expense_data_dict.tool_calls[0]
     ):
-        return {"intent": "wrong_receipt", "result": "Please upload a valid receipt."}
+        return None
 
     expense_data = expense_data_dict.tool_calls[0]["args"]
     print("Expense Data:", expense_data)
@@ -78,15 +185,84 @@ def process_image_request(image_content: str, image_url: str):
         r"\d{4}-\d{2}-\d{2}", expense_data["date"]
     ):
         expense_data["date"] = datetime.now().strftime("%Y-%m-%d")
+    return expense_data
+
+
+def parse_structured_receipt(content: str):
+    """Validate the vision model's JSON reply; None means fall back to the tool model."""
+    expense_data = validate_expense(parse_receipt_text(content))
+    if expense_data is not None:
+        print("Expense Data:", expense_data)
+    return expense_data
+
+
+@traceable
+def extract_receipt_expense(image_content: str, image_url: str):
+    """Return `create_expense` args for a receipt, or None if it can't be read."""
+    structured = RECEIPT_EXTRACTION_MODE == "structured"
+    with LLM_LATENCY.labels("llm_vision").time():
+        reply = get_llm_vision().invoke(
+            build_image_input(image_content, image_url, structured)
+        )
+
+    if structured:
+        expense_data = parse_structured_receipt(reply.content)
+        if expense_data is not None:
+            return expense_data
+
+    with LLM_LATENCY.labels("llm_with_tools").time():
+        return extract_receipt_args(get_llm_with_tools().invoke(reply.content))
+
+
+@traceable
+async def async_extract_receipt_expense(image_content: str, image_url: str):
+    """Async variant of `extract_receipt_expense`."""
+    structured = RECEIPT_EXTRACTION_MODE == "structured"
+    with LLM_LATENCY.labels("llm_vision").time():
+        reply = await get_llm_vision().ainvoke(
+            build_image_input(image_content, image_url, structured)
+        )
+
+    if structured:
+        expense_data = parse_structured_receipt(reply.content)
+        if expense_data is not None:
+            return expense_data
+
+    with LLM_LATENCY.labels("llm_with_tools").time():
+        return extract_receipt_args(await get_llm_with_tools().ainvoke(reply.content))
+
+
+WRONG_RECEIPT = {"intent": "wrong_receipt", "result": "Please upload a valid receipt."}
+
+
+@traceable
+def process_image_request(image_content: str, image_url: str):
+    """Handle image-based expense input."""
+    expense_data = extract_receipt_expense(image_content, image_url)
+    if expense_data is None:
+        return dict(WRONG_RECEIPT)
+
     return {"intent": "create_expense", "result": parse_expense_input(expense_data)}
 
 
 @traceable
-def process_text_request(user_input: str):
-    """Handle text-based expense input."""
-    current_date = datetime.now().strftime("%Y-%m-%d")
+async def async_process_image_request(image_content: str, image_url: str):
+    """Async variant of `process_image_request`."""
+    expense_data = await async_extract_receipt_expense(image_content, image_url)
+    if expense_data is None:
+        return dict(WRONG_RECEIPT)
+
+    return {
+        "intent": "create_expense",
+        "result": await async_parse_expense_input(expense_data),
+    }
+
 
-    user_input_with_date = (
+def build_text_prompt(user_input: str, current_date: str = None):
+    """Wrap the user input with the current date and routing instructions."""
+    current_date = current_date or datetime.now().strftime("%Y-%m-%d")
+
+    return (
         f"User Input: {user_input}"
         f"\n# Note: Current Date is: {current_date}"
         "\n# Instructions: (Don't use these instructions only for reference)"
@@ -97,64 +273,225 @@ def process_text_request(user_input: str):
         "\n- Disregard insignificant/irrelevant terms related to expenses."
     )
 
-    intent_response = llm_with_tools.invoke(user_input_with_date)
 
-    if not intent_response.tool_calls or len(intent_response.tool_calls) == 0:
-        return {
-            "intent": "unknown",
-            "result": "Could not determine intent. Please refine your input.",
-        }
+def normalize_input(user_input: str):
+    """Canonical form of the user input used as the intent cache key."""
+    return re.sub(r"\s+", " ", (user_input or "").strip().lower()).rstrip(" .!?")
 
-    # Process all tool calls returned by the LLM.
-    results = []
 
-    for tool_call in intent_response.tool_calls:
-        intent = tool_call["name"]
-        parsed_input = tool_call["args"]
+tool_names = {tool.name for tool in tools}
 
-        print("Intent:", intent)
-        print("Parsed Input:", parsed_input)
 
-        if intent == "create_expense":
-            result = parse_expense_input(parsed_input)
-        elif intent == "greetings":
-            result = greetings.invoke({})
-        elif intent in [tool.name for tool in tools]:
-            result = process_search_request(intent, user_input, parsed_input)
-        else:
-            result = f"Could not determine intent for {intent}. Please try again."
+def missed_tool(tool_calls):
+    """True when the model found no tool for the request: no calls, or only `unknown`."""
+    return not tool_calls or [tool_call["name"] for tool_call in tool_calls] == ["unknown"]
 
-        results.append({"user_input": user_input, "intent": intent, "result": result})
 
-    if len(results) == 1:
-        return results[0]
+def get_tool_calls(user_input: str):
+    """Return (tool_calls, path) for `user_input`.
+
+    `path` names what served the request: the local "fast" router, the intent
+    "cache", or the "llm".
+    """
+    normalized = normalize_input(user_input)
+    tool_calls = route_locally(normalized, tool_names)
+    if tool_calls is not None:
+        record_intents(tool_calls, "fast")
+        return tool_calls, "fast"
+
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    key = (normalized, current_date)
+
+    tool_calls = intent_cache.get(key)
+    if tool_calls is None:
+        prompt = build_text_prompt(user_input, current_date)
+        runnable, is_subset = select_llm_with_tools(user_input)
+        with LLM_LATENCY.labels("llm_with_tools").time():
+            tool_calls = runnable.invoke(prompt).tool_calls
+        if is_subset and missed_tool(tool_calls):
+            # The retriever may have missed the right tool; retry with all of them.
+            with LLM_LATENCY.labels("llm_with_tools").time():
+                tool_calls = get_llm_with_tools().invoke(prompt).tool_calls
+        if tool_calls:
+            intent_cache.set(key, copy.deepcopy(tool_calls))
+        record_intents(tool_calls, "llm")
+        return tool_calls, "llm"
+
+    # Callers mutate the args (e.g. parse_expense_input), so hand out a copy.
+    record_intents(tool_calls, "cache")
+    return copy.deepcopy(tool_calls), "cache"
+
+
+async def async_get_tool_calls(user_input: str):
+    """Async variant of `get_tool_calls`."""
+    normalized = normalize_input(user_input)
+    tool_calls = route_locally(normalized, tool_names)
+    if tool_calls is not None:
+        record_intents(tool_calls, "fast")
+        return tool_calls, "fast"
+
+    current_date = datetime.now().strftime("%Y-%m-%d")
+    key = (normalized, current_date)
+
+    tool_calls = intent_cache.get(key)
+    if tool_calls is None:
+        prompt = build_text_prompt(user_input, current_date)
+        runnable, is_subset = select_llm_with_tools(user_input)
+        with LLM_LATENCY.labels("llm_with_tools").time():
+            tool_calls = (await runnable.ainvoke(prompt)).tool_calls
+        if is_subset and missed_tool(tool_calls):
+            with LLM_LATENCY.labels("llm_with_tools").time():
+                tool_calls = (await get_llm_with_tools().ainvoke(prompt)).tool_calls
+        if tool_calls:
+            intent_cache.set(key, copy.deepcopy(tool_calls))
+        record_intents(tool_calls, "llm")
+        return tool_calls, "llm"
+
+    record_intents(tool_calls, "cache")
+    return copy.deepcopy(tool_calls), "cache"
+
+
+UNKNOWN_INTENT = {
+    "intent": "unknown",
+    "result": "Could not determine intent. Please refine your input.",
+}
+
+
+def build_multi_prompt(results: list):
+    """Ask the LLM to merge the results of several tool calls."""
+    # Split the budget so the merged prompt stays bounded as well.
+    budget = max(RESULT_TOKEN_BUDGET // max(len(results), 1), 100)
+    shaped = [
+        dict(item, result=shape_result(item["result"], budget)) for item in results
+    ]
+    return (
+        f"Result:\n {shaped} \n"
+        "\n# Instructions: (Don't use these instructions only for reference)"
+        "\n- Merge all tool calls into single meaningful concise response."
+        "\n- Disregard insignificant/irrelevant terms related to expenses."
+    )
+
+
+def merge_rendered(results: list):
+    """Join per-tool answers locally instead of asking the LLM to merge them."""
+    return "\n\n".join(
+        item["result"]
+        if isinstance(item["result"], str)
+        else render_result(item["intent"], item["result"])
+        for item in results
+    )
+
+
+def run_tool_call(tool_call: dict, user_input: str, response_mode: str):
+    """Execute one tool call and wrap its result."""
+    intent = tool_call["name"]
+    parsed_input = tool_call["args"]
+
+    print("Intent:", intent)
+    print("Parsed Input:", parsed_input)
+
+    if intent == "create_expense":
+        result = parse_expense_input(parsed_input)
+    elif intent == "greetings":
+        result = greetings.invoke({})
+    elif intent in tool_names:
+        result = process_search_request(intent, user_input, parsed_input, response_mode)
     else:
-        multi_prompt = (
-            f"Result:\n {results} \n"
-            "\n# Instructions: (Don't use these instructions only for reference)"
-            "\n- Merge all tool calls into single meaningful concise response."
-            "\n- Disregard insignificant/irrelevant terms related to expenses."
+        result = f"Could not determine intent for {intent}. Please try again."
+
+    return {"user_input": user_input, "intent": intent, "result": result}
+
+
+async def async_run_tool_call(tool_call: dict, user_input: str, response_mode: str):
+    """Async variant of `run_tool_call`."""
+    intent = tool_call["name"]
+    parsed_input = tool_call["args"]
+
+    print("Intent:", intent)
+    print("Parsed Input:", parsed_input)
+
+    if intent == "create_expense":
+        result = await async_parse_expense_input(parsed_input)
+    elif intent == "greetings":
+        result = await greetings.ainvoke({})
+    elif intent in tool_names:
+        result = await async_process_search_request(
+            intent, user_input, parsed_input, response_mode
         )
-        results = llm.invoke(multi_prompt)
-        return {"intent": "multi", "result": results.content}
+    else:
+        result = f"Could not determine intent for {intent}. Please try again."
+
+    return {"user_input": user_input, "intent": intent, "result": result}
 
 
 @traceable
-def process_search_request(intent: str, user_input: str, parsed_input: dict):
-    """Process a search request and return results."""
+def process_text_request(user_input: str, response_mode: str = DEFAULT_RESPONSE_MODE):
+    """Handle text-based expense input."""
+    tool_calls, path = get_tool_calls(user_input)
 
-    tool_function = next((tool for tool in tools if tool.name == intent), None)
+    if not tool_calls:
+        return dict(UNKNOWN_INTENT, path=path)
 
-    if not tool_function:
-        return f"Invalid intent: {intent}"
+    # Process all tool calls returned by the LLM. Independent calls run
+    # concurrently; futures are read back in tool-call order.
+    if len(tool_calls) == 1:
+        results = [run_tool_call(tool_calls[0], user_input, response_mode)]
+    else:
+        futures = [
+            tool_call_executor.submit(
+                contextvars.copy_context().run,
+                run_tool_call,
+                tool_call,
+                user_input,
+                response_mode,
+            )
+            for tool_call in tool_calls
+        ]
+        results = [future.result() for future in futures]
+
+    if len(results) == 1:
+        return dict(results[0], path=path)
+    elif response_mode == "template":
+        return {"intent": "multi", "result": merge_rendered(results), "path": path}
+    else:
+        with LLM_LATENCY.labels("llm").time():
+            results = get_llm().invoke(build_multi_prompt(results))
+        return {"intent": "multi", "result": results.content, "path": path}
 
-    result_response = tool_function.invoke(parsed_input)
 
-    if not result_response:
-        return "No results found."
+@traceable
+async def async_process_text_request(
+    user_input: str, response_mode: str = DEFAULT_RESPONSE_MODE
+):
+    """Async variant of `process_text_request`."""
+    tool_calls, path = await async_get_tool_calls(user_input)
+
+    if not tool_calls:
+        return dict(UNKNOWN_INTENT, path=path)
+
+    semaphore = asyncio.Semaphore(TOOL_CALL_WORKERS)
+
+    async def bounded(tool_call):
+        async with semaphore:
+            return await async_run_tool_call(tool_call, user_input, response_mode)
 
-    final_search_prompt = (
-        f"Result: \n {result_response} \n"
+    # gather() returns results in tool-call order.
+    results = await asyncio.gather(*(bounded(tool_call) for tool_call in tool_calls))
+
+    if len(results) == 1:
+        return dict(results[0], path=path)
+    elif response_mode == "template":
+        return {"intent": "multi", "result": merge_rendered(results), "path": path}
+    else:
+        with LLM_LATENCY.labels("llm").time():
+            results = await get_llm().ainvoke(build_multi_prompt(list(results)))
+        return {"intent": "multi", "result": results.content, "path": path}
+
+
+def build_search_prompt(result_response, user_input: str):
+    """Ask the LLM to explain a tool result in terms of the user's question."""
+    return (
+        f"Result: \n {shape_result(result_response)} \n"
         f"# Note: initial_user_input: '{user_input}'."
         "# Instructions: (Explain concisely in general language)"
         "\n- Final Reponse must be relavant to the 'initial_user_input'."
@@ -162,7 +499,32 @@ def process_search_request(intent: str, user_input: str, parsed_input: dict):
         "\n- Disregard insignificant/irrelevant terms related to expenses."
     )
 
-    result = llm.invoke(final_search_prompt)
+
+@traceable
+def process_search_request(
+    intent: str,
+    user_input: str,
+    parsed_input: dict,
+    response_mode: str = DEFAULT_RESPONSE_MODE,
+):
+    """Process a search request and return results."""
+
+    tool_function = next((tool for tool in tools if tool.name == intent), None)
+
+    if not tool_function:
+        return f"Invalid intent: {intent}"
+
+    with tool_context(intent):
+        result_response = tool_function.invoke(parsed_input)
+
+    if not result_response:
+        return "No results found."
+
+    if response_mode == "template":
+        return render_result(intent, result_response, parsed_input)
+
+    with LLM_LATENCY.labels("llm").time():
+        result = get_llm().invoke(build_search_prompt(result_response, user_input))
 
     # result_content = clean_llm_response(result.content)
     # return result_content.strip()
@@ -170,6 +532,112 @@ def process_search_request(intent: str, user_input: str, parsed_input: dict):
     return result.content
 
 
+@traceable
+async def async_process_search_request(
+    intent: str,
+    user_input: str,
+    parsed_input: dict,
+    response_mode: str = DEFAULT_RESPONSE_MODE,
+):
+    """Async variant of `process_search_request`."""
+
+    tool_function = next((tool for tool in tools if tool.name == intent), None)
+
+    if not tool_function:
+        return f"Invalid intent: {intent}"
+
+    # Sync tools are dispatched to a worker thread by `ainvoke`.
+    with tool_context(intent):
+        result_response = await tool_function.ainvoke(parsed_input)
+
+    if not result_response:
+        return "No results found."
+
+    if response_mode == "template":
+        return render_result(intent, result_response, parsed_input)
+
+    with LLM_LATENCY.labels("llm").time():
+        result = await get_llm().ainvoke(build_search_prompt(result_response, user_input))
+
+    return result.content
+
+
+async def astream_text_request(
+    user_input: str, response_mode: str = DEFAULT_RESPONSE_MODE
+):
+    """Yield (event, data) pairs for a text request as each stage finishes.
+
+    Events: "intent" once the tool calls are known, one "result" per tool with
+    its raw output, "token" chunks of the final answer, then "done".
+    """
+    tool_calls, path = await async_get_tool_calls(user_input)
+
+    yield "intent", {
+        "intents": [tool_call["name"] for tool_call in tool_calls or []],
+        "path": path,
+    }
+
+    if not tool_calls:
+        yield "token", UNKNOWN_INTENT["result"]
+        yield "done", {"intent": "unknown"}
+        return
+
+    semaphore = asyncio.Semaphore(TOOL_CALL_WORKERS)
+
+    async def run_raw(tool_call):
+        intent = tool_call["name"]
+        parsed_input = tool_call["args"]
+        async with semaphore:
+            if intent == "create_expense":
+                return await async_parse_expense_input(parsed_input)
+            if intent in tool_names:
+                tool_function = next(tool for tool in tools if tool.name == intent)
+                with tool_context(intent):
+                    return await tool_function.ainvoke(parsed_input)
+        return f"Could not determine intent for {intent}. Please try again."
+
+    # All tools start at once; results are emitted in tool-call order.
+    tasks = [asyncio.create_task(run_raw(tool_call)) for tool_call in tool_calls]
+    results = []
+    try:
+        for tool_call, task in zip(tool_calls, tasks):
+            result = await task
+            intent = tool_call["name"]
+            results.append(
+                {"user_input": user_input, "intent": intent, "result": result}
+            )
+            yield "result", {"intent": intent, "args": tool_call["args"], "result": result}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if len(results) == 1:
+        intent, result = results[0]["intent"], results[0]["result"]
+        if intent not in tool_names or intent in ("create_expense", "greetings"):
+            # Nothing to summarize, as in process_text_request.
+            if not isinstance(result, str):
+                result = render_result(intent, result)
+            yield "token", result
+        elif not result:
+            yield "token", "No results found."
+        elif response_mode == "template":
+            yield "token", render_result(intent, result, tool_calls[0]["args"])
+        else:
+            with LLM_LATENCY.labels("llm").time():
+                async for chunk in get_llm().astream(build_search_prompt(result, user_input)):
+                    if chunk.content:
+                        yield "token", chunk.content
+    elif response_mode == "template":
+        yield "token", merge_rendered(results)
+    else:
+        with LLM_LATENCY.labels("llm").time():
+            async for chunk in get_llm().astream(build_multi_prompt(results)):
+                if chunk.content:
+                    yield "token", chunk.content
+
+    yield "done", {"intent": results[0]["intent"] if len(results) == 1 else "multi"}
+
+
 # def clean_llm_response(response: str):
 #     """Remove unwanted XML tags from LLM response."""
 
@@ -188,13 +656,47 @@ def parse_expense_input(expense_data: dict):
 
     expense_data.setdefault("date", datetime.now().strftime("%Y-%m-%d"))
     expense_data["id"] = uuid.uuid4().hex
-    save_to_db(expense_data)
+    with tool_context("create_expense"):
+        save_to_db(expense_data)
 
     return expense_data
 
 
+@traceable
+async def async_parse_expense_input(expense_data: dict):
+    """Async variant of `parse_expense_input`."""
+
+    expense_data.setdefault("date", datetime.now().strftime("%Y-%m-%d"))
+    expense_data["id"] = uuid.uuid4().hex
+    with tool_context("create_expense"):
+        await async_save_to_db(expense_data)
+
+    return expense_data
+
+
+async def async_extract_text_expense(user_input: str):
+    """Return `create_expense` args for one line of text, or None if it isn't an expense."""
+    tool_calls, _ = await async_get_tool_calls(user_input)
+    for tool_call in tool_calls or []:
+        if tool_call["name"] == "create_expense":
+            expense_data = tool_call["args"]
+            expense_data.setdefault("date", datetime.now().strftime("%Y-%m-%d"))
+            return expense_data
+    return None
+
+
+async def async_save_expenses(expenses: list):
+    """Assign ids and store many expenses in one transaction."""
+    for expense_data in expenses:
+        expense_data["id"] = uuid.uuid4().hex
+    with tool_context("create_expense"):
+        await async_save_many_to_db(expenses)
+    return expenses
+
+
 @traceable
 def get_from_pgdb(query: str):
     """Retrieve expense data from the database."""
 
-    return llm_with_tools.invoke(query)
+    with LLM_LATENCY.labels("llm_with_tools").time():
+        return get_llm_with_tools().invoke(query)
@@ -0,0 +1,69 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram
+
+LLM_LATENCY = Histogram(
+    "llm_call_duration_seconds",
+    "Latency of chat model calls, by model.",
+    ["model"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64),
+)
+
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Latency of database queries, by the tool that issued them.",
+    ["tool"],
+)
+
+IMAGE_PREPROCESS_LATENCY = Histogram(
+    "image_preprocess_duration_seconds",
+    "Time to resize and encode an uploaded receipt, including pool wait.",
+)
+
+INTENTS = Counter(
+    "intent_requests_total",
+    "Tool calls chosen for text requests, by intent and routing path.",
+    ["intent", "path"],
+)
+
+POOL_IN_USE = Gauge("pool_in_use", "Busy slots in a worker or connection pool.", ["pool"])
+POOL_CAPACITY = Gauge("pool_capacity", "Total slots in a worker or connection pool.", ["pool"])
+
+CACHE_HITS = Gauge("cache_hits", "Cache hits since startup.", ["cache"])
+CACHE_MISSES = Gauge("cache_misses", "Cache misses since startup.", ["cache"])
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Cache hits / lookups since startup.", ["cache"])
+
+# The tool currently running, so db_utils can label queries without every
+# tool having to pass its own name down.
+current_tool = ContextVar("current_tool", default="none")
+
+
+@contextmanager
+def tool_context(name: str):
+    token = current_tool.set(name)
+    try:
+        yield
+    finally:
+        current_tool.reset(token)
+
+
+def record_intents(tool_calls, path: str):
+    for tool_call in tool_calls or [{"name": "unknown"}]:
+        INTENTS.labels(tool_call["name"], path).inc()
+
+
+def register_cache(name: str, stats):
+    """Export a cache's counters; `stats()` returns (hits, misses)."""
+
+    def ratio():
+        hits, misses = stats()
+        return hits / (hits + misses) if hits + misses else 0.0
+
+    CACHE_HITS.labels(name).set_function(lambda: stats()[0])
+    CACHE_MISSES.labels(name).set_function(lambda: stats()[1])
+    CACHE_HIT_RATIO.labels(name).set_function(ratio)
+
+
+def register_pool(name: str, in_use, capacity: int):
+    POOL_IN_USE.labels(name).set_function(in_use)
+    POOL_CAPACITY.labels(name).set(capacity)
@@ -0,0 +1,222 @@
+from datetime import datetime
+from app.storage.base import dialect_sql, qmark
+
+# Ordered schema migrations: (version, description, statements).
+# Append new entries; never edit one that has already shipped. A statement is
+# either portable SQL or a {dialect: sql} dict where Postgres and SQLite differ.
+MIGRATIONS = [
+    (
+        1,
+        "create expenses table",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS expenses (
+                id TEXT PRIMARY KEY,
+                date DATE,
+                amount REAL,
+                category TEXT,
+                description TEXT
+            )
+            """,
+        ],
+    ),
+    (
+        2,
+        "index expenses for category/date filters and amount ordering",
+        [
+            # Tools compare `category` directly, so keep it stored lowercase.
+            "UPDATE expenses SET category = LOWER(category) WHERE category <> LOWER(category)",
+            "CREATE INDEX IF NOT EXISTS idx_expenses_category_date ON expenses (category, date)",
+            "CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date)",
+            "CREATE INDEX IF NOT EXISTS idx_expenses_amount ON expenses (amount)",
+        ],
+    ),
+    (
+        3,
+        "create monthly/category rollup table",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS expense_rollups (
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                category TEXT NOT NULL,
+                count BIGINT NOT NULL,
+                total DOUBLE PRECISION NOT NULL,
+                min_amount REAL,
+                max_amount REAL,
+                PRIMARY KEY (year, month, category)
+            )
+            """,
+            {
+                "postgres": """
+                INSERT INTO expense_rollups (year, month, category, count, total, min_amount, max_amount)
+                SELECT EXTRACT(YEAR FROM date)::INTEGER,
+                       EXTRACT(MONTH FROM date)::INTEGER,
+                       category,
+                       COUNT(*),
+                       SUM(amount::DOUBLE PRECISION),
+                       MIN(amount),
+                       MAX(amount)
+                FROM expenses
+                WHERE date IS NOT NULL AND category IS NOT NULL
+                GROUP BY 1, 2, 3
+                ON CONFLICT (year, month, category) DO NOTHING
+                """,
+                "sqlite": """
+                INSERT INTO expense_rollups (year, month, category, count, total, min_amount, max_amount)
+                SELECT CAST(strftime('%Y', date) AS INTEGER),
+                       CAST(strftime('%m', date) AS INTEGER),
+                       category,
+                       COUNT(*),
+                       SUM(amount),
+                       MIN(amount),
+                       MAX(amount)
+                FROM expenses
+                WHERE date IS NOT NULL AND category IS NOT NULL
+                GROUP BY 1, 2, 3
+                ON CONFLICT (year, month, category) DO NOTHING
+                """,
+            },
+            "CREATE INDEX IF NOT EXISTS idx_expense_rollups_category ON expense_rollups (category)",
+        ],
+    ),
+    (
+        4,
+        "index expenses for keyset pagination",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_expenses_date_id ON expenses (date, id)",
+        ],
+    ),
+    (
+        5,
+        "add per-category running statistics and anomaly scores",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS category_stats (
+                category TEXT PRIMARY KEY,
+                count BIGINT NOT NULL,
+                mean DOUBLE PRECISION NOT NULL,
+                m2 DOUBLE PRECISION NOT NULL
+            )
+            """,
+            "ALTER TABLE expenses ADD COLUMN anomaly_score REAL",
+            {
+                "postgres": """
+                INSERT INTO category_stats (category, count, mean, m2)
+                SELECT category,
+                       COUNT(*),
+                       AVG(amount::DOUBLE PRECISION),
+                       VAR_POP(amount::DOUBLE PRECISION) * COUNT(*)
+                FROM expenses
+                WHERE amount IS NOT NULL AND category IS NOT NULL
+                GROUP BY category
+                ON CONFLICT (category) DO NOTHING
+                """,
+                "sqlite": """
+                INSERT INTO category_stats (category, count, mean, m2)
+                SELECT category,
+                       COUNT(*),
+                       AVG(amount),
+                       MAX(SUM(amount * amount) - SUM(amount) * SUM(amount) / COUNT(*), 0)
+                FROM expenses
+                WHERE amount IS NOT NULL AND category IS NOT NULL
+                GROUP BY category
+                ON CONFLICT (category) DO NOTHING
+                """,
+            },
+            # Existing rows are scored against their category's final statistics;
+            # new ones against the statistics at insert time. 5 is MIN_SAMPLES.
+            """
+            UPDATE expenses
+            SET anomaly_score = (expenses.amount - s.mean) / SQRT(s.m2 / (s.count - 1))
+            FROM category_stats s
+            WHERE s.category = expenses.category AND s.count >= 5 AND s.m2 > 0
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_expenses_anomaly_score ON expenses (anomaly_score)",
+        ],
+    ),
+    (
+        6,
+        "add description keys and recurring payment series",
+        [
+            # Filled in by app.recurrence.backfill, which needs Python's normalization.
+            "ALTER TABLE expenses ADD COLUMN description_key TEXT",
+            """
+            CREATE INDEX IF NOT EXISTS idx_expenses_description_key_date
+            ON expenses (description_key, date)
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS recurring_series (
+                description_key TEXT PRIMARY KEY,
+                category TEXT,
+                cadence TEXT NOT NULL,
+                period_days DOUBLE PRECISION NOT NULL,
+                occurrences INTEGER NOT NULL,
+                mean_amount DOUBLE PRECISION NOT NULL,
+                amount_cv DOUBLE PRECISION NOT NULL,
+                interval_cv DOUBLE PRECISION NOT NULL,
+                first_date DATE NOT NULL,
+                last_date DATE NOT NULL,
+                next_date DATE NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_recurring_series_category ON recurring_series (category)",
+        ],
+    ),
+]
+
+# Arbitrary key so concurrently starting workers apply migrations one at a time.
+MIGRATION_LOCK_ID = 7316402
+
+
+def applied_versions(cursor):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+        """
+    )
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(conn, dialect: str = "postgres"):
+    """Apply all pending migrations in order.
+
+    On Postgres each migration commits on its own; on SQLite the run is one transaction.
+    """
+    cursor = conn.cursor()
+    if dialect == "postgres":
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+    else:
+        # SQLite has no advisory locks. Its DDL is transactional, so one
+        # IMMEDIATE transaction holds the write lock for the whole run instead.
+        cursor.execute("BEGIN IMMEDIATE")
+    try:
+        done = applied_versions(cursor)
+        if dialect == "postgres":
+            conn.commit()
+
+        for version, description, statements in MIGRATIONS:
+            if version in done:
+                continue
+            for statement in statements:
+                cursor.execute(dialect_sql(statement, dialect))
+            insert = "INSERT INTO schema_migrations (version, description, applied_at) VALUES (%s, %s, %s)"
+            cursor.execute(
+                insert if dialect == "postgres" else qmark(insert),
+                (version, description, datetime.now()),
+            )
+            if dialect == "postgres":
+                conn.commit()
+            print(f"Applied migration {version}: {description}")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if dialect == "postgres":
+            cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+        conn.commit()
@@ -0,0 +1,86 @@
+import base64
+import json
+from datetime import date
+from app.db_utils import db_query
+from app.statements import EXPENSE_COLUMNS
+
+# Keyset ("seek") pagination: each page continues after the last row's
+# (sort value, id) instead of using OFFSET, so page N costs the same as page 1
+# and rows inserted meanwhile don't shift later pages.
+SORT_COLUMNS = {"date", "amount", "category", "description"}
+MAX_PAGE_SIZE = 500
+# A token carries a JSON float, which Postgres binds as float8. Compared with
+# the REAL (float4) column, a value like 19.99 would no longer equal the row it
+# came from, so the boundary row could be skipped or repeated.
+TOKEN_CASTS = {"amount": "CAST(%s AS REAL)"}
+
+
+class InvalidPageToken(ValueError):
+    """Raised for a page token that is malformed or was issued for another sort."""
+
+
+def encode_page_token(row: dict, order_by: str, order: str) -> str:
+    value = row[order_by]
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = {"v": value, "id": row["id"], "by": order_by, "o": order}
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+
+
+def decode_page_token(token: str, order_by: str, order: str):
+    """Return the (sort value, id) to continue after."""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(token.encode()))
+        value, last_id = payload["v"], payload["id"]
+        issued_for = (payload["by"], payload["o"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidPageToken("Malformed page token.")
+    if issued_for != (order_by, order):
+        raise InvalidPageToken("Page token was issued for a different sort order.")
+    return value, last_id
+
+
+def fetch_page(
+    where: str = "",
+    params: tuple = (),
+    order_by: str = "date",
+    order: str = "DESC",
+    page_size: int = 50,
+    page_token: str = None,
+    columns: str = EXPENSE_COLUMNS,
+):
+    """Return (rows, next_page_token) for one page of `expenses`.
+
+    `where` is a condition with %s placeholders bound from `params`. Rows are
+    ordered by (order_by, id), which idx_expenses_date_id serves for dates.
+    `next_page_token` is None on the last page.
+    """
+    order = order.upper()
+    if order_by not in SORT_COLUMNS:
+        raise ValueError(f"Cannot sort by {order_by!r}.")
+    if order not in ("ASC", "DESC"):
+        raise ValueError(f"Invalid order {order!r}.")
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+    conditions = [f"({where})"] if where else []
+    params = list(params)
+    if page_token:
+        value, last_id = decode_page_token(page_token, order_by, order)
+        placeholder = TOKEN_CASTS.get(order_by, "%s")
+        conditions.append(
+            f"({order_by}, id) {'<' if order == 'DESC' else '>'} ({placeholder}, %s)"
+        )
+        params += [value, last_id]
+
+    query = f"SELECT {columns} FROM expenses"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    # One extra row tells us whether another page exists.
+    query += f" ORDER BY {order_by} {order}, id {order} LIMIT %s"
+    params.append(page_size + 1)
+
+    rows = db_query(query, tuple(params))
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_page_token(rows[-1], order_by, order)
@@ -0,0 +1,103 @@
+import json
+import re
+from datetime import datetime
+from app.tool_factory import Category
+from app.fast_router import detect_category
+
+CATEGORY_VALUES = [category.value for category in Category]
+
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%m/%d/%Y", "%d-%m-%Y", "%d.%m.%Y", "%b %d, %Y", "%d %b %Y")
+
+FIELD_LINE = re.compile(
+    r"^[\s\-*•]*\"?(date|amount|total|category|description)\"?\s*[:=]\s*(.+?)\s*,?$",
+    re.IGNORECASE,
+)
+
+
+def parse_receipt_text(text: str):
+    """Pull date/amount/category/description out of a vision-model reply.
+
+    Accepts a JSON object anywhere in the reply, or `key: value` lines.
+    """
+    text = text or ""
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    if match:
+        try:
+            data = json.loads(match.group(0))
+            if isinstance(data, dict):
+                return {str(key).lower(): value for key, value in data.items()}
+        except json.JSONDecodeError:
+            pass
+
+    data = {}
+    for line in text.splitlines():
+        field = FIELD_LINE.match(line)
+        if field:
+            key = field.group(1).lower()
+            key = "amount" if key == "total" else key
+            data.setdefault(key, field.group(2).strip().strip("'\""))
+    return data
+
+
+def parse_date(value):
+    value = str(value).strip()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def parse_amount(value):
+    if isinstance(value, (int, float)):
+        amount = float(value)
+    else:
+        cleaned = re.sub(r"[^\d.,-]", "", str(value))
+        # "1.234,56" -> European decimal comma; otherwise commas are thousands separators.
+        if re.fullmatch(r"-?\d{1,3}(\.\d{3})*,\d{1,2}", cleaned):
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            cleaned = cleaned.replace(",", "")
+        try:
+            amount = float(cleaned)
+        except ValueError:
+            return None
+    return round(amount, 2) if amount > 0 else None
+
+
+def parse_category(value, description: str = ""):
+    category = str(value or "").strip().lower()
+    if category in CATEGORY_VALUES:
+        return category
+    return detect_category(category) or detect_category(description.lower())
+
+
+def validate_expense(data: dict):
+    """Return normalized `create_expense` args, or None if the data fails validation.
+
+    A missing date defaults to today, as in the two-call path; a date that is
+    present but unreadable fails validation.
+    """
+    amount = parse_amount(data.get("amount"))
+    if amount is None:
+        return None
+
+    description = str(data.get("description") or "").strip()
+    category = parse_category(data.get("category"), description)
+    if category is None:
+        return None
+
+    if data.get("date"):
+        expense_date = parse_date(data["date"])
+        if expense_date is None:
+            return None
+    else:
+        expense_date = datetime.now().strftime("%Y-%m-%d")
+
+    return {
+        "date": expense_date,
+        "amount": amount,
+        "category": category,
+        "description": description or category,
+    }
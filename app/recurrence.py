@@ -0,0 +1,213 @@
+import re
+from collections import Counter, deque
+from datetime import date, timedelta
+import numpy as np
+from app.storage import get_backend
+from app.storage.base import execute_values, qmark
+
+# Recurring payments (phone bill, gym, streaming) are found per normalized
+# description: expenses sharing a `description_key` whose gaps match a cadence
+# and whose amounts barely move. Detected series live in `recurring_series`,
+# so `recurring_expenses` is an index read. Each key is judged on its latest
+# RECENT_OCCURRENCES expenses, so a save costs the same however long the key's
+# history is, and a payment is described by what it does now. Inserts re-check
+# only the keys they touch; `rebuild` redoes everything in one ordered pass.
+MIN_OCCURRENCES = 3
+RECENT_OCCURRENCES = 24  # two years of a monthly bill
+REGULAR_SHARE = 0.75  # share of gaps that must match the cadence
+AMOUNT_CV_MAX = 0.25  # max std/mean of the amounts
+CADENCES = [
+    # (name, days, tolerance in days)
+    ("weekly", 7, 2),
+    ("biweekly", 14, 3),
+    ("monthly", 30, 4),
+    ("quarterly", 91, 10),
+    ("yearly", 365, 20),
+]
+REBUILD_BATCH_SIZE = 10000
+
+NOISE = re.compile(r"[^a-z]+")
+
+RECENT_ROWS = """
+    SELECT date, amount, category FROM expenses
+    WHERE description_key = %s
+    ORDER BY date DESC
+    LIMIT %s
+"""
+SERIES_COLUMNS = (
+    "description_key", "category", "cadence", "period_days", "occurrences", "mean_amount",
+    "amount_cv", "interval_cv", "first_date", "last_date", "next_date",
+)
+SERIES_UPSERT = f"""
+    INSERT INTO recurring_series ({", ".join(SERIES_COLUMNS)})
+    VALUES %s
+    ON CONFLICT (description_key) DO UPDATE SET
+        {", ".join(f"{column} = EXCLUDED.{column}" for column in SERIES_COLUMNS[1:])}
+"""
+
+
+def description_key(description):
+    """Lowercase words only, so "Netflix 03/2024" and "netflix #04" group together.
+
+    "" when nothing is left; such expenses never form a series.
+    """
+    return " ".join(NOISE.sub(" ", (description or "").lower()).split())
+
+
+def as_date(value):
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def detect(key, rows):
+    """A recurring_series row for one key's (date, amount, category) rows in date order, or None.
+
+    `occurrences` and `first_date` describe the rows given, i.e. the recent window.
+    """
+    rows = [row for row in rows if row[0] is not None and row[1] is not None]
+    if len(rows) < MIN_OCCURRENCES:
+        return None
+    dates = [as_date(row[0]) for row in rows]
+    days = np.array([d.toordinal() for d in dates])
+    gaps = np.diff(days)
+    gaps = gaps[gaps > 0]  # several on one day count as one occurrence
+    if len(gaps) < MIN_OCCURRENCES - 1:
+        return None
+
+    period = float(np.median(gaps))
+    for cadence, cadence_days, tolerance in CADENCES:
+        if abs(period - cadence_days) <= tolerance:
+            break
+    else:
+        return None
+    if np.mean(np.abs(gaps - cadence_days) <= tolerance) < REGULAR_SHARE:
+        return None
+
+    amounts = np.array([float(row[1]) for row in rows])
+    mean_amount = float(amounts.mean())
+    if mean_amount <= 0:
+        return None
+    amount_cv = float(amounts.std() / mean_amount)
+    if amount_cv > AMOUNT_CV_MAX:
+        return None
+
+    category = Counter(row[2] for row in rows).most_common(1)[0][0]
+    return (
+        key,
+        category,
+        cadence,
+        period,
+        len(rows),
+        round(mean_amount, 2),
+        round(amount_cv, 4),
+        round(float(gaps.std() / gaps.mean()), 4),
+        dates[0],
+        dates[-1],
+        dates[-1] + timedelta(days=round(period)),
+    )
+
+
+def _sql(sql, dialect):
+    return sql if dialect == "postgres" else qmark(sql)
+
+
+def refresh_series(cursor, keys, dialect: str = "postgres"):
+    """Re-detect the series for `keys` on the caller's transaction (after inserting their rows).
+
+    Each key reads at most RECENT_OCCURRENCES rows, newest first, from the end
+    of its idx_expenses_description_key_date range.
+    """
+    keys = sorted({key for key in keys if key})
+    found = []
+    for key in keys:
+        cursor.execute(_sql(RECENT_ROWS, dialect), (key, RECENT_OCCURRENCES))
+        series = detect(key, cursor.fetchall()[::-1])
+        if series is None:
+            cursor.execute(
+                _sql("DELETE FROM recurring_series WHERE description_key = %s", dialect), (key,)
+            )
+        else:
+            found.append(series)
+    execute_values(cursor, SERIES_UPSERT, found, dialect)
+
+
+def fill_description_keys(conn, dialect: str = "postgres", batch_size=REBUILD_BATCH_SIZE):
+    """Set `description_key` on rows written before it existed; returns how many."""
+    cursor = conn.cursor()
+    select = _sql(
+        """
+        SELECT id, description FROM expenses
+        WHERE id > %s AND description_key IS NULL
+        ORDER BY id
+        LIMIT %s
+        """,
+        dialect,
+    )
+    update = _sql("UPDATE expenses SET description_key = %s WHERE id = %s", dialect)
+    last_id, filled = "", 0
+    while True:
+        cursor.execute(select, (last_id, batch_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return filled
+        cursor.executemany(update, [(description_key(text), row_id) for row_id, text in rows])
+        filled += len(rows)
+        last_id = rows[-1][0]
+
+
+def rebuild(conn, dialect: str = "postgres", batch_size=REBUILD_BATCH_SIZE):
+    """Recompute every series in one pass over expenses ordered by (description_key, date).
+
+    Only each key's latest RECENT_OCCURRENCES rows are kept, as in `refresh_series`.
+    """
+    fill_description_keys(conn, dialect, batch_size)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM recurring_series")
+
+    found = []
+    key, group = None, []
+
+    def close_group():
+        series = detect(key, group)
+        if series is not None:
+            found.append(series)
+
+    count = 0
+    for rows in get_backend().iter_batches(
+        conn,
+        """
+        SELECT description_key, date, amount, category FROM expenses
+        WHERE description_key <> ''
+        ORDER BY description_key, date
+        """,
+        batch_size,
+    ):
+        for row_key, expense_date, amount, category in rows:
+            if row_key != key:
+                close_group()
+                key, group = row_key, deque(maxlen=RECENT_OCCURRENCES)
+            group.append((expense_date, amount, category))
+        if len(found) >= batch_size:
+            execute_values(cursor, SERIES_UPSERT, found, dialect)
+            count += len(found)
+            found = []
+    close_group()
+    execute_values(cursor, SERIES_UPSERT, found, dialect)
+    return count + len(found)
+
+
+def backfill(conn, dialect: str = "postgres"):
+    """Build the series once for rows that predate `description_key`; call at startup."""
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM expenses WHERE description_key IS NULL LIMIT 1")
+    if cursor.fetchone() is None:
+        return
+    print(f"Recurring payments: {rebuild(conn, dialect)} series detected")
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    backend = get_backend()
+    with backend.connection() as conn:
+        print(f"Recurring payments: {rebuild(conn, backend.dialect)} series detected")
@@ -0,0 +1,268 @@
+from datetime import datetime
+
+# Per-tool templates that turn raw tool results into a short answer, so read
+# requests can skip the summarization LLM call.
+
+MAX_LISTED_ROWS = 5
+
+
+def fmt_amount(value):
+    return f"{float(value or 0):,.2f}"
+
+
+def fmt_expense(row):
+    parts = [str(row.get("date", "")), fmt_amount(row.get("amount"))]
+    details = ", ".join(
+        str(row[key]) for key in ("category", "description") if row.get(key)
+    )
+    line = f"- {parts[0]}: {parts[1]}"
+    return f"{line} ({details})" if details else line
+
+
+def render_passthrough(result, args):
+    if isinstance(result, dict) and "error" in result:
+        return f"Error: {result['error']}"
+    return str(result)
+
+
+def render_expense_rows(result, args):
+    if isinstance(result, dict) and "expenses" in result:
+        # One page of a paginated listing.
+        text = render_expense_rows(result["expenses"], args)
+        if result.get("next_page_token"):
+            text += f"\nMore expenses available; next page_token: {result['next_page_token']}"
+        return text
+    if not isinstance(result, list):
+        return render_passthrough(result, args)
+    if not result:
+        return "No matching expenses found."
+
+    total = sum(float(row.get("amount") or 0) for row in result)
+    noun = "expense" if len(result) == 1 else "expenses"
+    lines = [f"Found {len(result)} {noun} totalling {fmt_amount(total)}:"]
+    lines += [fmt_expense(row) for row in result[:MAX_LISTED_ROWS]]
+    if len(result) > MAX_LISTED_ROWS:
+        lines.append(f"...and {len(result) - MAX_LISTED_ROWS} more.")
+    return "\n".join(lines)
+
+
+def render_single_expense(label):
+    def render(result, args):
+        if not isinstance(result, list):
+            return render_passthrough(result, args)
+        if not result:
+            return "No expenses recorded yet."
+        return f"Your {label} expense:\n{fmt_expense(result[0])}"
+
+    return render
+
+
+def render_category_values(value_key, title, money=True):
+    def render(result, args):
+        if not isinstance(result, list):
+            return render_passthrough(result, args)
+        rows = [row for row in result if row.get(value_key) is not None]
+        if not rows:
+            return "No expenses found."
+        rows.sort(key=lambda row: float(row[value_key]), reverse=True)
+        values = [
+            f"- {row.get('category')}: "
+            + (fmt_amount(row[value_key]) if money else str(row[value_key]))
+            for row in rows
+        ]
+        return f"{title(args)}:\n" + "\n".join(values)
+
+    return render
+
+
+def render_distinct_categories(result, args):
+    if not isinstance(result, list):
+        return render_passthrough(result, args)
+    categories = sorted(str(row.get("category")) for row in result)
+    return "Categories: " + ", ".join(categories) if categories else "No categories yet."
+
+
+def render_sum(result, args):
+    total = result[0].get("sum") if isinstance(result, list) and result else None
+    if total is None:
+        return f"No expenses found for {args.get('category')}."
+    return f"You spent {fmt_amount(total)} on {args.get('category')}."
+
+
+def render_min_max(result, args):
+    row = result[0] if isinstance(result, list) and result else {}
+    if row.get("min") is None:
+        return f"No expenses found for {args.get('category')}."
+    return (
+        f"Your {args.get('category')} expenses range from "
+        f"{fmt_amount(row['min'])} to {fmt_amount(row['max'])}."
+    )
+
+
+def month_title(args):
+    try:
+        name = datetime(int(args["year"]), int(args["month"]), 1).strftime("%B %Y")
+    except (KeyError, TypeError, ValueError):
+        name = "the month"
+    return f"Spending by category for {name}"
+
+
+def render_recurring(result, args):
+    if not isinstance(result, list):
+        return render_passthrough(result, args)
+    if not result:
+        return "No recurring expenses found."
+    lines = [
+        f"- {row.get('description_key')} ({row.get('category')}): {row.get('cadence')}, "
+        f"about {fmt_amount(row.get('mean_amount'))}, {row.get('occurrences')} recent payments, "
+        f"next around {row.get('next_date')}"
+        for row in result[: MAX_LISTED_ROWS * 2]
+    ]
+    if len(result) > MAX_LISTED_ROWS * 2:
+        lines.append(f"...and {len(result) - MAX_LISTED_ROWS * 2} more.")
+    return "Recurring expenses:\n" + "\n".join(lines)
+
+
+def render_percentage(result, args):
+    if not isinstance(result, list):
+        return render_passthrough(result, args)
+    if not result:
+        return "No expenses found."
+    lines = [
+        f"- {row.get('category')}: {float(row.get('percentage') or 0):.1f}% "
+        f"({fmt_amount(row.get('total_spent'))})"
+        for row in result
+    ]
+    return "Share of total spending:\n" + "\n".join(lines)
+
+
+def render_trends(result, args):
+    if not isinstance(result, list):
+        return render_passthrough(result, args)
+    if not result:
+        return "No expenses found."
+    lines = []
+    for row in result[: MAX_LISTED_ROWS * 2]:
+        period = str(int(row["year"]))
+        if row.get("month") is not None:
+            period += f"-{int(row['month']):02d}"
+        lines.append(f"- {period}: {fmt_amount(row.get('total_spent'))}")
+    return "Spending over time (most recent first):\n" + "\n".join(lines)
+
+
+def fmt_forecast(point):
+    return (
+        f"{fmt_amount(point['expected'])} "
+        f"(likely {fmt_amount(point['low'])} to {fmt_amount(point['high'])})"
+    )
+
+
+def render_prediction(result, args):
+    if not isinstance(result, dict) or "total" not in result:
+        if isinstance(result, dict) and "message" in result:
+            return result["message"]
+        return render_passthrough(result, args)
+    lines = [f"- {point['month']}: {fmt_forecast(point)}" for point in result["total"]]
+    text = "Predicted spending:\n" + "\n".join(lines)
+
+    first_month = sorted(
+        ((series[0], category) for category, series in result["categories"].items()),
+        key=lambda item: item[0]["expected"],
+        reverse=True,
+    )
+    if first_month:
+        text += f"\nBy category for {result['total'][0]['month']}:\n" + "\n".join(
+            f"- {category}: {fmt_forecast(point)}"
+            for point, category in first_month[:MAX_LISTED_ROWS]
+        )
+    return text
+
+
+def render_comparison(result, args):
+    first, second = result["period_1"], result["period_2"]
+    text = (
+        f"{first['from_date']} to {first['to_date']}: {fmt_amount(first['total_spent'])}; "
+        f"{second['from_date']} to {second['to_date']}: {fmt_amount(second['total_spent'])}. "
+        f"Difference: {fmt_amount(result['difference'])}"
+    )
+    if result.get("percent_change") is not None:
+        text += f" ({result['percent_change']:+.1f}%)"
+    return text + "."
+
+
+def render_created(result, args):
+    if isinstance(result, dict) and "amount" in result:
+        return (
+            f"Added {fmt_amount(result['amount'])} for {result.get('description')} "
+            f"({result.get('category')}) on {result.get('date')}."
+        )
+    return render_passthrough(result, args)
+
+
+RENDERERS = {
+    # app/tool_factory.py
+    "create_expense": render_created,
+    "get_all_expenses": render_expense_rows,
+    "get_expenses_by_category": render_expense_rows,
+    "get_expenses_by_date_range": render_expense_rows,
+    "get_expenses_above_amount": render_expense_rows,
+    "get_sorted_expenses": render_expense_rows,
+    "get_limited_expenses": render_expense_rows,
+    "aggregate_sum_by_category": render_category_values(
+        "total_amount", lambda args: "Total spent per category"
+    ),
+    "count_expenses_by_category": render_category_values(
+        "expenses_count", lambda args: "Number of expenses per category", money=False
+    ),
+    "aggregate_with_having": render_category_values(
+        "total_amount",
+        lambda args: f"Categories above {fmt_amount(args.get('min_total'))}",
+    ),
+    "get_expenses_above_average": render_expense_rows,
+    "get_expenses_with_cte": render_category_values(
+        "total_amount",
+        lambda args: f"Categories above {fmt_amount(args.get('min_total'))}",
+    ),
+    "get_expenses_with_running_total": render_expense_rows,
+    "get_distinct_categories": render_distinct_categories,
+    "union_expenses_by_categories": render_expense_rows,
+    "partial_text_search_expenses": render_expense_rows,
+    "advanced_case_expenses": render_expense_rows,
+    "self_join_previous_day_expenses": render_expense_rows,
+    "greetings": render_passthrough,
+    "unknown": render_passthrough,
+    # app/tool_factory copy.py
+    "search_by_fields": render_expense_rows,
+    "sum_expense": render_sum,
+    "min_max_expense": render_min_max,
+    "monthly_expense_summary": render_category_values("sum", month_title),
+    "average_expense": render_category_values(
+        "avg", lambda args: "Average expense per category"
+    ),
+    "expense_anomalies": render_expense_rows,
+    "recurring_expenses": render_recurring,
+    "check_budget": render_passthrough,
+    "daterange_all_expenses": render_expense_rows,
+    "daterange_category_expenses": render_expense_rows,
+    "highest_expense": render_single_expense("highest"),
+    "lowest_expense": render_single_expense("lowest"),
+    "category_percentage": render_percentage,
+    "yearly_expense_summary": render_category_values(
+        "total_spent", lambda args: f"Spending by category for {args.get('year')}"
+    ),
+    "expense_trends": render_trends,
+    "predict_future_expenses": render_prediction,
+    "compare_periods_expenses": render_comparison,
+    "recent_expenses": render_expense_rows,
+    "suggest_savings": render_passthrough,
+    "encourage_spending": render_passthrough,
+}
+
+
+def render_result(intent: str, result, args: dict = None):
+    """Render a tool result as a concise answer without calling the LLM."""
+    renderer = RENDERERS.get(intent, render_passthrough)
+    try:
+        return renderer(result, args or {})
+    except (KeyError, TypeError, ValueError, AttributeError, IndexError):
+        return render_passthrough(result, args or {})
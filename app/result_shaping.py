@@ -0,0 +1,130 @@
+import heapq
+import os
+import random
+
+# Rough size of a tool result once interpolated into a prompt; ~4 characters
+# per token is close enough for llama-style tokenizers on this data.
+RESULT_TOKEN_BUDGET = int(os.getenv("RESULT_TOKEN_BUDGET", 1500))
+CHARS_PER_TOKEN = 4
+MAX_CATEGORIES = 20
+
+
+def estimate_tokens(value) -> int:
+    return len(str(value)) // CHARS_PER_TOKEN + 1
+
+
+def as_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def summarize_rows(rows, budget: int):
+    """Reduce an iterable of row dicts to totals plus a sample that fits `budget`.
+
+    Single pass with bounded memory: aggregates are running values, the
+    largest rows are kept in a heap and the rest in a reservoir sample.
+    """
+    count = 0
+    total = 0.0
+    min_amount = max_amount = None
+    first_date = last_date = None
+    by_category = {}
+    largest = []  # min-heap of (amount, seq, row)
+    reservoir = []
+    sample_size = None
+    rng = random.Random(0)
+
+    for row in rows:
+        if sample_size is None:
+            # Spend about half the budget on example rows.
+            sample_size = max(2, (budget // 2) // estimate_tokens(row))
+        count += 1
+
+        amount = as_float(row.get("amount"))
+        if amount is not None:
+            total += amount
+            min_amount = amount if min_amount is None else min(min_amount, amount)
+            max_amount = amount if max_amount is None else max(max_amount, amount)
+            entry = (amount, count, row)
+            if len(largest) < sample_size // 2:
+                heapq.heappush(largest, entry)
+            elif amount > largest[0][0]:
+                heapq.heapreplace(largest, entry)
+
+        row_date = row.get("date")
+        if row_date is not None:
+            row_date = str(row_date)
+            first_date = row_date if first_date is None else min(first_date, row_date)
+            last_date = row_date if last_date is None else max(last_date, row_date)
+
+        category = row.get("category")
+        if category is not None:
+            bucket = by_category.setdefault(category, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += amount or 0.0
+
+        # Algorithm R reservoir over all rows.
+        slots = sample_size - sample_size // 2
+        if len(reservoir) < slots:
+            reservoir.append((count, row))
+        else:
+            index = rng.randrange(count)
+            if index < slots:
+                reservoir[index] = (count, row)
+
+    summary = {"rows": count}
+    if min_amount is not None:
+        summary.update(
+            {
+                "total_amount": round(total, 2),
+                "average_amount": round(total / count, 2),
+                "min_amount": min_amount,
+                "max_amount": max_amount,
+            }
+        )
+    if first_date is not None:
+        summary.update({"from_date": first_date, "to_date": last_date})
+
+    top_rows = [row for _, _, row in sorted(largest, key=lambda e: -e[0])]
+    seen = {id(row) for row in top_rows}
+    sample = [row for _, row in sorted(reservoir) if id(row) not in seen]
+
+    shaped = {"summary": summary}
+    if by_category:
+        categories = sorted(by_category.items(), key=lambda item: -item[1][1])
+        shaped["by_category"] = {
+            category: {"count": n, "total": round(amount, 2)}
+            for category, (n, amount) in categories[:MAX_CATEGORIES]
+        }
+    shaped["largest"] = top_rows
+    shaped["sample"] = sample
+    shaped["note"] = (
+        "Result was too large to include in full. Totals cover every row; "
+        "'largest' and 'sample' are examples only."
+    )
+
+    # Trim examples until the whole payload fits.
+    while estimate_tokens(shaped) > budget and (shaped["sample"] or shaped["largest"]):
+        (shaped["sample"] or shaped["largest"]).pop()
+    return shaped
+
+
+def shape_result(result, budget: int = None):
+    """Return `result` unchanged if it fits the token budget, otherwise a compact summary."""
+    budget = budget or RESULT_TOKEN_BUDGET
+
+    if isinstance(result, (list, tuple)):
+        if estimate_tokens(result) <= budget:
+            return result
+        if result and isinstance(result[0], dict):
+            return summarize_rows(result, budget)
+    elif not isinstance(result, (str, dict)) and hasattr(result, "__iter__"):
+        # Streaming results are always summarized; their size is unknown.
+        return summarize_rows(result, budget)
+    elif estimate_tokens(result) <= budget:
+        return result
+
+    text = str(result)
+    return text[: budget * CHARS_PER_TOKEN] + " ...[truncated]"
@@ -0,0 +1,55 @@
+from datetime import date
+from app.storage.base import dialect_sql, execute_values
+
+# Per (year, month, category) aggregates kept in step with `expenses`, so
+# summary tools read O(months x categories) rows instead of the whole table.
+ROLLUP_UPSERT = """
+    INSERT INTO expense_rollups (year, month, category, count, total, min_amount, max_amount)
+    VALUES %s
+    ON CONFLICT (year, month, category) DO UPDATE SET
+        count = expense_rollups.count + EXCLUDED.count,
+        total = expense_rollups.total + EXCLUDED.total,
+        min_amount = {least}(expense_rollups.min_amount, EXCLUDED.min_amount),
+        max_amount = {greatest}(expense_rollups.max_amount, EXCLUDED.max_amount)
+"""
+# SQLite has no LEAST/GREATEST; its multi-argument MIN/MAX do the same job.
+ROLLUP_UPSERTS = {
+    "postgres": ROLLUP_UPSERT.format(least="LEAST", greatest="GREATEST"),
+    "sqlite": ROLLUP_UPSERT.format(least="MIN", greatest="MAX"),
+}
+
+
+def accumulate(rollups: dict, expense_date, amount, category):
+    """Fold one expense into an in-memory {(year, month, category): [count, total, min, max]} map."""
+    if expense_date is None or category is None:
+        return
+    if not isinstance(expense_date, date):
+        expense_date = date.fromisoformat(str(expense_date)[:10])
+
+    amount = float(amount)
+    key = (expense_date.year, expense_date.month, category)
+    bucket = rollups.get(key)
+    if bucket is None:
+        rollups[key] = [1, amount, amount, amount]
+    else:
+        bucket[0] += 1
+        bucket[1] += amount
+        bucket[2] = min(bucket[2], amount)
+        bucket[3] = max(bucket[3], amount)
+
+
+def apply_rollups(cursor, rollups: dict, dialect: str = "postgres"):
+    """Merge accumulated buckets into `expense_rollups` on the caller's transaction."""
+    if not rollups:
+        return
+    # Sorted keys give concurrent writers a consistent lock order.
+    values = [key + tuple(rollups[key]) for key in sorted(rollups)]
+    execute_values(cursor, dialect_sql(ROLLUP_UPSERTS, dialect), values, dialect)
+
+
+def update_rollups(cursor, rows, dialect: str = "postgres"):
+    """Update rollups for an iterable of (date, amount, category) rows."""
+    rollups = {}
+    for expense_date, amount, category in rows:
+        accumulate(rollups, expense_date, amount, category)
+    apply_rollups(cursor, rollups, dialect)
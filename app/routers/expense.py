@@ -1,32 +1,139 @@
-import base64
-from io import BytesIO
-from PIL import Image
-from fastapi import APIRouter, File, UploadFile, Form
-from app.langchain_utils import route_request
+import os
+import csv
+import io
+import json
+import asyncio
+from typing import List, Optional
+from PIL import UnidentifiedImageError
+from fastapi import APIRouter, File, UploadFile, Form, HTTPException
+from fastapi.responses import StreamingResponse
+from app.db_utils import db_stream
+from app.image_utils import (
+    preprocess_image_async,
+    ImageTooLargeError,
+    ImageQueueFullError,
+    ImagePoolBrokenError,
+    MAX_UPLOAD_BYTES,
+)
+from app.langchain_utils import (
+    async_route_request,
+    async_extract_text_expense,
+    async_extract_receipt_expense,
+    async_save_expenses,
+    astream_text_request,
+    DEFAULT_RESPONSE_MODE,
+    RESPONSE_MODES,
+)
+from app.pagination import fetch_page, InvalidPageToken
+from app.receipt_parser import validate_expense
 
 router = APIRouter()
 
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", 8))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", 500))
+
 
 @router.get("/")
 async def root():
     return {"message": "Hello World"}
 
 
+def expense_filters(from_date, to_date, category):
+    conditions, params = [], []
+    if from_date:
+        conditions.append("date >= %s")
+        params.append(from_date)
+    if to_date:
+        conditions.append("date <= %s")
+        params.append(to_date)
+    if category:
+        conditions.append("category = %s")
+        params.append(category.lower())
+    return " AND ".join(conditions), tuple(params)
+
+
+@router.get("/expenses/")
+async def list_expenses(
+    order_by: str = "date",
+    order: str = "DESC",
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    category: Optional[str] = None,
+    page_size: int = 50,
+    page_token: Optional[str] = None,
+):
+    """One page of expenses; pass `next_page_token` back to get the next one."""
+    where, params = expense_filters(from_date, to_date, category)
+    try:
+        rows, next_page_token = await asyncio.to_thread(
+            fetch_page, where, params, order_by, order, page_size, page_token
+        )
+    except InvalidPageToken as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"expenses": rows, "next_page_token": next_page_token}
+
+
+@router.get("/expenses/export")
+async def export_expenses(
+    from_date: Optional[str] = None,
+    to_date: Optional[str] = None,
+    category: Optional[str] = None,
+):
+    """Every matching expense as CSV, streamed from a server-side cursor."""
+    where, params = expense_filters(from_date, to_date, category)
+    query = "SELECT id, date, amount, category, description FROM expenses"
+    if where:
+        query += " WHERE " + where
+    query += " ORDER BY date, id"
+
+    def lines():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["id", "date", "amount", "category", "description"])
+        for row in db_stream(query, params):
+            writer.writerow(row.values())
+            if buffer.tell() > 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    # A sync generator: Starlette iterates it in a worker thread.
+    return StreamingResponse(
+        lines(),
+        media_type="text/csv",
+        headers={"Content-Disposition": "attachment; filename=expenses.csv"},
+    )
+
+
 async def process_image(image_file: UploadFile, max_size: tuple = (800, 800)) -> str:
-    """Resize image to fit within max_size and convert to base64."""
-    image = Image.open(BytesIO(await image_file.read()))
+    """Resize image to fit within max_size and convert to base64, off the event loop."""
+    # Read one byte past the limit so oversized uploads are detected without
+    # buffering the whole body.
+    data = await image_file.read(MAX_UPLOAD_BYTES + 1)
+    try:
+        return await preprocess_image_async(data, max_size)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ImageQueueFullError, ImagePoolBrokenError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Unsupported image file.")
+
 
-    # Convert to RGB if necessary (to handle PNGs with transparency)
-    if image.mode in ("RGBA", "P"):
-        image = image.convert("L")
+def check_response_mode(response_mode: str):
+    if response_mode not in RESPONSE_MODES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"response_mode must be one of {', '.join(RESPONSE_MODES)}",
+        )
 
-    # Resize while maintaining aspect ratio
-    image.thumbnail(max_size)
 
-    # Save to bytes and encode to base64
-    buffered = BytesIO()
-    image.save(buffered, format="JPEG", quality=80)
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+def sse_event(event: str, data) -> str:
+    """Format one server-sent event; rows may hold dates and decimals."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
 
 @router.post("/handle-expense/")
@@ -34,16 +141,144 @@ async def handle_expense(
     user_input: str = Form(None),
     image_file: UploadFile = File(None),
     image_url: str = Form(None),
+    response_mode: str = Form(DEFAULT_RESPONSE_MODE),
 ):
     """Handle user input to either save or search for expenses, with optional image or image URL."""
+    check_response_mode(response_mode)
+
     if user_input:
-        result = route_request(user_input=user_input)
+        result = await async_route_request(
+            user_input=user_input, response_mode=response_mode
+        )
     elif image_file:
         image_content = await process_image(image_file)
-        result = route_request(image_content=image_content)
+        result = await async_route_request(image_content=image_content)
     elif image_url:
-        result = route_request(image_url=image_url)
+        result = await async_route_request(image_url=image_url)
     else:
         result = {"error": "No input provided"}
 
     return result
+
+
+@router.post("/handle-expense/stream/")
+async def handle_expense_stream(
+    user_input: str = Form(None),
+    image_file: UploadFile = File(None),
+    image_url: str = Form(None),
+    response_mode: str = Form(DEFAULT_RESPONSE_MODE),
+):
+    """Stream the intent, raw tool results and answer tokens as server-sent events."""
+    check_response_mode(response_mode)
+
+    # Preprocess before the response starts so upload errors keep their status code.
+    image_content = None
+    if not user_input and image_file:
+        image_content = await process_image(image_file)
+
+    async def events():
+        if user_input:
+            async for event, data in astream_text_request(user_input, response_mode):
+                yield sse_event(event, data)
+            return
+
+        # Receipts produce a single record, so there is nothing to stream.
+        if image_content:
+            result = await async_route_request(image_content=image_content)
+        elif image_url:
+            result = await async_route_request(image_url=image_url)
+        else:
+            result = {"error": "No input provided"}
+        yield sse_event("result", result)
+        yield sse_event("done", {"intent": result.get("intent")})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def extract_batch_item(kind: str, payload):
+    """Return validated `create_expense` args for one batch item, or raise ValueError."""
+    if kind == "text":
+        expense_data = await async_extract_text_expense(payload)
+        if expense_data is None:
+            raise ValueError("No expense found in text.")
+    elif kind == "image":
+        image_content = await process_image(payload)
+        expense_data = await async_extract_receipt_expense(image_content, None)
+        if expense_data is None:
+            raise ValueError("Please upload a valid receipt.")
+    else:
+        expense_data = payload if isinstance(payload, dict) else {}
+
+    expense = validate_expense(expense_data)
+    if expense is None:
+        raise ValueError("Expense needs a positive amount, a known category and a valid date.")
+    return expense
+
+
+@router.post("/handle-expense/batch/")
+async def handle_expense_batch(
+    lines: str = Form(None),
+    rows: str = Form(None),
+    image_files: List[UploadFile] = File(None),
+):
+    """Create many expenses at once from text lines, JSON rows and/or receipt images.
+
+    Extraction runs concurrently (at most BATCH_CONCURRENCY items at a time) and
+    every valid expense is written in one transaction. Each item reports its
+    own status, so a caller only needs to resend the failed ones.
+    """
+    items = [("text", line.strip()) for line in (lines or "").splitlines() if line.strip()]
+    if rows:
+        try:
+            parsed_rows = json.loads(rows)
+        except json.JSONDecodeError:
+            raise HTTPException(status_code=422, detail="rows must be a JSON array.")
+        if not isinstance(parsed_rows, list):
+            raise HTTPException(status_code=422, detail="rows must be a JSON array.")
+        items += [("row", row) for row in parsed_rows]
+    items += [("image", image_file) for image_file in image_files or []]
+
+    if not items:
+        return {"error": "No input provided"}
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"A batch may contain at most {BATCH_MAX_ITEMS} items."
+        )
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def extract(kind, payload):
+        async with semaphore:
+            try:
+                return await extract_batch_item(kind, payload), None
+            except HTTPException as e:
+                return None, e.detail
+            except Exception as e:
+                return None, str(e)
+
+    extracted = await asyncio.gather(*(extract(kind, payload) for kind, payload in items))
+
+    statuses = []
+    expenses = []
+    for index, ((kind, _), (expense, error)) in enumerate(zip(items, extracted)):
+        if expense is None:
+            statuses.append({"index": index, "type": kind, "status": "invalid", "error": error})
+        else:
+            statuses.append({"index": index, "type": kind, "status": "created", "result": expense})
+            expenses.append(expense)
+
+    try:
+        await async_save_expenses(expenses)
+    except Exception as e:
+        # The insert is one transaction, so none of the valid items were stored.
+        for status in statuses:
+            if status["status"] == "created":
+                status.update(status="error", error=f"Database write failed: {e}")
+                del status["result"]
+
+    created = sum(1 for status in statuses if status["status"] == "created")
+    return {"created": created, "failed": len(statuses) - created, "items": statuses}
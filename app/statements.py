@@ -0,0 +1,230 @@
+from itertools import combinations
+from app.db_utils import get_backend, get_connection
+from app.storage import dialect_sql
+from app.metrics import DB_QUERY_LATENCY, current_tool
+from app.recurrence import SERIES_COLUMNS
+
+# Every query a tool runs, by name. Values are bound as parameters (%s), never
+# formatted into the SQL, so each statement is parsed and planned once per
+# pooled connection and then only executed. Parts that cannot be parameters
+# (ORDER BY column and direction, which optional filters apply) get one entry
+# per variant, so the registry stays finite. A statement is either portable
+# SQL or a {dialect: sql} dict, as in migrations.
+SORT_COLUMNS = ("date", "amount", "category", "description")
+SEARCH_FIELDS = ("category", "amount", "date")
+# Columns are always listed: `SELECT *` would hand internal columns (anomaly
+# scores, description keys) to tools, and a prepared `SELECT *` fails once a
+# migration changes the table's row type.
+EXPENSE_COLUMNS = "id, date, amount, category, description"
+RECURRING_COLUMNS = ", ".join(SERIES_COLUMNS)
+
+STATEMENTS = {
+    # app/tool_factory.py
+    "all_expenses": f"SELECT {EXPENSE_COLUMNS} FROM expenses",
+    "expenses_by_category": f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE category = %s",
+    "expenses_by_date_range": f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE date BETWEEN %s AND %s",
+    "expenses_above_amount": f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE amount > %s ORDER BY amount DESC",
+    "category_sums": """
+        SELECT category, SUM(total) AS total_amount
+        FROM expense_rollups
+        GROUP BY category
+    """,
+    "category_total": """
+        SELECT category, SUM(total) AS total_amount
+        FROM expense_rollups
+        WHERE category = %s
+        GROUP BY category
+    """,
+    "category_counts": """
+        SELECT category, SUM(count) AS expenses_count
+        FROM expense_rollups
+        GROUP BY category
+    """,
+    "category_sums_above": """
+        SELECT category, SUM(total) AS total_amount
+        FROM expense_rollups
+        GROUP BY category
+        HAVING SUM(total) > %s
+    """,
+    "expenses_above_average": f"""
+        SELECT {EXPENSE_COLUMNS}
+        FROM expenses
+        WHERE amount > (SELECT AVG(amount) FROM expenses)
+    """,
+    "category_totals_above_cte": """
+        WITH category_totals AS (
+            SELECT category, SUM(total) AS total_amount
+            FROM expense_rollups
+            GROUP BY category
+        )
+        SELECT category, total_amount
+        FROM category_totals
+        WHERE total_amount > %s
+    """,
+    "running_totals": """
+        SELECT date, amount, category, description,
+               SUM(amount) OVER (PARTITION BY category ORDER BY date) AS running_total
+        FROM expenses
+    """,
+    "distinct_categories": "SELECT DISTINCT category FROM expenses",
+    "union_categories": f"""
+        SELECT {EXPENSE_COLUMNS} FROM expenses WHERE category = %s
+        UNION
+        SELECT {EXPENSE_COLUMNS} FROM expenses WHERE category = %s
+    """,
+    # The term arrives with LIKE wildcards escaped; see `like_pattern`.
+    "description_search": f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE description LIKE %s ESCAPE '\\'",
+    "expense_types": """
+        SELECT date,
+               amount,
+               category,
+               description,
+               CASE
+                   WHEN amount > 0 THEN 'Credit'
+                   WHEN amount < 0 THEN 'Debit'
+                   ELSE 'Neutral'
+               END AS expenses_type
+        FROM expenses
+    """,
+    "previous_day_join": {
+        "postgres": """
+            SELECT a.date, a.amount, a.category, a.description,
+                   b.amount AS previous_day_amount
+            FROM expenses a
+            LEFT JOIN expenses b
+              ON b.date = a.date - 1
+        """,
+        "sqlite": """
+            SELECT a.date, a.amount, a.category, a.description,
+                   b.amount AS previous_day_amount
+            FROM expenses a
+            LEFT JOIN expenses b
+              ON b.date = date(a.date, '-1 day')
+        """,
+    },
+    # app/tool_factory copy.py
+    "category_sum": "SELECT SUM(total) AS sum FROM expense_rollups WHERE category = %s",
+    "category_min_max": """
+        SELECT MIN(min_amount) AS min, MAX(max_amount) AS max
+        FROM expense_rollups
+        WHERE category = %s
+    """,
+    "month_category_sums": """
+        SELECT category, SUM(total) AS sum
+        FROM expense_rollups
+        WHERE year = %s AND month = %s
+        GROUP BY category
+    """,
+    "category_averages": """
+        SELECT category, SUM(total) / SUM(count) AS avg
+        FROM expense_rollups
+        GROUP BY category
+    """,
+    "category_average": """
+        SELECT category, SUM(total) / SUM(count) AS avg
+        FROM expense_rollups
+        WHERE category = %s
+        GROUP BY category
+    """,
+    # Walks idx_expenses_anomaly_score from the top, so it reads `limit` rows.
+    "scored_anomalies": """
+        SELECT id, date, amount, category, description, anomaly_score
+        FROM expenses
+        WHERE anomaly_score > %s
+        ORDER BY anomaly_score DESC
+        LIMIT %s
+    """,
+    "recurring_series": f"SELECT {RECURRING_COLUMNS} FROM recurring_series ORDER BY occurrences DESC",
+    "recurring_series_by_category": f"""
+        SELECT {RECURRING_COLUMNS} FROM recurring_series WHERE category = %s ORDER BY occurrences DESC
+    """,
+    "category_spent": "SELECT SUM(total) as total_spent FROM expense_rollups WHERE category = %s",
+    "daterange_expenses": """
+        SELECT id, date, amount, category, description
+        FROM expenses
+        WHERE date BETWEEN %s AND %s
+        ORDER BY date ASC
+    """,
+    "daterange_category_expenses": """
+        SELECT id, date, amount, category, description
+        FROM expenses
+        WHERE category = %s
+        AND date BETWEEN %s AND %s
+        ORDER BY date ASC
+    """,
+    "highest_expense": f"SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY amount DESC LIMIT 1",
+    "lowest_expense": f"SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY amount ASC LIMIT 1",
+    "category_percentages": """
+        SELECT category,
+               SUM(total) AS total_spent,
+               (SUM(total) * 100 / (SELECT SUM(total) FROM expense_rollups)) AS percentage
+        FROM expense_rollups
+        GROUP BY category
+        ORDER BY percentage DESC
+    """,
+    "year_category_totals": """
+        SELECT category, SUM(total) AS total_spent
+        FROM expense_rollups
+        WHERE year = %s
+        GROUP BY category
+        ORDER BY total_spent DESC
+    """,
+    "monthly_trends": """
+        SELECT year, month, SUM(total) AS total_spent
+        FROM expense_rollups
+        GROUP BY year, month
+        ORDER BY year DESC, month DESC
+    """,
+    "yearly_trends": """
+        SELECT year, SUM(total) AS total_spent
+        FROM expense_rollups
+        GROUP BY year
+        ORDER BY year DESC
+    """,
+    "period_total": "SELECT SUM(amount) AS total_spent FROM expenses WHERE date BETWEEN %s AND %s",
+    "highest_average_category": """
+        SELECT category, SUM(total) / SUM(count) AS avg_spent
+        FROM expense_rollups
+        GROUP BY category
+        ORDER BY avg_spent DESC
+        LIMIT 1
+    """,
+    "lowest_average_category": """
+        SELECT category, SUM(total) / SUM(count) AS avg_spent
+        FROM expense_rollups
+        GROUP BY category
+        ORDER BY avg_spent ASC
+        LIMIT 1
+    """,
+}
+
+for column in SORT_COLUMNS:
+    for order in ("ASC", "DESC"):
+        STATEMENTS[f"sorted_by_{column}_{order.lower()}"] = (
+            f"SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY {column} {order}"
+        )
+        STATEMENTS[f"limited_by_{column}_{order.lower()}"] = (
+            f"SELECT {EXPENSE_COLUMNS} FROM expenses ORDER BY {column} {order} LIMIT %s"
+        )
+
+for size in range(1, len(SEARCH_FIELDS) + 1):
+    for fields in combinations(SEARCH_FIELDS, size):
+        STATEMENTS["search_by_" + "_".join(fields)] = (
+            f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE "
+            + " AND ".join(f"{field} = %s" for field in fields)
+        )
+
+
+def like_pattern(term: str) -> str:
+    """A LIKE pattern matching `term` anywhere, with its own % and _ taken literally."""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def run_statement(name, params=(), conn=None):
+    """Execute the registered statement `name` with `params`; rows come back as dicts."""
+    backend = get_backend()
+    sql = dialect_sql(STATEMENTS[name], backend.dialect)
+    with get_connection(conn) as conn:
+        with DB_QUERY_LATENCY.labels(current_tool.get()).time():
+            return backend.execute_prepared(conn, name, sql, tuple(params))
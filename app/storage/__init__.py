@@ -0,0 +1,54 @@
+import os
+import threading
+from app.metrics import register_pool
+from .base import StorageBackend, dialect_sql, execute_values, qmark
+
+_backend = None
+_lock = threading.Lock()
+
+
+def create_backend(name: str = None) -> StorageBackend:
+    """Build the backend named by `name` or STORAGE_BACKEND: "postgres"
+    (default) or "sqlite" for an embedded, serverless database file."""
+    name = (name or os.getenv("STORAGE_BACKEND", "postgres")).lower()
+    # Imported lazily so an embedded deployment never imports psycopg2.
+    if name == "postgres":
+        from .postgres import PostgresBackend
+
+        return PostgresBackend()
+    if name == "sqlite":
+        from .sqlite import SqliteBackend
+
+        return SqliteBackend()
+    raise ValueError(f"Unknown STORAGE_BACKEND {name!r}; use 'postgres' or 'sqlite'.")
+
+
+def get_backend() -> StorageBackend:
+    """The process-wide backend chosen by STORAGE_BACKEND, created on first use."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                backend = create_backend()
+                register_pool("db", lambda: backend.in_use, backend.capacity)
+                _backend = backend
+    return _backend
+
+
+def close_backend():
+    global _backend
+    with _lock:
+        if _backend is not None:
+            _backend.close()
+            _backend = None
+
+
+__all__ = [
+    "StorageBackend",
+    "create_backend",
+    "get_backend",
+    "close_backend",
+    "dialect_sql",
+    "execute_values",
+    "qmark",
+]
@@ -0,0 +1,103 @@
+from contextlib import contextmanager
+
+# SQL is written once, in psycopg2 style: `%s` placeholders and `VALUES %s`
+# for multi-row inserts. Where dialects disagree (LEAST vs MIN, date
+# arithmetic, EXTRACT), callers pass {dialect: sql} and pick with `dialect_sql`.
+
+
+def dialect_sql(sql, dialect: str):
+    """Return `sql` itself, or its variant for `dialect` if a dict is given."""
+    return sql[dialect] if isinstance(sql, dict) else sql
+
+
+def qmark(sql: str) -> str:
+    """Rewrite `%s` placeholders as `?` for sqlite3."""
+    return sql.replace("%s", "?")
+
+
+def numbered(sql: str) -> str:
+    """Rewrite `%s` placeholders as `$1`, `$2`, ... for a Postgres PREPARE."""
+    parts = sql.split("%s")
+    return "".join(
+        part + (f"${index}" if index < len(parts) else "")
+        for index, part in enumerate(parts, start=1)
+    )
+
+
+def execute_values(cursor, sql: str, rows, dialect: str = "postgres", page_size=1000):
+    """Run a `... VALUES %s ...` statement for many rows in one round trip."""
+    rows = list(rows)
+    if not rows:
+        return
+    if dialect == "postgres":
+        from psycopg2.extras import execute_values as pg_execute_values
+
+        pg_execute_values(cursor, sql, rows, page_size=page_size)
+    else:
+        placeholders = "(" + ", ".join("?" * len(rows[0])) + ")"
+        cursor.executemany(sql.replace("VALUES %s", "VALUES " + placeholders), rows)
+
+
+class StorageBackend:
+    """Where expenses live: hands out DB-API connections plus dialect details.
+
+    `db_utils` and `statements` are the only callers. Tools go through
+    `run_statement`/`db_query`/`save_to_db` and only ask `db_dialect()` where
+    the SQL itself has to differ.
+    """
+
+    dialect = None
+    # Connection slots, exported as the "db" pool gauges.
+    capacity = 1
+    in_use = 0
+
+    @contextmanager
+    def connection(self):
+        """Yield a connection; commit on success, roll back on error."""
+        raise NotImplementedError
+
+    def dict_cursor(self, conn):
+        """A cursor whose rows come back as {column: value} dicts."""
+        raise NotImplementedError
+
+    def adapt(self, sql: str) -> str:
+        """Translate psycopg2-style placeholders for this driver."""
+        return sql
+
+    def iter_batches(self, conn, sql: str, batch_size: int, params=None, dicts=False):
+        """Yield lists of rows (tuples, or dicts with `dicts`) without loading the whole result.
+
+        `params`, when given, binds to placeholders already passed through `adapt`.
+        """
+        cursor = self.dict_cursor(conn) if dicts else conn.cursor()
+        try:
+            cursor.execute(sql, params if params is not None else ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            cursor.close()
+
+    def execute_prepared(self, conn, name: str, sql: str, params: tuple):
+        """Run registered statement `name` (`sql` with %s placeholders) and return dict rows.
+
+        Backends without explicit PREPARE rely on the driver caching the parsed
+        statement by its text, which bound parameters keep constant.
+        """
+        cursor = self.dict_cursor(conn)
+        try:
+            cursor.execute(self.adapt(sql), params)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    def reset_prepared(self, conn):
+        """Drop statements `conn` has prepared, e.g. after migrations changed the tables."""
+
+    def version(self, conn) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
@@ -0,0 +1,207 @@
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+from app.storage.base import StorageBackend, numbered
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", 1))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 5))
+# Connections idle longer than this are pinged before reuse; recently used
+# ones are handed out as they are, without an extra round trip.
+DB_POOL_IDLE_CHECK = float(os.getenv("DB_POOL_IDLE_CHECK", 30))
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available in time."""
+
+
+class PreparedConnection(psycopg2.extensions.connection):
+    """A connection that remembers which registered statements it has prepared.
+
+    Prepared statements live as long as the server session, so the set is
+    dropped together with the connection when the pool closes it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+class ConnectionPool:
+    """Bounded psycopg2 pool with checkout timeouts and health checks."""
+
+    def __init__(
+        self,
+        dsn,
+        minconn=DB_POOL_MIN,
+        maxconn=DB_POOL_MAX,
+        timeout=DB_POOL_TIMEOUT,
+        idle_check=DB_POOL_IDLE_CHECK,
+    ):
+        self.timeout = timeout
+        self.idle_check = idle_check
+        # id(conn) -> time.monotonic() when it was last returned.
+        self._returned = {}
+        self._pool = ThreadedConnectionPool(
+            minconn, maxconn, dsn, connection_factory=PreparedConnection
+        )
+        # ThreadedConnectionPool raises immediately when exhausted, so the
+        # semaphore makes callers wait up to `timeout` for a free slot instead.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self.maxconn = maxconn
+        self.in_use = 0
+        self._lock = threading.Lock()
+
+    def getconn(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolTimeoutError(
+                f"No database connection available after {self.timeout}s."
+            )
+        try:
+            conn = self._pool.getconn()
+            if not self._is_usable(conn):
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+            with self._lock:
+                self.in_use += 1
+            return conn
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn):
+        try:
+            if conn.closed:
+                self._returned.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+            else:
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+                self._returned[id(conn)] = time.monotonic()
+                self._pool.putconn(conn)
+        finally:
+            with self._lock:
+                self.in_use -= 1
+            self._slots.release()
+
+    def closeall(self):
+        self._pool.closeall()
+
+    def _is_usable(self, conn):
+        """Closed connections are not; ones idle past `idle_check` (or never used) get a ping."""
+        if conn.closed:
+            self._returned.pop(id(conn), None)
+            return False
+        returned = self._returned.pop(id(conn), None)
+        if returned is not None and time.monotonic() - returned < self.idle_check:
+            return True
+        return self._is_healthy(conn)
+
+    @staticmethod
+    def _is_healthy(conn):
+        if conn.closed:
+            return False
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+
+class PostgresBackend(StorageBackend):
+    """Postgres through a bounded, health-checked psycopg2 pool."""
+
+    dialect = "postgres"
+
+    def __init__(self, dsn=None):
+        self.dsn = dsn or os.getenv("POSTGRES_URL")
+        self.capacity = DB_POOL_MAX
+        # Opened on first checkout so constructing the backend stays offline.
+        self._pool = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ConnectionPool(self.dsn)
+        return self._pool
+
+    @property
+    def in_use(self):
+        return self._pool.in_use if self._pool is not None else 0
+
+    @contextmanager
+    def connection(self):
+        pool = self.pool
+        conn = pool.getconn()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            pool.putconn(conn)
+
+    def dict_cursor(self, conn):
+        return conn.cursor(cursor_factory=RealDictCursor)
+
+    def iter_batches(self, conn, sql, batch_size, params=None, dicts=False):
+        # A named (server-side) cursor streams the result instead of buffering it.
+        with conn.cursor(
+            name=f"stream_{uuid.uuid4().hex}",
+            cursor_factory=RealDictCursor if dicts else None,
+        ) as cursor:
+            cursor.itersize = batch_size
+            cursor.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+    def execute_prepared(self, conn, name, sql, params):
+        prepared = getattr(conn, "prepared", None)
+        if prepared is None:
+            # A connection from outside the pool: plain bound execution.
+            return super().execute_prepared(conn, name, sql, params)
+        statement = f"stmt_{name}"
+        with self.dict_cursor(conn) as cursor:
+            if statement not in prepared:
+                # PREPARE is session state, so it survives a later rollback.
+                cursor.execute(f"PREPARE {statement} AS {numbered(sql)}")
+                prepared.add(statement)
+            if params:
+                placeholders = ", ".join(["%s"] * len(params))
+                cursor.execute(f"EXECUTE {statement} ({placeholders})", params)
+            else:
+                cursor.execute(f"EXECUTE {statement}")
+            return cursor.fetchall()
+
+    def reset_prepared(self, conn):
+        # A prepared plan keeps the result type it was planned with; after an
+        # ALTER TABLE, executing it fails with "cached plan must not change
+        # result type".
+        with conn.cursor() as cursor:
+            cursor.execute("DEALLOCATE ALL")
+        getattr(conn, "prepared", set()).clear()
+
+    def version(self, conn):
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT version();")
+            return cursor.fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
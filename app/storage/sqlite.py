@@ -0,0 +1,113 @@
+import os
+import queue
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime
+from app.storage.base import StorageBackend, qmark
+
+SQLITE_PATH = os.getenv("SQLITE_PATH", "expenses.db")
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", 8))
+SQLITE_BUSY_TIMEOUT = float(os.getenv("SQLITE_BUSY_TIMEOUT", 5))
+
+# Store dates as ISO text and hand DATE/TIMESTAMP columns back as Python
+# objects, matching what psycopg2 returns.
+sqlite3.register_adapter(date, date.isoformat)
+sqlite3.register_adapter(datetime, datetime.isoformat)
+sqlite3.register_converter("DATE", lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.fromisoformat(value.decode()))
+
+
+def dict_row(cursor, row):
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+class SqliteBackend(StorageBackend):
+    """Embedded SQLite file: no server and no network hop.
+
+    Connections are reused from a small pool. WAL mode lets readers run while
+    a writer commits; writers queue on SQLite's file lock for up to
+    SQLITE_BUSY_TIMEOUT seconds.
+    """
+
+    dialect = "sqlite"
+
+    def __init__(self, path=None, pool_size=SQLITE_POOL_SIZE):
+        path = path or SQLITE_PATH
+        if path == ":memory:":
+            # A named shared-cache database so every pooled connection sees
+            # the same data; it lives as long as one connection stays open.
+            self.target = f"file:expenses-{uuid.uuid4().hex}?mode=memory&cache=shared"
+            self.uri = True
+        else:
+            self.target = path
+            self.uri = False
+        self.capacity = pool_size
+        self._idle = queue.LifoQueue()
+        self._keepalive = None
+        self._lock = threading.Lock()
+        self._in_use = 0
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.target,
+            uri=self.uri,
+            timeout=SQLITE_BUSY_TIMEOUT,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        if self.uri and self._keepalive is None:
+            self._keepalive = conn
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        with self._lock:
+            self._in_use += 1
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            # A generator closed mid-stream exits without reaching rollback().
+            if conn.in_transaction:
+                conn.rollback()
+            with self._lock:
+                self._in_use -= 1
+            if self._idle.qsize() < self.capacity or conn is self._keepalive:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def dict_cursor(self, conn):
+        cursor = conn.cursor()
+        cursor.row_factory = dict_row
+        return cursor
+
+    def adapt(self, sql):
+        return qmark(sql)
+
+    def version(self, conn):
+        return "SQLite " + conn.execute("SELECT sqlite_version()").fetchone()[0]
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        self._keepalive = None
@@ -3,6 +3,10 @@ from enum import Enum
 from typing import Optional
 from langchain_core.tools import tool
 from app.db_utils import *
+from app.columnar import get_store
+from app.pagination import fetch_page, InvalidPageToken
+from app.statements import run_statement
+from app import forecast
 import os
 
 db_uri = os.getenv("POSTGRES_URL")
@@ -51,117 +55,109 @@ def search_by_fields(
 ) -> str:
     """Search expenses by category, amount, or date."""
 
-    query = "SELECT * FROM expenses WHERE "
-    conditions = []
+    fields = []
+    params = []
     if category:
-        conditions.append(f"LOWER(category) = '{category}'")
+        fields.append("category")
+        params.append(category.lower())
     if amount:
-        conditions.append(f"amount = {amount}")
+        fields.append("amount")
+        params.append(amount)
     if date:
-        conditions.append(f"CAST(date AS TEXT) = '{date}'")
-    if not conditions:
+        fields.append("date")
+        params.append(date)
+    if not fields:
         return "No search criteria provided."
-    query += " AND ".join(conditions)
+    statement = "search_by_" + "_".join(fields)
 
-    print("query:", query)
+    print("query:", statement, params)
 
-    return db_query(query)
+    return run_statement(statement, params)
 
 
 @tool
 def sum_expense(category: str) -> str:
     """Sum expenses by category."""
 
-    query = f"SELECT SUM(amount) FROM expenses WHERE LOWER(category) = '{category}'"
+    store = get_store()
+    if store is not None:
+        return [{"sum": store.total(category)}]
 
-    return db_query(query)
+    return run_statement("category_sum", (category.lower(),))
 
 
 @tool
 def min_max_expense(category: str) -> str:
     """Return min and max expenses by category."""
 
-    query = f"SELECT MIN(amount), MAX(amount) FROM expenses WHERE LOWER(category) = '{category}'"
+    store = get_store()
+    if store is not None:
+        low, high = store.min_max(category)
+        return [{"min": low, "max": high}]
 
-    return db_query(query)
+    return run_statement("category_min_max", (category.lower(),))
 
 
 @tool
 def monthly_expense_summary(year: int, month: int) -> dict:
     """Get a summary of total expenses per category for a given month."""
 
-    query = f"""
-        SELECT category, SUM(amount)
-        FROM expenses
-        WHERE EXTRACT(YEAR FROM date::DATE) = {year} 
-        AND EXTRACT(MONTH FROM date::DATE) = {month}
-        GROUP BY category
-    """
+    store = get_store()
+    if store is not None:
+        return [
+            {"category": name, "sum": total}
+            for name, total in store.category_totals(year=year, month=month)
+        ]
 
-    return db_query(query)
+    return run_statement("month_category_sums", (int(year), int(month)))
 
 
 @tool
 def average_expense(category: Optional[str] = None) -> str:
     """Get the average expense amount per category or overall."""
 
-    query = "SELECT category, AVG(amount) FROM expenses"
+    store = get_store()
+    if store is not None:
+        return [
+            {"category": name, "avg": avg}
+            for name, avg in store.category_averages(category)
+        ]
 
     if category:
-        query += f" WHERE LOWER(category) = '{category}'"
-
-    query += " GROUP BY category"
+        return run_statement("category_average", (category.lower(),))
 
-    return db_query(query)
+    return run_statement("category_averages")
 
 
 @tool
-def expense_anomalies(threshold: float = 2.0) -> dict:
+def expense_anomalies(threshold: float = 2.0, limit: int = 50) -> dict:
     """
     Identify expense anomalies where an expense is significantly higher than the category average.
-    `threshold` determines how many times above the average an expense should be flagged.
-    """
-
-    query = f"""
-        SELECT e.id, e.date, e.amount, e.category, e.description
-        FROM expenses e
-        JOIN (
-            SELECT category, AVG(amount) AS avg_amount
-            FROM expenses
-            GROUP BY category
-        ) a ON e.category = a.category
-        WHERE e.amount > (a.avg_amount * {threshold})
+    `threshold` is how many standard deviations above its category's average an expense must be
+    to be flagged. Returns at most `limit` expenses, most unusual first.
     """
 
-    return db_query(query)
+    return run_statement("scored_anomalies", (threshold, int(limit)))
 
 
 @tool
-def recurring_expenses() -> dict:
+def recurring_expenses(category: Optional[str] = None) -> dict:
     """
-    Detect recurring expenses that appear at least `min_count` times.
+    Detect recurring payments such as subscriptions, bills and memberships: the same
+    description repeating weekly, monthly, quarterly or yearly at a similar amount.
     """
 
-    query = f"""
-        SELECT category, COUNT(*) as occurrences, SUM(amount) as total_spent
-        FROM expenses
-        GROUP BY category
-        HAVING COUNT(*) >= 5
-        ORDER BY occurrences DESC
-    """
+    if category:
+        return run_statement("recurring_series_by_category", (category.lower(),))
 
-    return db_query(query)
+    return run_statement("recurring_series")
 
 
 @tool
 def check_budget(category: str, budget_limit: float) -> str:
     """Check if expenses in a category exceed a given budget limit."""
 
-    query = f"""
-        SELECT SUM(amount) as total_spent FROM expenses WHERE LOWER(category) = '{category}'
-    """
-
-    result = db_query(query)  # Returns a list of dictionaries
+    result = run_statement("category_spent", (category.lower(),))  # Returns a list of dictionaries
 
     if result and result[0]["total_spent"] is not None:
         total_spent = float(result[0]["total_spent"])  # Extract the sum value properly
@@ -175,79 +171,95 @@ def check_budget(category: str, budget_limit: float) -> str:
 
 
 @tool
-def daterange_all_expenses(from_date: str, to_date: str) -> list:
-    """Retrieve all expenses within a given date range (inclusive)."""
-
-    query = f"""
-        SELECT id, date, amount, category, description
-        FROM expenses
-        WHERE date::DATE BETWEEN '{from_date}' AND '{to_date}'
-        ORDER BY date ASC
+def daterange_all_expenses(
+    from_date: str,
+    to_date: str,
+    page_size: Optional[int] = None,
+    page_token: Optional[str] = None,
+) -> list:
     """
+    Retrieve all expenses within a given date range (inclusive).
+    Pass page_size (and the previous next_page_token) to page through them.
+    """
+
+    if page_size or page_token:
+        try:
+            rows, next_page_token = fetch_page(
+                "date BETWEEN %s AND %s",
+                (from_date, to_date),
+                order="ASC",
+                page_size=page_size or 50,
+                page_token=page_token,
+                columns="id, date, amount, category, description",
+            )
+        except InvalidPageToken:
+            return {"error": "Invalid page_token"}
+        return {"expenses": rows, "next_page_token": next_page_token}
 
-    return db_query(query)
+    store = get_store()
+    if store is not None:
+        return store.date_range(from_date, to_date)
+
+    return run_statement("daterange_expenses", (from_date, to_date))
 
 
 @tool
 def daterange_category_expenses(category: str, from_date: str, to_date: str) -> list:
     """Retrieve expenses for a specific category within a given date range (inclusive)."""
 
-    query = f"""
-        SELECT id, date, amount, category, description
-        FROM expenses
-        WHERE LOWER(category) = '{category.lower()}'
-        AND date::DATE BETWEEN '{from_date}' AND '{to_date}'
-        ORDER BY date ASC
-    """
+    store = get_store()
+    if store is not None:
+        return store.date_range(from_date, to_date, category)
 
-    return db_query(query)
+    return run_statement(
+        "daterange_category_expenses", (category.lower(), from_date, to_date)
+    )
 
 
 @tool
 def highest_expense() -> dict:
     """Retrieve the highest expense recorded."""
 
-    query = "SELECT * FROM expenses ORDER BY amount DESC LIMIT 1"
-    return db_query(query)
+    return run_statement("highest_expense")
 
 
 @tool
 def lowest_expense() -> dict:
     """Retrieve the lowest expense recorded."""
 
-    query = "SELECT * FROM expenses ORDER BY amount ASC LIMIT 1"
-    return db_query(query)
+    return run_statement("lowest_expense")
 
 
 @tool
 def category_percentage() -> dict:
     """Calculate the percentage of total expenses spent on each category."""
 
-    query = """
-        SELECT category, 
-               SUM(amount) AS total_spent, 
-               (SUM(amount) * 100 / (SELECT SUM(amount) FROM expenses)) AS percentage
-        FROM expenses
-        GROUP BY category
-        ORDER BY percentage DESC
-    """
+    store = get_store()
+    if store is not None:
+        totals = store.category_totals()
+        overall = sum(total for _, total in totals)
+        result = [
+            {"category": name, "total_spent": total, "percentage": total * 100 / overall}
+            for name, total in totals
+        ]
+        return sorted(result, key=lambda row: row["percentage"], reverse=True)
 
-    return db_query(query)
+    return run_statement("category_percentages")
 
 
 @tool
 def yearly_expense_summary(year: int) -> dict:
     """Summarize total expenses per category for a given year."""
 
-    query = f"""
-        SELECT category, SUM(amount) AS total_spent
-        FROM expenses
-        WHERE EXTRACT(YEAR FROM date::DATE) = {year}
-        GROUP BY category
-        ORDER BY total_spent DESC
-    """
+    store = get_store()
+    if store is not None:
+        result = [
+            {"category": name, "total_spent": total}
+            for name, total in store.category_totals(year=year)
+        ]
+        return sorted(result, key=lambda row: row["total_spent"], reverse=True)
 
-    return db_query(query)
+    return run_statement("year_category_totals", (int(year),))
 
 
 @tool
@@ -257,57 +269,36 @@ def expense_trends(interval: str = "monthly") -> dict:
     `interval` can be 'monthly' or 'yearly'.
     """
 
+    store = get_store()
+    if store is not None:
+        if interval == "monthly":
+            return [
+                {"year": year, "month": month, "total_spent": total}
+                for (year, month), total in store.period_totals("monthly")
+            ]
+        return [
+            {"year": year, "total_spent": total}
+            for year, total in store.period_totals("yearly")
+        ]
+
     if interval == "monthly":
-        query = """
-            SELECT EXTRACT(YEAR FROM date::DATE) AS year, 
-                   EXTRACT(MONTH FROM date::DATE) AS month, 
-                   SUM(amount) AS total_spent
-            FROM expenses
-            GROUP BY year, month
-            ORDER BY year DESC, month DESC
-        """
-    else:
-        query = """
-            SELECT EXTRACT(YEAR FROM date::DATE) AS year, 
-                   SUM(amount) AS total_spent
-            FROM expenses
-            GROUP BY year
-            ORDER BY year DESC
-        """
+        return run_statement("monthly_trends")
 
-    return db_query(query)
+    return run_statement("yearly_trends")
 
 
 @tool
 def predict_future_expenses(months_ahead: int) -> dict:
     """
     Estimate future expenses based on historical data.
-    Uses an average of past monthly expenses to predict expenses for upcoming months.
+    Fits the trend and month-of-year pattern of past monthly spending and returns,
+    for each upcoming month, the expected total with a 95% range, overall and per category.
     """
 
-    query = """
-        WITH monthly_avg AS (
-            SELECT EXTRACT(YEAR FROM date::DATE) AS year,
-                   EXTRACT(MONTH FROM date::DATE) AS month,
-                   SUM(amount) AS total_spent
-            FROM expenses
-            GROUP BY year, month
-        )
-        SELECT AVG(total_spent) AS predicted_expense
-        FROM monthly_avg
-    """
-
-    result = db_query(query)
-    print(result)
-
-    if result and result[0]["predicted_expense"] is not None:
-        avg_expense = float(result[0]["predicted_expense"])
-        predictions = {
-            f"Month {i+1}": round(avg_expense, 2) for i in range(months_ahead)
-        }
-        return predictions
-    else:
+    result = forecast.forecast(months_ahead)
+    if result is None:
         return {"message": "Not enough data to predict future expenses."}
+    return result
 
 
 @tool
@@ -321,11 +312,11 @@ def compare_periods_expenses(
     Compare the total expenses between two date ranges.
     Returns the totals for each period, the difference, and the percentage change.
     """
-    query1 = f"SELECT SUM(amount) AS total_spent FROM expenses WHERE date::DATE BETWEEN '{from_date_1}' AND '{to_date_1}'"
-    query2 = f"SELECT SUM(amount) AS total_spent FROM expenses WHERE date::DATE BETWEEN '{from_date_2}' AND '{to_date_2}'"
-
-    result1 = db_query(query1)
-    result2 = db_query(query2)
+    # Both totals are read over the same pooled connection, which prepares
+    # the statement once and executes it twice.
+    with get_connection() as conn:
+        result1 = run_statement("period_total", (from_date_1, to_date_1), conn=conn)
+        result2 = run_statement("period_total", (from_date_2, to_date_2), conn=conn)
 
     total1 = (
         float(result1[0]["total_spent"])
@@ -358,12 +349,17 @@ def compare_periods_expenses(
 
 
 @tool
-def recent_expenses(limit: int) -> dict:
-    """Return the most recent expenses."""
-
-    query = f"SELECT * FROM expenses ORDER BY date DESC LIMIT {limit}"
+def recent_expenses(limit: int, page_token: Optional[str] = None) -> dict:
+    """
+    Return the most recent expenses, newest first.
+    Pass the previous next_page_token to continue with the next `limit` older ones.
+    """
 
-    return db_query(query)
+    try:
+        rows, next_page_token = fetch_page(page_size=limit, page_token=page_token)
+    except InvalidPageToken:
+        return {"error": "Invalid page_token"}
+    return {"expenses": rows, "next_page_token": next_page_token}
 
 
 @tool
@@ -373,14 +369,7 @@ def suggest_savings() -> str:
     This tool calculates the average expense per category and identifies the category
     with the highest average expense.
     """
-    query = """
-        SELECT category, AVG(amount) AS avg_spent
-        FROM expenses
-        GROUP BY category
-        ORDER BY avg_spent DESC
-        LIMIT 1
-    """
-    result = db_query(query)
+    result = run_statement("highest_average_category")
 
     if result and result[0]["avg_spent"] is not None:
         highest_category = result[0]["category"]
@@ -397,15 +386,7 @@ def suggest_savings() -> str:
 def encourage_spending() -> dict:
     """Encourage the user to increase their expenses on specific categories."""
 
-    query = """
-        SELECT category, AVG(amount) AS avg_spent
-        FROM expenses
-        GROUP BY category
-        ORDER BY avg_spent ASC
-        LIMIT 1
-    """
-
-    result = db_query(query)
+    result = run_statement("lowest_average_category")
 
     if result and result[0]["avg_spent"] is not None:
         lowest_category = result[0]["category"]
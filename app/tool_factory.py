@@ -3,6 +3,10 @@ from enum import Enum
 from typing import Optional, Any, Dict, List
 from langchain_core.tools import tool
 from app.db_utils import *
+from app.columnar import get_store
+from app import forecast
+from app.pagination import fetch_page, InvalidPageToken
+from app.statements import run_statement, like_pattern
 import os
 
 db_uri = os.getenv("POSTGRES_URL")
@@ -46,15 +50,25 @@ def create_expense(
 
 # 3. Select all expenses
 @tool
-def get_all_expenses() -> Dict[str, Any]:
+def get_all_expenses(
+    page_size: Optional[int] = None, page_token: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Returns all expense records.
+    Pass page_size (and the previous next_page_token) to page through them newest first.
     """
-    query = "SELECT * FROM expenses"
+    if page_size or page_token:
+        try:
+            rows, next_page_token = fetch_page(
+                page_size=page_size or 50, page_token=page_token
+            )
+        except InvalidPageToken:
+            return {"error": "Invalid page_token"}
+        return {"expenses": rows, "next_page_token": next_page_token}
 
-    print("SQL:", query)
+    print("SQL:", "all_expenses")
 
-    return db_query(query)
+    return run_statement("all_expenses")
 
 
 # 4. Filter expenses by category
@@ -63,24 +77,39 @@ def get_expenses_by_category(category: Category) -> Dict[str, Any]:
     """
     Returns expenses filtered by category.
     """
-    query = f"SELECT * FROM expenses WHERE category = '{category.value}'"
+    params = (category.value,)
 
-    print("SQL:", query)
+    print("SQL:", "expenses_by_category", params)
 
-    return db_query(query)
+    return run_statement("expenses_by_category", params)
 
 
 # 5. Filter expenses by a date range
 @tool
-def get_expenses_by_date_range(start_date: str, end_date: str) -> Dict[str, Any]:
+def get_expenses_by_date_range(
+    start_date: str, end_date: str, category: Optional[Category] = None
+) -> Dict[str, Any]:
     """
-    Returns expenses that fall between start_date and end_date.
+    Returns expenses that fall between start_date and end_date, optionally only one category.
     """
-    query = f"SELECT * FROM expenses WHERE date BETWEEN '{start_date}' AND '{end_date}'"
+    store = get_store()
+    if store is not None:
+        return store.date_range(
+            start_date, end_date, category.value if category is not None else None
+        )
+
+    if category is not None:
+        params = (category.value, start_date, end_date)
+
+        print("SQL:", "daterange_category_expenses", params)
+
+        return run_statement("daterange_category_expenses", params)
+
+    params = (start_date, end_date)
 
-    print("SQL:", query)
+    print("SQL:", "expenses_by_date_range", params)
 
-    return db_query(query)
+    return run_statement("expenses_by_date_range", params)
 
 
 # 6. Filter expenses above a given amount in descending order
@@ -89,19 +118,25 @@ def get_expenses_above_amount(min_amount: float) -> Dict[str, Any]:
     """
     Returns expenses with amount greater than min_amount in descending order.
     """
-    query = f"SELECT * FROM expenses WHERE amount > {min_amount} ORDER BY amount DESC"
+    params = (min_amount,)
 
-    print("SQL:", query)
+    print("SQL:", "expenses_above_amount", params)
 
-    return db_query(query)
+    return run_statement("expenses_above_amount", params)
 
 
 # 7. Sort expenses by a specified column and order
 @tool
-def get_sorted_expenses(order_by: str = "date", order: str = "DESC") -> Dict[str, Any]:
+def get_sorted_expenses(
+    order_by: str = "date",
+    order: str = "DESC",
+    page_size: Optional[int] = None,
+    page_token: Optional[str] = None,
+) -> Dict[str, Any]:
     """
     Returns expenses sorted by the specified column and order.
     Only allows ordering by specific columns.
+    Pass page_size (and the previous next_page_token) to page through them.
     """
     allowed_columns = {"date", "amount", "category", "description"}
     if order_by not in allowed_columns:
@@ -109,11 +144,22 @@ def get_sorted_expenses(order_by: str = "date", order: str = "DESC") -> Dict[str
     order = order.upper()
     if order not in {"ASC", "DESC"}:
         return {"error": "Invalid order"}
-    query = f"SELECT * FROM expenses ORDER BY {order_by} {order}"
+    if page_size or page_token:
+        try:
+            rows, next_page_token = fetch_page(
+                order_by=order_by,
+                order=order,
+                page_size=page_size or 50,
+                page_token=page_token,
+            )
+        except InvalidPageToken:
+            return {"error": "Invalid page_token"}
+        return {"expenses": rows, "next_page_token": next_page_token}
+    statement = f"sorted_by_{order_by}_{order.lower()}"
 
-    print("SQL:", query)
+    print("SQL:", statement)
 
-    return db_query(query)
+    return run_statement(statement)
 
 
 # 8. Limit the number of returned expense records
@@ -130,28 +176,38 @@ def get_limited_expenses(
     order = order.upper()
     if order not in {"ASC", "DESC"}:
         return {"error": "Invalid order"}
-    query = f"SELECT * FROM expenses ORDER BY {order_by} {order} LIMIT {limit}"
+    statement = f"limited_by_{order_by}_{order.lower()}"
+    params = (int(limit),)
 
-    print("SQL:", query)
+    print("SQL:", statement, params)
 
-    return db_query(query)
+    return run_statement(statement, params)
 
 
 # 9. Aggregate: Sum of amounts by category
 @tool
-def aggregate_sum_by_category() -> Dict[str, Any]:
-    """
-    Returns the sum of amounts for each category.
+def aggregate_sum_by_category(category: Optional[Category] = None) -> Dict[str, Any]:
     """
-    query = """
-    SELECT category, SUM(amount) AS total_amount
-    FROM expenses
-    GROUP BY category
+    Returns the sum of amounts for each category, or only for the given category.
     """
+    store = get_store()
+    if store is not None:
+        return [
+            {"category": name, "total_amount": total}
+            for name, total in store.category_totals()
+            if category is None or name == category.value
+        ]
+
+    if category is not None:
+        params = (category.value,)
+
+        print("SQL:", "category_total", params)
+
+        return run_statement("category_total", params)
 
-    print("SQL:", query)
+    print("SQL:", "category_sums")
 
-    return db_query(query)
+    return run_statement("category_sums")
 
 
 # 10. Aggregate: Count expenses by category
@@ -160,15 +216,9 @@ def count_expenses_by_category() -> Dict[str, Any]:
     """
     Returns the count of expenses for each category.
     """
-    query = """
-    SELECT category, COUNT(*) AS expenses_count
-    FROM expenses
-    GROUP BY category
-    """
-
-    print("SQL:", query)
+    print("SQL:", "category_counts")
 
-    return db_query(query)
+    return run_statement("category_counts")
 
 
 # 11. Aggregate with HAVING: Only include categories whose sum exceeds a given value
@@ -177,16 +227,19 @@ def aggregate_with_having(min_total: float) -> Dict[str, Any]:
     """
     Returns categories where the total amount exceeds min_total.
     """
-    query = f"""
-    SELECT category, SUM(amount) AS total_amount
-    FROM expenses
-    GROUP BY category
-    HAVING SUM(amount) > {min_total}
-    """
+    store = get_store()
+    if store is not None:
+        return [
+            {"category": name, "total_amount": total}
+            for name, total in store.category_totals()
+            if total > min_total
+        ]
 
-    print("SQL:", query)
+    params = (min_total,)
 
-    return db_query(query)
+    print("SQL:", "category_sums_above", params)
+
+    return run_statement("category_sums_above", params)
 
 
 # 12. Subquery: Select expenses with amount above the overall average
@@ -195,15 +248,13 @@ def get_expenses_above_average() -> Dict[str, Any]:
     """
     Returns expenses where the amount is above the overall average.
     """
-    query = """
-    SELECT *
-    FROM expenses
-    WHERE amount > (SELECT AVG(amount) FROM expenses)
-    """
+    store = get_store()
+    if store is not None:
+        return store.above_average()
 
-    print("SQL:", query)
+    print("SQL:", "expenses_above_average")
 
-    return db_query(query)
+    return run_statement("expenses_above_average")
 
 
 # 13. CTE: Use a Common Table Expression to filter by aggregated totals
@@ -213,20 +264,19 @@ def get_expenses_with_cte(min_total: float) -> Dict[str, Any]:
     Returns categories (and their totals) where the total amount is above min_total,
     using a CTE.
     """
-    query = f"""
-    WITH category_totals AS (
-        SELECT category, SUM(amount) AS total_amount
-        FROM expenses
-        GROUP BY category
-    )
-    SELECT *
-    FROM category_totals
-    WHERE total_amount > {min_total}
-    """
+    store = get_store()
+    if store is not None:
+        return [
+            {"category": name, "total_amount": total}
+            for name, total in store.category_totals()
+            if total > min_total
+        ]
 
-    print("SQL:", query)
+    params = (min_total,)
 
-    return db_query(query)
+    print("SQL:", "category_totals_above_cte", params)
+
+    return run_statement("category_totals_above_cte", params)
 
 
 # 14. Window Function: Running total per category
@@ -235,15 +285,9 @@ def get_expenses_with_running_total() -> Dict[str, Any]:
     """
     Returns expenses along with a running total per category.
     """
-    query = """
-    SELECT date, amount, category, description,
-           SUM(amount) OVER (PARTITION BY category ORDER BY date) AS running_total
-    FROM expenses
-    """
-
-    print("SQL:", query)
+    print("SQL:", "running_totals")
 
-    return db_query(query)
+    return run_statement("running_totals")
 
 
 # 17. Distinct: Get unique expense categories
@@ -252,11 +296,9 @@ def get_distinct_categories() -> Dict[str, Any]:
     """
     Returns a list of distinct expense categories.
     """
-    query = "SELECT DISTINCT category FROM expenses"
+    print("SQL:", "distinct_categories")
 
-    print("SQL:", query)
-
-    return db_query(query)
+    return run_statement("distinct_categories")
 
 
 # 18. UNION: Combine expenses from two different categories
@@ -267,15 +309,11 @@ def union_expenses_by_categories(
     """
     Returns expenses for two categories combined using UNION.
     """
-    query = f"""
-    SELECT * FROM expenses WHERE category = '{category1.value}'
-    UNION
-    SELECT * FROM expenses WHERE category = '{category2.value}'
-    """
+    params = (category1.value, category2.value)
 
-    print("SQL:", query)
+    print("SQL:", "union_categories", params)
 
-    return db_query(query)
+    return run_statement("union_categories", params)
 
 
 # 20. Full-Text Search: Search expenses by description using a LIKE query
@@ -284,15 +322,11 @@ def partial_text_search_expenses(search_term: str) -> Dict[str, Any]:
     """
     Returns expenses where the description matches the search term using a LIKE query.
     """
-    query = f"""
-    SELECT *
-    FROM expenses
-    WHERE description LIKE '%{search_term}%'
-    """
+    params = (like_pattern(search_term),)
 
-    print("SQL:", query)
+    print("SQL:", "description_search", params)
 
-    return db_query(query)
+    return run_statement("description_search", params)
 
 
 # 21. Advanced Example: Using a CASE expression for conditional output
@@ -302,22 +336,9 @@ def advanced_case_expenses() -> Dict[str, Any]:
     Returns expenses with an additional column 'expenses_type' that labels
     the expenses as Credit, Debit, or Neutral based on the amount.
     """
-    query = """
-    SELECT date,
-           amount,
-           category,
-           description,
-           CASE 
-               WHEN amount > 0 THEN 'Credit'
-               WHEN amount < 0 THEN 'Debit'
-               ELSE 'Neutral'
-           END AS expenses_type
-    FROM expenses
-    """
-
-    print("SQL:", query)
+    print("SQL:", "expense_types")
 
-    return db_query(query)
+    return run_statement("expense_types")
 
 
 # 22. Self-Join: Compare each expense to the previous day's expense
@@ -326,17 +347,57 @@ def self_join_previous_day_expenses() -> Dict[str, Any]:
     """
     Returns expenses along with the previous day's amount (if any) by self-joining the table.
     """
-    query = """
-    SELECT a.date, a.amount, a.category, a.description,
-           b.amount AS previous_day_amount
-    FROM expenses a
-    LEFT JOIN expenses b
-      ON b.date = a.date - INTERVAL '1 day'
+    print("SQL:", "previous_day_join")
+
+    return run_statement("previous_day_join")
+
+
+# 23. Anomalies: expenses far above their category's average, by stored z-score
+@tool
+def expense_anomalies(threshold: float = 2.0, limit: int = 50) -> Dict[str, Any]:
+    """
+    Returns expenses that are significantly higher than their category's average.
+    threshold is how many standard deviations above the average an expense must be.
+    Returns at most limit expenses, most unusual first.
+    """
+    params = (threshold, int(limit))
+
+    print("SQL:", "scored_anomalies", params)
+
+    return run_statement("scored_anomalies", params)
+
+
+# 24. Forecast: expected monthly spending from the trend and seasonality so far
+@tool
+def predict_future_expenses(months_ahead: int) -> Dict[str, Any]:
+    """
+    Estimate future expenses based on historical data.
+    Returns, for each of the next months_ahead months, the expected total with a 95% range,
+    overall and per category.
     """
+    result = forecast.forecast(months_ahead)
+    if result is None:
+        return {"message": "Not enough data to predict future expenses."}
+    return result
+
+
+# 25. Recurring payments: descriptions repeating on a regular cadence
+@tool
+def recurring_expenses(category: Optional[Category] = None) -> Dict[str, Any]:
+    """
+    Returns recurring payments such as subscriptions, bills and memberships: the same
+    description repeating weekly, monthly, quarterly or yearly at a similar amount.
+    """
+    if category is not None:
+        params = (category.value,)
+
+        print("SQL:", "recurring_series_by_category", params)
+
+        return run_statement("recurring_series_by_category", params)
 
-    print("SQL:", query)
+    print("SQL:", "recurring_series")
 
-    return db_query(query)
+    return run_statement("recurring_series")
 
 
 @tool
@@ -378,6 +439,9 @@ tools = [
     partial_text_search_expenses,
     advanced_case_expenses,
     self_join_previous_day_expenses,
+    expense_anomalies,
+    predict_future_expenses,
+    recurring_expenses,
     greetings,
     unknown,
 ]
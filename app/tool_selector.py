@@ -0,0 +1,151 @@
+import math
+import re
+from collections import Counter
+
+# Everyday words mapped onto the vocabulary used in tool names and docstrings.
+SYNONYMS = {
+    "total": ["sum", "aggregate"],
+    "spend": ["sum", "total"],
+    "spent": ["sum", "total"],
+    "much": ["sum", "total"],
+    "biggest": ["highest", "amount", "sorted", "limited"],
+    "largest": ["highest", "amount", "sorted", "limited"],
+    "top": ["highest", "limited", "sorted"],
+    "max": ["highest", "max"],
+    "most": ["highest"],
+    "expensive": ["highest", "amount"],
+    "smallest": ["lowest", "amount", "sorted", "limited"],
+    "cheapest": ["lowest", "amount"],
+    "least": ["lowest"],
+    "min": ["lowest", "min"],
+    "month": ["monthly", "date", "range"],
+    "year": ["yearly"],
+    "annual": ["yearly"],
+    "between": ["range", "daterange"],
+    "from": ["range", "daterange"],
+    "since": ["range", "daterange"],
+    "week": ["date", "range", "daterange"],
+    "today": ["date", "range", "daterange"],
+    "yesterday": ["date", "range", "daterange"],
+    "ago": ["date", "range", "daterange"],
+    "last": ["recent", "limited"],
+    "latest": ["recent", "limited"],
+    "newest": ["recent", "sorted"],
+    "sort": ["sorted"],
+    "order": ["sorted"],
+    "trend": ["trends", "running"],
+    "forecast": ["predict", "future"],
+    "next": ["predict", "future"],
+    "save": ["savings", "suggest"],
+    "reduce": ["savings", "suggest"],
+    "cut": ["savings", "suggest"],
+    "unusual": ["anomalies", "above"],
+    "anomaly": ["anomalies"],
+    "outlier": ["anomalies"],
+    "repeat": ["recurring"],
+    "subscription": ["recurring"],
+    "monthly": ["recurring", "monthly"],
+    "percent": ["percentage"],
+    "share": ["percentage"],
+    "breakdown": ["category", "percentage", "aggregate"],
+    "average": ["average", "avg"],
+    "mean": ["average", "avg"],
+    "list": ["all"],
+    "find": ["search"],
+    "containing": ["search", "text"],
+    "versus": ["compare"],
+    "vs": ["compare"],
+    "how": ["count"],
+    "many": ["count"],
+    "categories": ["distinct", "category"],
+}
+
+for weekday in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"):
+    SYNONYMS[weekday] = ["date", "range", "daterange"]
+
+CATEGORY_WORDS = {
+    "food", "travel", "transport", "entertainment", "utilities", "grocery",
+    "groceries", "shopping", "electronics", "health", "miscellaneous", "automobile",
+}
+
+STOPWORDS = {
+    "a", "an", "the", "of", "for", "on", "in", "to", "and", "or", "my", "me",
+    "i", "is", "are", "was", "what", "did", "do", "show", "give", "returns",
+    "return", "with", "by", "be", "this", "that",
+}
+
+
+def words(text: str):
+    return re.findall(r"[a-z0-9]+", (text or "").lower().replace("_", " "))
+
+
+def stem(word: str):
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def tokenize(text: str):
+    tokens = []
+    for word in words(text):
+        if re.fullmatch(r"\d{4}", word) or re.fullmatch(r"\d{2}", word):
+            tokens += ["date", "range"]
+        elif word not in STOPWORDS:
+            tokens.append(stem(word))
+    return tokens
+
+
+class ToolSelector:
+    """Keyword (TF-IDF) index over tool names, docstrings and argument names."""
+
+    def __init__(self, tools, top_k=6, always=("create_expense", "greetings", "unknown"), min_score=1.0):
+        self.tools = list(tools)
+        self.top_k = top_k
+        self.always = [tool for tool in self.tools if tool.name in always]
+        self.min_score = min_score
+
+        self.documents = {}
+        for tool in self.tools:
+            text = " ".join(
+                [tool.name, tool.name, tool.description or ""]
+                + list(getattr(tool, "args", {}) or {})
+            )
+            self.documents[tool.name] = Counter(tokenize(text))
+
+        document_frequency = Counter()
+        for terms in self.documents.values():
+            document_frequency.update(set(terms))
+        total = len(self.documents)
+        self.idf = {
+            term: math.log(1 + total / count) for term, count in document_frequency.items()
+        }
+
+    def expand(self, text: str):
+        terms = tokenize(text)
+        for word in words(text):
+            for synonym in SYNONYMS.get(word, []):
+                terms.extend(tokenize(synonym))
+            if word in CATEGORY_WORDS:
+                terms.append("category")
+        return terms
+
+    def score(self, text: str):
+        terms = set(self.expand(text))
+        scores = {}
+        for name, document in self.documents.items():
+            scores[name] = sum(
+                self.idf[term] * (1 + math.log(document[term]))
+                for term in terms
+                if document[term]
+            )
+        return scores
+
+    def select(self, text: str):
+        """Return the top-k tools for `text` plus the always-bound ones, or None for the full set."""
+        scores = self.score(text)
+        ranked = sorted(
+            (tool for tool in self.tools if tool not in self.always),
+            key=lambda tool: -scores[tool.name],
+        )
+        if not ranked or scores[ranked[0].name] < self.min_score:
+            return None
+        chosen = [tool for tool in ranked[: self.top_k] if scores[tool.name] > 0]
+        return self.always + chosen
@@ -0,0 +1,69 @@
+import asyncio
+import time
+import uuid
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+
+def prompt_text(input_data) -> str:
+    """Flatten a string, message list or multimodal payload into plain text."""
+    if isinstance(input_data, str):
+        return input_data
+    parts = []
+    for message in input_data if isinstance(input_data, list) else [input_data]:
+        content = message.get("content") if isinstance(message, dict) else getattr(message, "content", message)
+        if isinstance(content, list):
+            parts += [item.get("text", "") for item in content if isinstance(item, dict)]
+        else:
+            parts.append(str(content))
+    return "\n".join(parts)
+
+
+class FakeChatModel:
+    """Deterministic stand-in for the Groq chat models.
+
+    `script(prompt, tool_names)` returns either a string reply or a list of
+    (tool_name, args) pairs. Every call sleeps `latency` seconds (plus
+    `per_token_latency` per streamed chunk) to mimic network and decode time.
+    """
+
+    def __init__(self, script=None, latency=0.0, per_token_latency=0.0, tool_names=None):
+        self.script = script or (lambda prompt, tool_names: "ok")
+        self.latency = latency
+        self.per_token_latency = per_token_latency
+        self.tool_names = tool_names
+        self.calls = 0
+
+    def bind_tools(self, tools, **kwargs):
+        return FakeChatModel(
+            self.script,
+            self.latency,
+            self.per_token_latency,
+            tool_names={tool.name for tool in tools},
+        )
+
+    def _reply(self, input_data):
+        self.calls += 1
+        reply = self.script(prompt_text(input_data), self.tool_names)
+        if isinstance(reply, str):
+            return AIMessage(content=reply)
+        tool_calls = [
+            {"name": name, "args": dict(args), "id": uuid.uuid4().hex, "type": "tool_call"}
+            for name, args in reply
+            if self.tool_names is None or name in self.tool_names
+        ]
+        return AIMessage(content="", tool_calls=tool_calls)
+
+    def invoke(self, input_data, *args, **kwargs):
+        time.sleep(self.latency)
+        return self._reply(input_data)
+
+    async def ainvoke(self, input_data, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._reply(input_data)
+
+    async def astream(self, input_data, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        content = self._reply(input_data).content
+        for word in content.split(" "):
+            await asyncio.sleep(self.per_token_latency)
+            yield AIMessageChunk(content=word + " ")
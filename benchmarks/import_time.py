@@ -0,0 +1,73 @@
+"""Measure how long importing the app takes, and which modules dominate.
+
+    python -m benchmarks.import_time [--module main] [--top 15] [--runs 5]
+
+Each run is a fresh interpreter with POSTGRES_URL and GROQ_API_KEY removed,
+so a module that connects or builds clients at import shows up as a failure.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_once(module):
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ("POSTGRES_URL", "GROQ_API_KEY")
+    }
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - started
+    if completed.returncode != 0:
+        sys.exit(f"import {module} failed offline:\n{completed.stderr[-2000:]}")
+    return elapsed, completed.stderr
+
+
+def parse_importtime(output):
+    """Return {module: cumulative microseconds} from `-X importtime` output."""
+    cumulative = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    timings = []
+    for _ in range(args.runs):
+        elapsed, output = import_once(args.module)
+        timings.append(elapsed)
+
+    print(
+        f"import {args.module}: median {statistics.median(timings) * 1000:.0f} ms "
+        f"over {args.runs} runs (interpreter start included)"
+    )
+    cumulative = parse_importtime(output)
+    print("\nSlowest modules (cumulative ms, last run):")
+    for name, micros in sorted(cumulative.items(), key=lambda item: -item[1])[: args.top]:
+        print(f"   {micros / 1000:>9.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
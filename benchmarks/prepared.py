@@ -0,0 +1,132 @@
+"""Prepared-statement micro-benchmark: what binding and preparing saves per tool query.
+
+For a few registered statements, runs the same randomized calls two ways on
+one pooled connection:
+
+- inline: values formatted into the SQL text, as the tools used to, so every
+  call is a new statement to parse and plan;
+- prepared: `run_statement`, which prepares once per connection and executes
+  with bound parameters.
+
+On Postgres it also reads the server's own "Planning Time" from EXPLAIN
+ANALYZE for both. Usage:
+
+    python -m benchmarks.prepared --rows 100000 --calls 500
+
+Uses the same throwaway database settings as `benchmarks.run`.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+
+from benchmarks.run import CATEGORIES, seed_database, summarize  # sets the storage env first
+from app import db_utils
+from app.statements import STATEMENTS, run_statement
+
+# (statement, random params) pairs; each call draws fresh values, like LLM
+# tool arguments do.
+CASES = [
+    ("expenses_by_category", lambda rng: (rng.choice(CATEGORIES),)),
+    ("category_sum", lambda rng: (rng.choice(CATEGORIES),)),
+    ("month_category_sums", lambda rng: (rng.randint(2020, 2024), rng.randint(1, 12))),
+    ("limited_by_amount_desc", lambda rng: (rng.randint(1, 20),)),
+    ("period_total", lambda rng: random_range(rng)),
+    ("daterange_category_expenses", lambda rng: (rng.choice(CATEGORIES),) + random_range(rng)),
+]
+
+
+def random_range(rng):
+    year, month = rng.randint(2020, 2024), rng.randint(1, 12)
+    return (f"{year}-{month:02d}-01", f"{year}-{month:02d}-{rng.randint(1, 28):02d}")
+
+
+def literal(value):
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+
+def inline(sql, params):
+    """`sql` with its %s placeholders replaced by literals."""
+    parts = sql.split("%s")
+    return "".join(
+        part + (literal(params[index]) if index < len(params) else "")
+        for index, part in enumerate(parts)
+    )
+
+
+def planning_ms(conn, sql):
+    with conn.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Planning Time"]
+
+
+def bench_case(conn, name, make_params, calls, seed):
+    rng = random.Random(seed)
+    sql = STATEMENTS[name]
+    samples = {}
+    for _ in range(calls):
+        params = make_params(rng)
+        started = time.perf_counter()
+        db_utils.db_query(inline(sql, params), conn=conn)
+        samples.setdefault("inline", []).append(time.perf_counter() - started)
+        started = time.perf_counter()
+        run_statement(name, params, conn=conn)
+        samples.setdefault("prepared", []).append(time.perf_counter() - started)
+    report = summarize(samples)
+
+    if db_utils.db_dialect() == "postgres":
+        # Postgres switches a prepared statement to a cached generic plan after
+        # five executions, so by now EXECUTE should plan in ~0 ms.
+        params = make_params(rng)
+        placeholders = ", ".join(literal(value) for value in params)
+        execute = f"EXECUTE stmt_{name}" + (f" ({placeholders})" if params else "")
+        report["planning_ms"] = {
+            "inline": round(planning_ms(conn, inline(sql, params)), 3),
+            "prepared": round(planning_ms(conn, execute), 3),
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--calls", type=int, default=500, help="Calls per statement and mode.")
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    db_utils.init_db()
+    seed_database(args.rows)
+
+    report = {}
+    with db_utils.get_connection() as conn:
+        for seed, (name, make_params) in enumerate(CASES):
+            report[name] = bench_case(conn, name, make_params, args.calls, seed)
+
+    print(f"\n== {db_utils.db_dialect()}, {args.rows} rows, {args.calls} calls per mode")
+    for name, stats in report.items():
+        inline_ms, prepared_ms = stats["inline"]["p50_ms"], stats["prepared"]["p50_ms"]
+        line = f"{name:30} inline p50 {inline_ms:8.3f} ms   prepared p50 {prepared_ms:8.3f} ms"
+        if "planning_ms" in stats:
+            planning = stats["planning_ms"]
+            line += f"   planning {planning['inline']:.3f} -> {planning['prepared']:.3f} ms"
+        print(line)
+    saved = statistics.mean(
+        stats["inline"]["p50_ms"] - stats["prepared"]["p50_ms"] for stats in report.values()
+    )
+    print(f"mean p50 saved per query: {saved:.3f} ms")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    db_utils.close_pool()
+
+
+if __name__ == "__main__":
+    main()
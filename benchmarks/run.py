@@ -0,0 +1,310 @@
+"""Latency/throughput benchmark for the request pipeline.
+
+Runs the real routing, tool and database code with the Groq models replaced
+by `FakeChatModel`, so timings are deterministic and free. Usage:
+
+    python -m benchmarks.run --rows 1000 100000 [10000000] --llm-latency 0.3
+
+By default the data lives in a throwaway embedded SQLite file (BENCH_SQLITE_PATH,
+or a temp file), so the run needs no server or network. Set BENCH_POSTGRES_URL
+to benchmark Postgres instead. Either target is emptied for every row count, so
+never point them at real data.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from io import BytesIO
+from itertools import islice
+
+# The storage backend reads these when it is first created.
+if os.getenv("BENCH_POSTGRES_URL"):
+    os.environ["STORAGE_BACKEND"] = "postgres"
+    os.environ["POSTGRES_URL"] = os.environ["BENCH_POSTGRES_URL"]
+else:
+    os.environ["STORAGE_BACKEND"] = "sqlite"
+    os.environ["SQLITE_PATH"] = os.getenv("BENCH_SQLITE_PATH") or os.path.join(
+        tempfile.mkdtemp(prefix="expense-bench-"), "bench.db"
+    )
+os.environ.setdefault("GROQ_API_KEY", "benchmark")
+
+from PIL import Image  # noqa: E402
+
+from benchmarks.fake_llm import FakeChatModel  # noqa: E402
+from ingest import COPY_SQL, CopyStream, STORED_COLUMNS  # noqa: E402
+from app.rollups import accumulate, apply_rollups  # noqa: E402
+from app.anomalies import load_stats, save_stats, score_rows  # noqa: E402
+from app.recurrence import description_key  # noqa: E402
+from app.storage import execute_values  # noqa: E402
+from app import columnar  # noqa: E402
+from app import db_utils, langchain_utils  # noqa: E402
+from app.image_utils import preprocess_image  # noqa: E402
+
+CATEGORIES = [
+    "food", "travel", "transport", "entertainment", "utilities", "grocery",
+    "shopping", "electronics", "health", "miscellaneous", "automobile", "other",
+]
+
+# (question, candidate tool calls): the fake intent model answers with the
+# first candidate present in the bound tool set, like the fast router does.
+WORKLOAD = [
+    ("how much did I spend on food?", [("sum_expense", {"category": "food"}), ("get_expenses_by_category", {"category": "food"})]),
+    ("what is my biggest expense?", [("highest_expense", {}), ("get_limited_expenses", {"limit": 1, "order_by": "amount", "order": "DESC"})]),
+    ("show expenses in january 2024", [("daterange_all_expenses", {"from_date": "2024-01-01", "to_date": "2024-01-31"}), ("get_expenses_by_date_range", {"start_date": "2024-01-01", "end_date": "2024-01-31"})]),
+    ("breakdown of spending by category", [("category_percentage", {}), ("aggregate_sum_by_category", {})]),
+    ("monthly trend of my spending", [("expense_trends", {"interval": "monthly"}), ("count_expenses_by_category", {})]),
+    ("spending in march 2024 per category", [("monthly_expense_summary", {"year": 2024, "month": 3}), ("aggregate_with_having", {"min_total": 0})]),
+    ("any unusual expenses?", [("expense_anomalies", {"threshold": 2.0}), ("get_expenses_above_average", {})]),
+    ("my last 10 expenses", [("recent_expenses", {"limit": 10}), ("get_limited_expenses", {"limit": 10, "order_by": "date", "order": "DESC"})]),
+    ("find lunch expenses", [("search_by_fields", {"category": "food"}), ("partial_text_search_expenses", {"search_term": "lunch"})]),
+]
+ANSWERS = {question: candidates for question, candidates in WORKLOAD}
+
+SUMMARY = (
+    "You spent a moderate amount in this period, mostly on food and travel, "
+    "with one unusually large purchase worth checking against your budget."
+)
+RECEIPT = '{"date": "2024-05-02", "amount": 23.45, "category": "food", "description": "lunch"}'
+
+
+def script(prompt, tool_names):
+    """Scripted replies for intent, summarization and vision prompts."""
+    if prompt.startswith("User Input: "):
+        question = prompt[len("User Input: "):].split("\n", 1)[0]
+        for name, args in ANSWERS.get(question, []):
+            if tool_names is None or name in tool_names:
+                return [(name, args)]
+        return []
+    if "receipt" in prompt:
+        return RECEIPT
+    return SUMMARY
+
+
+def install_fake_models(latency, per_token_latency):
+    fake = FakeChatModel(script, latency, per_token_latency)
+    fake_with_tools = fake.bind_tools(langchain_utils.tools)
+    # Callers look the factories up as module globals, so replacing them is enough.
+    langchain_utils.get_llm = lambda: fake
+    langchain_utils.get_llm_with_tools = lambda: fake_with_tools
+    langchain_utils.get_llm_vision = lambda: fake
+    langchain_utils.bind_tool_subset.cache_clear()
+
+
+def synthetic_rows(count, seed=0):
+    rng = random.Random(seed)
+    start = date(2020, 1, 1)
+    for _ in range(count):
+        category = rng.choice(CATEGORIES)
+        yield (
+            "%032x" % rng.getrandbits(128),
+            (start + timedelta(days=rng.randrange(365 * 5))).isoformat(),
+            round(rng.uniform(1, 1000), 2),
+            category,
+            f"{category} purchase {rng.randrange(50)}",
+        )
+
+
+def copy_rows(conn, cursor, rows, batch_size):
+    while True:
+        stream = CopyStream(rows, batch_size, load_stats(cursor))
+        cursor.copy_expert(COPY_SQL, stream)
+        if stream.consumed == 0:
+            conn.rollback()
+            break
+        apply_rollups(cursor, stream.rollups)
+        save_stats(cursor, stream.stats, stream.categories)
+        conn.commit()
+
+
+def insert_rows(conn, cursor, rows, batch_size, dialect):
+    insert_sql = f"INSERT INTO expenses ({', '.join(STORED_COLUMNS)}) VALUES %s"
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        rollups = {}
+        for row in batch:
+            accumulate(rollups, row[1], row[2], row[3])
+        scored = [
+            row + (description_key(row[4]),) for row in score_rows(cursor, batch, dialect)
+        ]
+        execute_values(cursor, insert_sql, scored, dialect)
+        apply_rollups(cursor, rollups, dialect)
+        conn.commit()
+
+
+def seed_database(count, batch_size=100000):
+    """Reset the tables and load `count` synthetic rows; returns rows/s."""
+    dialect = db_utils.db_dialect()
+    with db_utils.get_connection() as conn:
+        cursor = conn.cursor()
+        if dialect == "postgres":
+            cursor.execute("TRUNCATE expenses, expense_rollups, category_stats, recurring_series")
+        else:
+            cursor.execute("DELETE FROM expenses")
+            cursor.execute("DELETE FROM expense_rollups")
+            cursor.execute("DELETE FROM category_stats")
+            cursor.execute("DELETE FROM recurring_series")
+        conn.commit()
+
+        rows = synthetic_rows(count)
+        started = time.perf_counter()
+        if dialect == "postgres":
+            copy_rows(conn, cursor, rows, batch_size)
+        else:
+            insert_rows(conn, cursor, rows, batch_size, dialect)
+        elapsed = time.perf_counter() - started
+
+        if dialect == "postgres":
+            conn.autocommit = True
+            cursor.execute("VACUUM ANALYZE expenses")
+            cursor.execute("VACUUM ANALYZE expense_rollups")
+            conn.autocommit = False
+        else:
+            cursor.execute("ANALYZE")
+            conn.commit()
+        # Bulk loads bypass save_to_db, so rebuild the in-memory columns if enabled.
+        columnar.load_store(conn)
+    return count / elapsed if elapsed else 0.0
+
+
+def timed(samples, name, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    samples.setdefault(name, []).append(time.perf_counter() - started)
+    return result
+
+
+def summarize(samples):
+    report = {}
+    for name, values in samples.items():
+        values = sorted(values)
+        report[name] = {
+            "n": len(values),
+            "mean_ms": statistics.fmean(values) * 1000,
+            "p50_ms": values[len(values) // 2] * 1000,
+            "p95_ms": values[min(len(values) - 1, int(len(values) * 0.95))] * 1000,
+        }
+    return report
+
+
+def bench_stages(repeat):
+    """Time intent, tool/DB and summarization separately for each workload question."""
+    samples = {}
+    tools_by_name = {tool.name: tool for tool in langchain_utils.tools}
+
+    for _ in range(repeat):
+        for question, _ in WORKLOAD:
+            langchain_utils.intent_cache.clear()
+            started = time.perf_counter()
+            tool_calls, path = langchain_utils.get_tool_calls(question)
+            # Split by path: "fast" skips the model, "llm" pays for a call.
+            samples.setdefault(f"intent:{path}", []).append(time.perf_counter() - started)
+            for tool_call in tool_calls:
+                tool = tools_by_name[tool_call["name"]]
+                result = timed(
+                    samples, f"db:{tool.name}", tool.invoke, tool_call["args"]
+                )
+                prompt = timed(
+                    samples,
+                    "summarize:prompt",
+                    langchain_utils.build_search_prompt,
+                    result,
+                    question,
+                )
+                timed(samples, "summarize:llm", langchain_utils.get_llm().invoke, prompt)
+    return samples
+
+
+def bench_image(repeat):
+    image = Image.new("RGB", (4032, 3024), (200, 180, 160))
+    buffered = BytesIO()
+    image.save(buffered, format="JPEG", quality=90)
+    data = buffered.getvalue()
+
+    samples = {}
+    for _ in range(repeat):
+        timed(samples, "image:preprocess", preprocess_image, data)
+    return samples
+
+
+async def bench_end_to_end(requests, concurrency, response_mode):
+    """Throughput of async_route_request with `concurrency` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index):
+        question = WORKLOAD[index % len(WORKLOAD)][0]
+        async with semaphore:
+            langchain_utils.intent_cache.clear()
+            started = time.perf_counter()
+            await langchain_utils.async_route_request(
+                user_input=question, response_mode=response_mode
+            )
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(index) for index in range(requests)))
+    elapsed = time.perf_counter() - started
+    return requests / elapsed, {f"e2e:{response_mode}": latencies}
+
+
+def print_report(title, report, extra=None):
+    print(f"\n== {title}")
+    if extra:
+        for key, value in extra.items():
+            print(f"   {key}: {value:,.1f}")
+    print(f"   {'stage':<44}{'n':>6}{'mean ms':>11}{'p50 ms':>11}{'p95 ms':>11}")
+    for name, stats in sorted(report.items()):
+        print(
+            f"   {name:<44}{stats['n']:>6}{stats['mean_ms']:>11.2f}"
+            f"{stats['p50_ms']:>11.2f}{stats['p95_ms']:>11.2f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000])
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per fake model call.")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds per streamed chunk.")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the workload per stage.")
+    parser.add_argument("--requests", type=int, default=100, help="End-to-end requests per row count.")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args()
+
+    install_fake_models(args.llm_latency, args.token_latency)
+    db_utils.init_db()
+
+    results = {"image": summarize(bench_image(args.repeat * 3))}
+    print_report("image preprocessing (12MP JPEG)", results["image"])
+
+    for count in args.rows:
+        insert_rate = seed_database(count)
+        stages = bench_stages(args.repeat)
+        throughput = {}
+        for mode in langchain_utils.RESPONSE_MODES:
+            rate, latencies = asyncio.run(
+                bench_end_to_end(args.requests, args.concurrency, mode)
+            )
+            throughput[f"{mode} requests/s"] = rate
+            stages.update(latencies)
+
+        report = summarize(stages)
+        extra = {"seed rows/s": insert_rate, **throughput}
+        results[str(count)] = {"stages": report, **extra}
+        print_report(f"{count:,} rows", report, extra)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
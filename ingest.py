@@ -1,43 +1,267 @@
 import psycopg2
 import os
 import csv
-
-db_uri = os.getenv("POSTGRES_URL")
-if not db_uri:
-    raise ValueError("POSTGRES_URL environment variable is not set")
+import io
+import time
+import argparse
+from datetime import date
+from app.migrations import migrate
+from app.rollups import accumulate, apply_rollups
+from app.anomalies import load_stats, save_stats, score
+from app.recurrence import description_key, rebuild as rebuild_recurring
 
 csv_file_path = "filtered_expenses.csv"
 
+COLUMNS = ("id", "date", "amount", "category", "description")
+# What CopyStream writes: the columns above plus values derived at insert time.
+STORED_COLUMNS = COLUMNS + ("anomaly_score", "description_key")
+# COPY's CSV format reads an unquoted empty field as NULL, but the row-by-row
+# path stores "" for an empty description; FORCE_NOT_NULL keeps them the same.
+COPY_SQL = (
+    f"COPY expenses ({', '.join(STORED_COLUMNS)}) FROM STDIN "
+    "WITH (FORMAT csv, FORCE_NOT_NULL (description, description_key))"
+)
+
+
+def get_db_uri():
+    db_uri = os.getenv("POSTGRES_URL")
+    if not db_uri:
+        raise ValueError("POSTGRES_URL environment variable is not set")
+    return db_uri
+
+
+def normalize_row(row):
+    """Return a cleaned (id, date, amount, category, description) tuple, or None if invalid."""
+    try:
+        return (
+            row["id"].strip().lower(),
+            date.fromisoformat(row["date"].strip()).isoformat(),
+            float(row["amount"]),  # Ensure amount is stored as a float
+            row["category"].strip().lower(),
+            row["description"].strip().lower(),
+        )
+    except (KeyError, AttributeError, TypeError, ValueError):
+        return None
+
+
+def read_expenses(csv_file_path, skip=0):
+    """Stream normalized rows from the CSV, skipping the first `skip` data rows."""
+    with open(csv_file_path, mode="r", encoding="utf-8", newline="") as file:
+        reader = csv.DictReader(file)
+        for index, row in enumerate(reader):
+            if index < skip:
+                continue
+            yield normalize_row(row)
+
+
+class CopyStream(io.TextIOBase):
+    """File-like adapter feeding at most `limit` rows to COPY as CSV text.
+
+    Only one encoded row is buffered at a time, so memory stays bounded no
+    matter how large the source file is. Each row is scored against, and
+    folded into, `stats` (see app.anomalies) and written as STORED_COLUMNS;
+    `categories` collects the categories whose stats changed.
+    """
+
+    def __init__(self, rows, limit, stats):
+        self.rows = rows
+        self.limit = limit
+        self.stats = stats
+        self.consumed = 0  # source rows read, including invalid ones
+        self.copied = 0
+        self.skipped = 0
+        self.rollups = {}
+        self.categories = set()
+        self._buffer = ""
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line, lineterminator="\n")
+
+    def readable(self):
+        return True
+
+    def _next_line(self):
+        while self.consumed < self.limit:
+            row = next(self.rows, StopIteration)
+            if row is StopIteration:
+                break
+            self.consumed += 1
+            if row is None:
+                self.skipped += 1
+                continue
+            self.copied += 1
+            accumulate(self.rollups, row[1], row[2], row[3])
+            self.categories.add(row[3])
+            self._line.seek(0)
+            self._line.truncate()
+            self._writer.writerow(
+                row + (score(self.stats, row[2], row[3]), description_key(row[4]))
+            )
+            return self._line.getvalue()
+        return ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = self._next_line()
+            if not line:
+                break
+            self._buffer += line
+        if size < 0:
+            data, self._buffer = self._buffer, ""
+        else:
+            data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+    def readline(self, size=-1):
+        if not self._buffer:
+            self._buffer = self._next_line()
+        data, self._buffer = self._buffer, ""
+        return data
+
+
+def get_offset(cursor, source):
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS ingest_progress (
+            source TEXT PRIMARY KEY,
+            rows_committed BIGINT NOT NULL,
+            updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+        )
+        """
+    )
+    cursor.execute(
+        "SELECT rows_committed FROM ingest_progress WHERE source = %s", (source,)
+    )
+    row = cursor.fetchone()
+    return row[0] if row else 0
+
+
+def set_offset(cursor, source, offset):
+    cursor.execute(
+        """
+        INSERT INTO ingest_progress (source, rows_committed, updated_at)
+        VALUES (%s, %s, NOW())
+        ON CONFLICT (source) DO UPDATE
+        SET rows_committed = EXCLUDED.rows_committed, updated_at = NOW()
+        """,
+        (source, offset),
+    )
+
 
 def ingest_data(csv_file_path):
     if not os.path.exists(csv_file_path):
         raise FileNotFoundError(f"CSV file '{csv_file_path}' not found.")
 
     try:
-        with psycopg2.connect(db_uri) as conn:
+        with psycopg2.connect(get_db_uri()) as conn:
+            migrate(conn)
             with conn.cursor() as cursor:
                 with open(csv_file_path, mode="r", encoding="utf-8") as file:
                     reader = csv.DictReader(file)
+                    rollups = {}
+                    stats = load_stats(cursor)
                     for row in reader:
+                        values = (
+                            row["id"].strip().lower(),
+                            row["date"].strip(),
+                            float(row["amount"]),  # Ensure amount is stored as a float
+                            row["category"].strip().lower(),
+                            row["description"].strip().lower(),
+                        )
                         cursor.execute(
                             """
-                            INSERT INTO expenses (id, date, amount, category, description)
-                            VALUES (%s, %s, %s, %s, %s)
+                            INSERT INTO expenses (id, date, amount, category, description, anomaly_score, description_key)
+                            VALUES (%s, %s, %s, %s, %s, %s, %s)
                             """,
-                            (
-                                row["id"].strip().lower(),
-                                row["date"].strip(),
-                                float(
-                                    row["amount"]
-                                ),  # Ensure amount is stored as a float
-                                row["category"].strip().lower(),
-                                row["description"].strip().lower(),
-                            ),
+                            values
+                            + (score(stats, values[2], values[3]), description_key(values[4])),
                         )
+                        accumulate(rollups, *values[1:4])
+                apply_rollups(cursor, rollups)
+                save_stats(cursor, stats, {category for _, _, category in rollups})
+                rebuild_recurring(conn)
             conn.commit()
         print("Data ingestion completed successfully.")
     except Exception as e:
         print(f"Error occurred: {e}")
 
 
-ingest_data(csv_file_path)
+def bulk_ingest_data(csv_file_path, batch_size=50000, resume=True):
+    """Load the CSV with COPY FROM STDIN, committing every `batch_size` rows.
+
+    Progress and rollups are written in the same transaction as each batch,
+    so an interrupted load picks up after the last committed batch.
+    """
+    if not os.path.exists(csv_file_path):
+        raise FileNotFoundError(f"CSV file '{csv_file_path}' not found.")
+
+    source = os.path.abspath(csv_file_path)
+    conn = psycopg2.connect(get_db_uri())
+    try:
+        migrate(conn)
+        with conn.cursor() as cursor:
+            offset = get_offset(cursor, source) if resume else 0
+            conn.commit()
+            if offset:
+                print(f"Resuming '{csv_file_path}' after row {offset}.")
+
+            rows = read_expenses(csv_file_path, skip=offset)
+            started = time.perf_counter()
+            copied = skipped = 0
+
+            while True:
+                stream = CopyStream(rows, batch_size, load_stats(cursor))
+                cursor.copy_expert(COPY_SQL, stream)
+                if stream.consumed == 0:
+                    conn.rollback()
+                    break
+
+                offset += stream.consumed
+                apply_rollups(cursor, stream.rollups)
+                save_stats(cursor, stream.stats, stream.categories)
+                set_offset(cursor, source, offset)
+                conn.commit()
+
+                copied += stream.copied
+                skipped += stream.skipped
+                elapsed = time.perf_counter() - started
+                print(
+                    f"Committed {copied} rows (offset {offset}, skipped {skipped}) "
+                    f"at {copied / elapsed if elapsed else 0:,.0f} rows/s."
+                )
+
+        elapsed = time.perf_counter() - started
+        # One ordered pass over the table is cheaper than a lookup per loaded key.
+        series = rebuild_recurring(conn)
+        conn.commit()
+        print(f"Recurring payments: {series} series detected.")
+        print(
+            f"Bulk ingestion completed: {copied} rows in {elapsed:.2f}s "
+            f"({copied / elapsed if elapsed else 0:,.0f} rows/s), {skipped} invalid rows skipped."
+        )
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load expenses from a CSV file.")
+    parser.add_argument("csv_file", nargs="?", default=csv_file_path)
+    parser.add_argument(
+        "--bulk", action="store_true", help="Use COPY FROM STDIN with batched commits."
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=50000, help="Rows per committed batch."
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the stored offset and load from the first row.",
+    )
+    args = parser.parse_args()
+
+    if args.bulk:
+        bulk_ingest_data(args.csv_file, args.batch_size, resume=not args.no_resume)
+    else:
+        ingest_data(args.csv_file)
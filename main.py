@@ -1,11 +1,44 @@
 import os
-from fastapi import FastAPI
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pyngrok import ngrok
 import uvicorn
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.routers import expense_router
+from app.db_utils import init_db, close_pool
+from app.image_utils import shutdown_image_pool
 
-app = FastAPI()
+# The tunnel is for sharing a dev server; off unless asked for.
+NGROK_ENABLED = os.getenv("NGROK_ENABLED", "false").lower() in ("1", "true", "yes")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs once per worker process, after any fork, so nothing here is shared.
+    started = time.perf_counter()
+    await asyncio.to_thread(init_db)
+
+    tunnel = None
+    if NGROK_ENABLED:
+        from pyngrok import ngrok
+
+        custom_domain = os.getenv("NGROK_URL", "intense-secondly-gecko.ngrok-free.app")
+        tunnel = ngrok.connect(addr=8000, url=custom_domain)
+        print(f"Public URL: {tunnel.public_url}")
+
+    print(f"Startup finished in {time.perf_counter() - started:.2f}s")
+    try:
+        yield
+    finally:
+        if tunnel is not None:
+            ngrok.disconnect(tunnel.public_url)
+        shutdown_image_pool()
+        close_pool()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -18,10 +51,12 @@ app.add_middleware(
 
 app.include_router(expense_router)
 
-custom_domain = os.getenv("NGROK_URL", "intense-secondly-gecko.ngrok-free.app")
-public_url = ngrok.connect(addr=8000, url=custom_domain)
 
-print(f"Public URL: {public_url}")
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8001))
@@ -1,20 +1,23 @@
 import streamlit as st
-import base64
 import json
-from io import BytesIO
 from PIL import Image
 from app.langchain_utils import route_request
+from app.image_utils import preprocess_image
+from app.db_utils import init_db
+
+
+@st.cache_resource
+def setup_db():
+    # Streamlit reruns this script on every interaction; migrate only once.
+    init_db()
+
+
+setup_db()
 
 
 def process_image(image_file, max_size=(800, 800)):
     """Resize image to fit within max_size and convert to base64."""
-    image = Image.open(image_file)
-    if image.mode in ("RGBA", "P"):
-        image = image.convert("L")
-    image.thumbnail(max_size)
-    buffered = BytesIO()
-    image.save(buffered, format="JPEG", quality=80)
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+    return preprocess_image(image_file.getvalue(), max_size)
 
 
 # Initialize conversation history in session_state
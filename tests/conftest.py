@@ -0,0 +1,79 @@
+import os
+import uuid
+import pytest
+from app import columnar, db_utils, forecast, storage
+from app.storage.sqlite import SqliteBackend
+
+# Postgres-only tests run in a throwaway schema of this database, and are
+# skipped when it is not set.
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+
+def use_backend(monkeypatch, backend):
+    """Make `backend` the process backend, with fresh caches, and migrate it."""
+    monkeypatch.setattr(storage, "_backend", backend)
+    monkeypatch.setattr(columnar, "_store", None)
+    monkeypatch.setattr(forecast, "_model", None)
+    db_utils.init_db()
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """A migrated, empty in-memory SQLite database as the process backend."""
+    backend = SqliteBackend(":memory:")
+    use_backend(monkeypatch, backend)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def pg_dsn():
+    """A DSN whose search_path is a new, empty schema in DATABASE_URL; dropped afterwards."""
+    if not DATABASE_URL:
+        pytest.skip("DATABASE_URL is not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    from psycopg2.extensions import make_dsn
+
+    schema = f"test_{uuid.uuid4().hex}"
+    admin = psycopg2.connect(DATABASE_URL)
+    admin.autocommit = True
+    with admin.cursor() as cursor:
+        cursor.execute(f"CREATE SCHEMA {schema}")
+    try:
+        yield make_dsn(DATABASE_URL, options=f"-c search_path={schema}")
+    finally:
+        with admin.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA {schema} CASCADE")
+        admin.close()
+
+
+@pytest.fixture
+def pg_db(pg_dsn, monkeypatch):
+    """Like `db`, on Postgres."""
+    from app.storage.postgres import PostgresBackend
+
+    backend = PostgresBackend(pg_dsn)
+    use_backend(monkeypatch, backend)
+    yield backend
+    backend.close()
+
+
+@pytest.fixture
+def add_expenses(db):
+    """Insert (date, amount, category, description) tuples through `save_many_to_db`."""
+
+    def add(rows):
+        db_utils.save_many_to_db(
+            [
+                {
+                    "id": uuid.uuid4().hex,
+                    "date": expense_date,
+                    "amount": amount,
+                    "category": category,
+                    "description": description,
+                }
+                for expense_date, amount, category, description in rows
+            ]
+        )
+
+    return add
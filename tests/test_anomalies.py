@@ -0,0 +1,62 @@
+import statistics
+from app import anomalies
+from app.db_utils import db_query
+from app.tool_factory import expense_anomalies
+
+FOOD = [10.0, 12.0, 11.0, 9.0, 13.0, 10.5]
+
+
+def category_stats():
+    return {row["category"]: row for row in db_query("SELECT * FROM category_stats")}
+
+
+def test_running_stats_match_the_table(add_expenses):
+    add_expenses([("2024-01-01", amount, "food", "lunch") for amount in FOOD])
+    add_expenses([("2024-01-02", 30.0, "grocery", "shop")])
+
+    food = category_stats()["food"]
+    assert food["count"] == len(FOOD)
+    assert abs(food["mean"] - statistics.mean(FOOD)) < 1e-9
+    assert abs(food["m2"] / (food["count"] - 1) - statistics.variance(FOOD)) < 1e-9
+
+
+def test_outlier_is_scored_and_listed(add_expenses):
+    add_expenses([("2024-01-01", amount, "food", "lunch") for amount in FOOD])
+    add_expenses([("2024-01-03", 80.0, "food", "banquet")])
+
+    (row,) = expense_anomalies.invoke({"threshold": 3})
+    assert row["description"] == "banquet"
+    expected = (80.0 - statistics.mean(FOOD)) / statistics.stdev(FOOD)
+    assert abs(row["anomaly_score"] - expected) < 1e-6
+
+
+def test_only_touched_categories_are_written(add_expenses):
+    add_expenses([("2024-01-01", 30.0, "grocery", "shop"), ("2024-01-01", 10.0, "food", "lunch")])
+    # A row this writer never locked must come through its save untouched.
+    db_query("UPDATE category_stats SET count = 99 WHERE category = %s", ("grocery",))
+    add_expenses([("2024-01-02", 12.0, "food", "lunch")])
+
+    stats = category_stats()
+    assert stats["grocery"]["count"] == 99
+    assert stats["food"]["count"] == 2
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append(" ".join(sql.split()))
+
+    def fetchall(self):
+        return []
+
+
+def test_postgres_locks_only_the_touched_rows(monkeypatch):
+    monkeypatch.setattr(anomalies, "execute_values", lambda cursor, sql, rows, dialect: None)
+    cursor = RecordingCursor()
+    anomalies.load_stats(cursor, ["travel", "food", "food"], "postgres")
+    assert cursor.statements == [
+        "SELECT category, count, mean, m2 FROM category_stats"
+        " WHERE category IN (%s, %s) ORDER BY category FOR UPDATE"
+    ]
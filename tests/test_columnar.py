@@ -0,0 +1,47 @@
+from dotenv import load_dotenv
+from app import columnar
+from app.tool_factory import get_expenses_above_average, get_expenses_by_date_range
+
+
+def test_cache_setting_from_dotenv_loaded_after_import(db, tmp_path, monkeypatch):
+    # setenv first so teardown removes what load_dotenv() sets below; delenv
+    # alone records nothing to undo when the variable is absent.
+    monkeypatch.setenv("COLUMNAR_CACHE", "false")
+    monkeypatch.delenv("COLUMNAR_CACHE")
+    with db.connection() as conn:
+        assert columnar.load_store(conn) is None
+
+    env_file = tmp_path / ".env"
+    env_file.write_text("COLUMNAR_CACHE=true\n")
+    load_dotenv(env_file)
+    with db.connection() as conn:
+        assert columnar.load_store(conn) is not None
+    assert columnar.get_store() is not None
+
+
+def test_columnar_rows_match_sql_rows(add_expenses, db, monkeypatch):
+    add_expenses(
+        [
+            ("2024-01-05", 12.5, "food", "lunch"),
+            ("2024-01-06", 40.0, "grocery", "weekly shop"),
+            ("2024-02-01", 9.99, "entertainment", "netflix"),
+            ("2024-02-01", 9.99, "entertainment", "netflix"),
+        ]
+    )
+    calls = [
+        (get_expenses_by_date_range, {"start_date": "2024-01-01", "end_date": "2024-01-31"}),
+        (get_expenses_above_average, {}),
+    ]
+    from_sql = [tool.invoke(args) for tool, args in calls]
+
+    monkeypatch.setenv("COLUMNAR_CACHE", "true")
+    with db.connection() as conn:
+        columnar.load_store(conn)
+    from_store = [tool.invoke(args) for tool, args in calls]
+
+    for sql_rows, store_rows in zip(from_sql, from_store):
+        assert sql_rows
+        assert [list(row) for row in store_rows] == [list(row) for row in sql_rows]
+        assert sorted(store_rows, key=lambda row: row["id"]) == sorted(
+            sql_rows, key=lambda row: row["id"]
+        )
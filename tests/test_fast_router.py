@@ -0,0 +1,86 @@
+from datetime import datetime
+import pytest
+from app.fast_router import match_candidates, route_locally
+from app.langchain_utils import tool_names
+from app.tool_factory import tools
+
+TOOLS = {tool.name: tool for tool in tools}
+
+
+def test_create_uses_today_and_detects_category():
+    (name, args), = match_candidates("spent 12 on lunch")
+    assert name == "create_expense"
+    assert args == {
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "amount": 12.0,
+        "category": "food",
+        "description": "lunch",
+    }
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "spent 12 on food yesterday",
+        "spent 12 on food today",
+        "paid 40 for groceries last week",
+        "i spent 30 on dinner on friday",
+        "add 15 for movie in march",
+        "spent 12 on food 2024-10-17",
+        "spent 12 on food 3 days ago",
+    ],
+)
+def test_create_with_another_day_defers_to_llm(text):
+    assert match_candidates(text) == []
+    assert route_locally(text, tool_names) is None
+
+
+def test_ambiguous_category_defers_to_llm():
+    assert route_locally("spent 20 on coffee and headphones", tool_names) is None
+
+
+@pytest.mark.parametrize(
+    "text, name, args",
+    [
+        ("spent 12 on lunch", "create_expense", None),
+        ("total food", "aggregate_sum_by_category", {"category": "food"}),
+        ("how much did i spend on food", "aggregate_sum_by_category", {"category": "food"}),
+        ("highest expense", "get_limited_expenses", {"limit": 1, "order_by": "amount", "order": "DESC"}),
+        ("last 5 expenses", "get_limited_expenses", {"limit": 5, "order_by": "date", "order": "DESC"}),
+        (
+            "food expenses from 2024-01-01 to 2024-02-01",
+            "get_expenses_by_date_range",
+            {"start_date": "2024-01-01", "end_date": "2024-02-01", "category": "food"},
+        ),
+        ("expenses by category", "aggregate_sum_by_category", {}),
+        ("hello", "greetings", {}),
+    ],
+)
+def test_routes_to_bound_tools(text, name, args):
+    (call,) = route_locally(text, tool_names)
+    assert call["name"] == name
+    if args is not None:
+        assert call["args"] == args
+
+
+def test_routed_calls_run_against_the_database(add_expenses):
+    add_expenses([("2024-01-05", 12.5, "food", "lunch"), ("2024-03-01", 7.5, "food", "snack")])
+    add_expenses([("2024-01-06", 40.0, "grocery", "shop")])
+
+    (total,) = route_locally("total food", tool_names)
+    assert TOOLS[total["name"]].invoke(total["args"]) == [{"category": "food", "total_amount": 20.0}]
+
+    (in_range,) = route_locally("food expenses from 2024-01-01 to 2024-02-01", tool_names)
+    rows = TOOLS[in_range["name"]].invoke(in_range["args"])
+    assert [row["description"] for row in rows] == ["lunch"]
+
+
+def test_first_bound_candidate_wins():
+    (call,) = route_locally("highest expense", {"highest_expense", "get_limited_expenses"})
+    assert call["name"] == "highest_expense"
+
+
+def test_date_range_validates_dates():
+    (call,) = route_locally("expenses from 2024-01-01 to 2024-01-31", {"get_expenses_by_date_range"})
+    assert call["args"] == {"start_date": "2024-01-01", "end_date": "2024-01-31"}
+    assert route_locally("expenses from 2024-02-30 to 2024-03-01", tool_names) is None
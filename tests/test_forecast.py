@@ -0,0 +1,53 @@
+from datetime import date
+from app import forecast
+
+MONTHS = 36
+
+
+def monthly_total(last, step):
+    """A steady trend plus a December bump, `step` months after the first one."""
+    month = last - MONTHS + 1 + step
+    return 100 + 2 * step + (50 if month % 12 == 11 else 0)
+
+
+def history(last):
+    """One expense per month for the MONTHS months up to `last`."""
+    rows = []
+    for step in range(MONTHS):
+        month = last - MONTHS + 1 + step
+        expense_date = date(month // 12, month % 12 + 1, 15).isoformat()
+        rows.append((expense_date, monthly_total(last, step), "food", "meal"))
+    return rows
+
+
+def test_no_history_no_forecast(db):
+    assert forecast.forecast(3) is None
+
+
+def test_trend_and_season_are_forecast(add_expenses):
+    last = forecast.last_closed_month()
+    add_expenses(history(last))
+
+    result = forecast.forecast(12)
+
+    assert result["method"] == "trend+seasonal"
+    assert result["history_months"] == MONTHS
+    assert [point["month"] for point in result["total"]] == [
+        forecast.month_label(last + step) for step in range(1, 13)
+    ]
+    for step, point in enumerate(result["categories"]["food"], start=MONTHS):
+        assert abs(point["expected"] - monthly_total(last, step)) < 0.01
+        assert point["low"] <= point["expected"] <= point["high"]
+
+
+def test_write_into_closed_month_refreshes_model(add_expenses):
+    last = forecast.last_closed_month()
+    add_expenses(history(last))
+    before = forecast.forecast(1)["total"][0]["expected"]
+    model = forecast.get_model()
+
+    year, month = last // 12, last % 12 + 1
+    add_expenses([(date(year, month, 20).isoformat(), 1000.0, "food", "party")])
+
+    assert forecast.get_model() is model  # refreshed in place, not refitted from scratch
+    assert forecast.forecast(1)["total"][0]["expected"] > before
@@ -0,0 +1,52 @@
+import asyncio
+from concurrent.futures import Executor, Future
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+import pytest
+from PIL import Image
+from app import image_utils
+
+
+def png_bytes(size=(40, 30)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def image_pool(monkeypatch):
+    monkeypatch.setattr(image_utils, "IMAGE_WORKERS", 1)
+    image_utils.shutdown_image_pool()
+    yield
+    image_utils.shutdown_image_pool()
+
+
+def test_broken_pool_is_replaced(image_pool):
+    data = png_bytes()
+    assert asyncio.run(image_utils.preprocess_image_async(data))
+    broken = image_utils.get_image_pool()
+    for process in list(broken._processes.values()):
+        process.kill()
+        process.join()
+
+    assert asyncio.run(image_utils.preprocess_image_async(data))
+    assert image_utils.get_image_pool() is not broken
+
+
+class DeadPool(Executor):
+    """An executor whose workers die on every task."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_exception(BrokenProcessPool("worker died"))
+        return future
+
+
+def test_pool_that_keeps_breaking_is_unavailable(image_pool, monkeypatch):
+    pools = []
+    monkeypatch.setattr(image_utils, "get_image_pool", lambda: pools.append(DeadPool()) or pools[-1])
+
+    with pytest.raises(image_utils.ImagePoolBrokenError):
+        asyncio.run(image_utils.preprocess_image_async(png_bytes()))
+    assert len(pools) == 2
+    assert image_utils._pending == 0
@@ -0,0 +1,53 @@
+import csv
+import io
+from ingest import COPY_SQL, CopyStream, normalize_row
+
+
+def test_copy_stream_writes_stored_columns():
+    rows = iter(
+        [("a", "2024-01-01", 5.0, "food", ""), None, ("b", "2024-01-02", 7.0, "food", "Lunch #2")]
+    )
+    stream = CopyStream(rows, 10, {})
+
+    lines = list(csv.reader(io.StringIO(stream.read())))
+
+    assert lines == [
+        ["a", "2024-01-01", "5.0", "food", "", "", ""],
+        ["b", "2024-01-02", "7.0", "food", "Lunch #2", "", "lunch"],
+    ]
+    assert (stream.consumed, stream.copied, stream.skipped) == (3, 2, 1)
+    assert stream.categories == {"food"}
+    # The empty description and key above are unquoted; only FORCE_NOT_NULL
+    # stops COPY from loading them as NULL.
+    assert "FORCE_NOT_NULL (description, description_key)" in COPY_SQL
+
+
+def test_normalize_row_rejects_bad_values():
+    good = {
+        "id": " A1 ", "date": "2024-01-05", "amount": "3.5", "category": "Food ", "description": " ",
+    }
+    assert normalize_row(good) == ("a1", "2024-01-05", 3.5, "food", "")
+    assert normalize_row(dict(good, amount="abc")) is None
+    assert normalize_row(dict(good, date="2024-02-30")) is None
+
+
+def test_bulk_copy_round_trips_empty_descriptions(pg_dsn):
+    import psycopg2
+    from app.anomalies import load_stats
+    from app.migrations import migrate
+
+    conn = psycopg2.connect(pg_dsn)
+    try:
+        migrate(conn)
+        with conn.cursor() as cursor:
+            rows = iter(
+                [("a", "2024-01-01", 5.0, "food", ""), ("b", "2024-01-02", 7.0, "food", "lunch")]
+            )
+            cursor.copy_expert(COPY_SQL, CopyStream(rows, 10, load_stats(cursor)))
+            cursor.execute("SELECT id, description, description_key FROM expenses ORDER BY id")
+            assert cursor.fetchall() == [("a", "", ""), ("b", "lunch", "lunch")]
+            cursor.execute("SELECT COUNT(*) FROM expenses WHERE description_key = %s", ("",))
+            assert cursor.fetchone()[0] == 1
+        conn.rollback()
+    finally:
+        conn.close()
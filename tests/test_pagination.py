@@ -0,0 +1,79 @@
+import importlib.util
+from pathlib import Path
+import pytest
+from app import pagination
+from app.pagination import InvalidPageToken, fetch_page
+
+# Ties on every sort column, and amounts with no exact float4 representation.
+AMOUNTS = [19.99, 0.1, 0.7, 19.99, 19.99, 3.3, 0.1, 1e-7, 123456.78, 0.7]
+ROWS = [
+    (f"2024-01-{1 + index % 3:02d}", amount, ["food", "grocery"][index % 2], f"item {index % 4}")
+    for index, amount in enumerate(AMOUNTS)
+]
+
+
+def all_pages(**kwargs):
+    rows, token = fetch_page(**kwargs)
+    pages = [rows]
+    while token:
+        rows, token = fetch_page(page_token=token, **kwargs)
+        pages.append(rows)
+    return pages
+
+
+@pytest.mark.parametrize("order_by", sorted(pagination.SORT_COLUMNS))
+@pytest.mark.parametrize("order", ["ASC", "DESC"])
+def test_pages_cover_every_row_once(add_expenses, order_by, order):
+    add_expenses(ROWS)
+    pages = all_pages(order_by=order_by, order=order, page_size=3)
+    ids = [row["id"] for page in pages for row in page]
+
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    assert len(set(ids)) == len(ROWS)
+    (everything,) = all_pages(order_by=order_by, order=order, page_size=100)
+    assert ids == [row["id"] for row in everything]
+
+
+def test_amount_token_is_cast_to_the_column_type(monkeypatch):
+    queries = []
+    monkeypatch.setattr(pagination, "db_query", lambda query, params: queries.append(query) or [])
+
+    for order_by, value in (("amount", 19.99), ("date", "2024-01-01")):
+        token = pagination.encode_page_token({order_by: value, "id": "a"}, order_by, "DESC")
+        fetch_page(order_by=order_by, page_token=token)
+    assert "(amount, id) < (CAST(%s AS REAL), %s)" in queries[0]
+    assert "(date, id) < (%s, %s)" in queries[1]
+
+
+def test_token_from_another_sort_is_rejected(add_expenses):
+    add_expenses(ROWS)
+    _, token = fetch_page(order_by="amount", page_size=2)
+    with pytest.raises(InvalidPageToken):
+        fetch_page(order_by="date", page_token=token)
+    with pytest.raises(InvalidPageToken):
+        fetch_page(page_token="not a token")
+
+
+def load_copy_catalog():
+    """The alternative tool catalog; its file name is not an importable module name."""
+    path = Path(pagination.__file__).with_name("tool_factory copy.py")
+    spec = importlib.util.spec_from_file_location("tool_factory_copy", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_recent_expenses_pages_from_the_first_call(add_expenses):
+    add_expenses(ROWS)
+    recent_expenses = load_copy_catalog().recent_expenses
+
+    first = recent_expenses.invoke({"limit": 6})
+    assert len(first["expenses"]) == 6
+    assert first["next_page_token"]
+    second = recent_expenses.invoke({"limit": 6, "page_token": first["next_page_token"]})
+    assert len(second["expenses"]) == len(ROWS) - 6
+    assert second["next_page_token"] is None
+
+    ids = [row["id"] for page in (first, second) for row in page["expenses"]]
+    (everything,) = all_pages(order_by="date", order="DESC", page_size=100)
+    assert ids == [row["id"] for row in everything]
@@ -0,0 +1,18 @@
+from app.storage.postgres import ConnectionPool
+
+
+def test_only_idle_connections_are_pinged(pg_dsn, monkeypatch):
+    pings = []
+    monkeypatch.setattr(ConnectionPool, "_is_healthy", staticmethod(lambda conn: pings.append(conn) or True))
+    pool = ConnectionPool(pg_dsn, minconn=1, maxconn=1, idle_check=60)
+    try:
+        conn = pool.getconn()  # never handed out before
+        pool.putconn(conn)
+        pool.putconn(pool.getconn())  # just returned
+        assert len(pings) == 1
+
+        pool.idle_check = 0
+        pool.putconn(pool.getconn())
+        assert len(pings) == 2
+    finally:
+        pool.closeall()
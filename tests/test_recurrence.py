@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+from app import recurrence
+from app.db_utils import db_query, get_connection
+from app.statements import run_statement
+
+
+def monthly(start, count, amount, description, category="entertainment"):
+    return [
+        ((start + timedelta(days=30 * index)).isoformat(), amount, category, description)
+        for index in range(count)
+    ]
+
+
+def series():
+    return {row["description_key"]: row for row in run_statement("recurring_series")}
+
+
+def test_description_key_ignores_numbers_and_punctuation():
+    assert recurrence.description_key("Netflix 03/2024") == recurrence.description_key("netflix #04")
+    assert recurrence.description_key("1234") == ""
+
+
+def test_saves_detect_monthly_and_weekly_payments(add_expenses):
+    add_expenses(monthly(date(2024, 1, 1), 6, 9.99, "Netflix 01"))
+    add_expenses(
+        [
+            ((date(2024, 1, 1) + timedelta(days=7 * week)).isoformat(), 25.0, "health", "gym")
+            for week in range(5)
+        ]
+    )
+    add_expenses([("2024-01-01", 5, "food", "coffee"), ("2024-01-03", 50, "food", "coffee")])
+    add_expenses([("2024-03-09", 7, "food", "coffee")])
+
+    found = series()
+    assert set(found) == {"netflix", "gym"}
+    assert found["netflix"]["cadence"] == "monthly"
+    assert found["gym"]["cadence"] == "weekly"
+    assert found["netflix"]["next_date"] == date(2024, 1, 1) + timedelta(days=180)
+
+
+def test_irregular_save_removes_series(add_expenses):
+    add_expenses(monthly(date(2024, 1, 1), 4, 40.0, "phone bill", "utilities"))
+    assert "phone bill" in series()
+    add_expenses([("2024-04-05", 40.0, "utilities", "phone bill")])
+    add_expenses([("2024-04-07", 40.0, "utilities", "phone bill")])
+    assert "phone bill" not in series()
+
+
+def test_only_recent_occurrences_count(add_expenses):
+    window = recurrence.RECENT_OCCURRENCES
+    # Irregular history, then a steady monthly payment filling the window.
+    history = [("2020-01-01", 5.0, "other", "club"), ("2020-01-02", 90.0, "other", "club")]
+    add_expenses(history + monthly(date(2021, 1, 1), window, 15.0, "club"))
+
+    club = series()["club"]
+    assert club["cadence"] == "monthly"
+    assert club["occurrences"] == window
+    assert club["first_date"] == date(2021, 1, 1)
+
+    # A full rebuild reaches the same series as the per-save refreshes.
+    with get_connection() as conn:
+        recurrence.rebuild(conn, "sqlite")
+    assert series()["club"] == club
+
+
+def test_refresh_reads_from_the_key_date_index(db):
+    plan = db_query(
+        "EXPLAIN QUERY PLAN " + recurrence.RECENT_ROWS, ("netflix", recurrence.RECENT_OCCURRENCES)
+    )
+    details = " ".join(row["detail"] for row in plan)
+    assert "idx_expenses_description_key_date" in details
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,47 @@
+import re
+from app.statements import EXPENSE_COLUMNS, STATEMENTS, like_pattern, run_statement
+
+EXPENSE_KEYS = EXPENSE_COLUMNS.split(", ")
+
+ROWS = [
+    ("2024-01-05", 12.5, "food", "lunch"),
+    ("2024-01-06", 40.0, "grocery", "weekly shop"),
+    ("2024-02-01", 9.99, "entertainment", "netflix"),
+]
+
+# Statements returning expense rows, with parameters that match at least one.
+ROW_STATEMENTS = {
+    "all_expenses": (),
+    "expenses_by_category": ("food",),
+    "expenses_by_date_range": ("2024-01-01", "2024-12-31"),
+    "expenses_above_amount": (10,),
+    "expenses_above_average": (),
+    "union_categories": ("food", "grocery"),
+    "description_search": (like_pattern("net"),),
+    "highest_expense": (),
+    "lowest_expense": (),
+    "sorted_by_amount_desc": (),
+    "limited_by_date_asc": (1,),
+    "search_by_category_date": ("food", "2024-01-05"),
+    "daterange_expenses": ("2024-01-01", "2024-12-31"),
+}
+
+
+def test_expense_rows_have_only_public_columns(add_expenses):
+    add_expenses(ROWS)
+    for name, params in ROW_STATEMENTS.items():
+        rows = run_statement(name, params)
+        assert rows, name
+        assert all(list(row) == EXPENSE_KEYS for row in rows), name
+
+
+def test_no_statement_selects_star():
+    for name, sql in STATEMENTS.items():
+        variants = sql.values() if isinstance(sql, dict) else [sql]
+        assert not any(re.search(r"SELECT\s+\*", variant) for variant in variants), name
+
+
+def test_like_pattern_matches_literally(add_expenses):
+    add_expenses([("2024-01-05", 5, "other", "100% cotton"), ("2024-01-05", 5, "other", "100 cotton")])
+    rows = run_statement("description_search", (like_pattern("100%"),))
+    assert [row["description"] for row in rows] == ["100% cotton"]
@@ -0,0 +1,30 @@
+from app import langchain_utils
+from app.tool_factory import tools
+
+
+def bound_names():
+    return {tool.name for tool in tools}
+
+
+DETECTOR_TOOLS = {"expense_anomalies", "predict_future_expenses", "recurring_expenses"}
+
+
+def test_bound_catalog_has_detector_tools():
+    assert DETECTOR_TOOLS <= bound_names()
+    assert DETECTOR_TOOLS <= langchain_utils.tool_names
+    assert DETECTOR_TOOLS <= set(langchain_utils.tool_selector.documents)
+
+
+def test_selector_finds_anomalies():
+    subset = langchain_utils.tool_selector.select("any unusual expenses")
+    assert "expense_anomalies" in {tool.name for tool in subset}
+
+
+def test_selector_finds_forecast():
+    subset = langchain_utils.tool_selector.select("forecast my spending for next month")
+    assert "predict_future_expenses" in {tool.name for tool in subset}
+
+
+def test_selector_finds_recurring():
+    subset = langchain_utils.tool_selector.select("which subscriptions do I pay")
+    assert "recurring_expenses" in {tool.name for tool in subset}
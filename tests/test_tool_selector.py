@@ -0,0 +1,81 @@
+from types import SimpleNamespace
+import pytest
+from app import langchain_utils
+from app.tool_factory import tools
+from app.tool_selector import ToolSelector
+
+
+@pytest.fixture(scope="module")
+def selector():
+    return ToolSelector(tools)
+
+
+def selected(selector, text):
+    subset = selector.select(text)
+    assert subset is not None, text
+    return {tool.name for tool in subset}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("list all my expenses", {"get_all_expenses"}),
+        ("show all expenses", {"get_all_expenses"}),
+        ("top 5 expenses by amount", {"get_limited_expenses", "get_sorted_expenses"}),
+        ("sort expenses by date", {"get_sorted_expenses"}),
+        ("expenses between 2024-01-01 and 2024-02-01", {"get_expenses_by_date_range"}),
+        ("what are my categories", {"get_distinct_categories"}),
+    ],
+)
+def test_selects_expected_tools(selector, text, expected):
+    assert expected <= selected(selector, text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "what did I spend yesterday",
+        "show today's expenses",
+        "how much did i spend last week",
+        "expenses this month",
+        "spending last month",
+        "what did i buy on monday",
+        "food expenses 3 days ago",
+    ],
+)
+def test_relative_dates_select_date_range(selector, text):
+    assert "get_expenses_by_date_range" in selected(selector, text)
+
+
+def test_always_binds_fallback_tools(selector):
+    assert {"create_expense", "greetings", "unknown"} <= selected(selector, "list all my expenses")
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        return SimpleNamespace(tool_calls=[{"name": self.name, "args": {}, "id": "1"}])
+
+
+def test_unknown_from_subset_retries_with_full_set(monkeypatch):
+    subset, full = FakeModel("unknown"), FakeModel("get_all_expenses")
+    monkeypatch.setattr(langchain_utils, "select_llm_with_tools", lambda text: (subset, True))
+    monkeypatch.setattr(langchain_utils, "get_llm_with_tools", lambda: full)
+    monkeypatch.setattr(langchain_utils.intent_cache, "get", lambda key: None)
+
+    tool_calls, path = langchain_utils.get_tool_calls("list every single expense please")
+
+    assert path == "llm"
+    assert [call["name"] for call in tool_calls] == ["get_all_expenses"]
+    assert (subset.calls, full.calls) == (1, 1)
+
+
+def test_missed_tool():
+    assert langchain_utils.missed_tool([])
+    assert langchain_utils.missed_tool([{"name": "unknown"}])
+    assert not langchain_utils.missed_tool([{"name": "get_all_expenses"}])
+    assert not langchain_utils.missed_tool([{"name": "unknown"}, {"name": "greetings"}])